@@ -1,8 +1,11 @@
 import sys
+import math
+import multiprocessing
 import sqlite3
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QPushButton, QLabel, QMenu, QAction, QSizePolicy, QMessageBox, QComboBox)
-from PyQt5.QtGui import QIcon, QFontDatabase
+                            QPushButton, QLabel, QMenu, QAction, QSizePolicy, QMessageBox, QComboBox,
+                            QInputDialog, QShortcut, QFileDialog, QProgressDialog)
+from PyQt5.QtGui import QIcon, QFontDatabase, QKeySequence
 from PyQt5.QtCore import Qt, QTimer, QSize
 from datetime import datetime, timedelta
 import pyqtgraph as pg
@@ -13,18 +16,40 @@ from styles import (get_label_style, get_temp_display_style, get_button_style,
 from database import DatabaseManager
 from options_dialog import OptionsDialog
 from constants import (WINDOW_SIZE, BUTTON_WIDTH, COMBO_WIDTH, 
-                      PLOT_UPDATE_INTERVAL, MAX_PLOT_POINTS, 
-                      DEFAULT_TEMP, ERROR_MESSAGES)
+                      MAX_PLOT_POINTS, 
+                      DEFAULT_TEMP, ERROR_MESSAGES, METRICS_ENV_VAR,
+                      METRICS_PORT_ENV_VAR, METRICS_FILE_NAME, METRICS_EXPORT_INTERVAL_MS,
+                      SETPOINT_EXPORT_STEPS, ACQ_ENV_VAR, ACQ_CALIBRATION_ENV_VAR,
+                      REPORT_FORMATS, REPORT_POLL_INTERVAL_MS, ETA_DISPLAY_HYSTERESIS_SECONDS)
 import platform
 import logging
 from schedule_window import schedule_window
 import os
 from furnace_commands import FurnaceCommandsWindow
+from logging_config import setup_logging, set_log_context
+from replay_window import ReplayWindow
+from compare_window import CompareWindow
+from schedule_profile import ScheduleProfile, HoldTracker
+from runs import RunRecorder
+import instrumentation
+from instrumentation import timer, timed
+from perf_overlay import PerfOverlay
+from cycle_clock import CycleClock, TickScheduler
+from setpoint_export import export_setpoints
+from logging_config import log_queue_depth
+from acquisition import Acquisition, Calibration, driver_from_spec
+from alarms import AlarmEngine, default_rules
+from live_plot import LiveTraces
+from plot_rendering import (configure_rendering, curve_options, optimize_plot, FrameLimiter,
+                            render_profile_png)
+from run_reports import ReportBatch, ReportJob, run_jobs
+from thermal_fit import update_fit
+from eta import EtaEstimator
 
 logger = logging.getLogger(__name__)
 
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, clock=None):
         super().__init__()
         # Initialize database
         DatabaseManager.initialize_database()
@@ -36,13 +61,35 @@ class MainWindow(QWidget):
         os.makedirs(self.app_data_dir, exist_ok=True)
         self.start_time_file = os.path.join(self.app_data_dir, 'start_cycle_time.txt')
         
+        # Cycle time comes from a monotonic clock anchored to the persisted start
+        self.cycle_clock = CycleClock(clock)
+        self.tick_scheduler = TickScheduler(self.cycle_clock.clock)
+        
         # Initialize start_cycle_time from file
         self.start_cycle_time = self.read_start_cycle_time()
+        self.cycle_clock.start(self.start_cycle_time)
         self.current_schedule = []
+        self.profile = ScheduleProfile([])
+        self.hold_tracker = HoldTracker(self.profile)
+        self.eta = EtaEstimator(self.profile)
+        self.shown_end_time = None
+        # Set while ticks are armed; the tick timer is single-shot, so it is
+        # not active while a tick runs
+        self.cycle_running = False
+        self.run_recorder = None
+        self.alarm_engine = AlarmEngine()
+        self.acquisition = None
+        self.setpoint = None
+        self.plot_minutes = None
+        self.render_mode = configure_rendering()
         
         # Initialize UI first
         self.init_ui()
         self.apply_theme()
+        self.setup_instrumentation()
+        self.setup_acquisition()
+        self.thermal_model = None
+        self.update_thermal_model()
         
         # Then load schedules after UI is ready
         schedules = DatabaseManager.fetch_all_schedules()
@@ -50,7 +97,7 @@ class MainWindow(QWidget):
             self.load_schedule(schedules[0])
         
         # Set initial button state based on whether cycle is running
-        if self.start_cycle_time and self.timer.isActive():
+        if self.start_cycle_time and self.cycle_running:
             self.start_button.setText("Stop Cycle")
         else:
             self.start_button.setText("Start Cycle")
@@ -71,7 +118,7 @@ class MainWindow(QWidget):
         # Load the Orbitron font
         font_id = QFontDatabase.addApplicationFont("OrbitronFont.ttf")
         if font_id == -1:
-            print("Failed to load Orbitron font")
+            logger.warning("Failed to load Orbitron font")
         else:
             font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
 
@@ -102,14 +149,28 @@ class MainWindow(QWidget):
         main_layout.addLayout(temp_display_layout)
         main_layout.addLayout(time_layout)
         
-        # Setup plot widget
+        # Setup plot widget; its items persist and are updated in place
         self.plot_widget = pg.PlotWidget()
         main_layout.addWidget(self.plot_widget)
+        optimize_plot(self.plot_widget.getPlotItem())
+        self.schedule_curve = self.plot_widget.plot(pen={'color': 'g', 'width': 2}, **curve_options(finite=True))
+        # What the furnace is expected to do, from the model learned on its recorded runs
+        self.prediction_curve = self.plot_widget.plot(pen={'color': 'c', 'width': 1, 'style': Qt.DashLine},
+                                                      **curve_options(finite=True))
+        self.time_line = self.plot_widget.addLine(x=0, pen={'color': 'y', 'width': 2, 'style': Qt.DashLine})
+        self.time_line.hide()
+        self.live_traces = None
+        self.live_seq = 0
+        # Redraws are capped at PLOT_MAX_FPS, independent of tick and sample rates
+        self.frame_limiter = FrameLimiter(self.draw_frame, has_new_data=self.live_data_pending, parent=self)
+        self.report_batch = None
 
-        # Set up a timer to update the graph every second
+        # Single-shot timer re-armed for each tick deadline so updates do not drift
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_graph)
-        self.timer.start(1000)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_tick)
+        self.start_ticks()
 
         # Initial update to display the current temperature immediately
         self.update_graph()
@@ -135,7 +196,7 @@ class MainWindow(QWidget):
         else:
             # Fallback to text if icon not found
             options_button.setText("⚙")  # Unicode gear symbol
-            logger.warning(f"Gear icon not found at: {icon_path}")
+            logger.warning("Gear icon not found at: %s", icon_path)
         
         options_button.setIconSize(QSize(24, 24))
         options_button.setFixedSize(32, 32)
@@ -188,7 +249,7 @@ class MainWindow(QWidget):
         
         # Set up combo box items and connection
         schedules = DatabaseManager.fetch_all_schedules()
-        print(f"Available schedules: {schedules}")  # Debug print
+        logger.debug("Available schedules: %s", schedules)
         self.combo.addItems(schedules)
         self.combo.insertSeparator(len(schedules))
         self.combo.addItem("Add Schedule")
@@ -312,13 +373,14 @@ class MainWindow(QWidget):
     def write_start_cycle_time(self, time=None):
         """Write time to start_cycle_time.txt."""
         try:
-            time_to_write = time if time else datetime.now()
+            time_to_write = time if time else self.cycle_clock.clock.now()
             with open(self.start_time_file, 'w') as f:
                 f.write(time_to_write.isoformat())
             self.start_cycle_time = time_to_write
-            logger.debug(f"Wrote start cycle time: {time_to_write}")
+            self.cycle_clock.start(time_to_write)
+            logger.debug("Wrote start cycle time: %s", time_to_write)
         except Exception as e:
-            logger.error(f"Error writing start cycle time: {e}")
+            logger.error("Error writing start cycle time: %s", e)
 
     def get_start_cycle_time(self):
         if self.start_cycle_time is None:
@@ -326,65 +388,132 @@ class MainWindow(QWidget):
                 with open(self.start_time_file, 'r') as f:
                     self.start_cycle_time = datetime.fromisoformat(f.read().strip())
             except FileNotFoundError:
-                self.start_cycle_time = datetime.now()
+                self.start_cycle_time = self.cycle_clock.clock.now()
         return self.start_cycle_time
 
-    def update_graph(self):
+    def start_ticks(self):
+        """Arm the update timer on tick boundaries counted from cycle start."""
+        self.cycle_running = True
+        self.tick_scheduler.reset(self.cycle_clock.origin)
+        self.timer.start(self.tick_scheduler.delay_ms())
+
+    def on_tick(self):
+        """Run every tick that is due, filling in samples for ticks missed under load."""
+        deadlines = self.tick_scheduler.due()
+        if deadlines:
+            if self.run_recorder:
+                for deadline in deadlines[:-1]:
+                    self.sample_tick(self.cycle_clock.elapsed_at(deadline), deadline)
+            self.update_graph(self.cycle_clock.elapsed_at(deadlines[-1]))
+        self.timer.start(self.tick_scheduler.delay_ms())
+
+    @timed('tick.total')
+    def update_graph(self, elapsed_seconds=None):
         """Update the graph with current temperature and schedule."""
         try:
             # Update current time display
-            current_time = datetime.now()
+            current_time = self.cycle_clock.clock.now()
             self.currentTimeDisplay.setText(f"Current: {current_time.strftime('%I:%M:%S %p')}")
             
-            # Clear the plot
-            self.plot_widget.clear()
-            
             if self.current_schedule and self.start_cycle_time:
-                # Plot schedule
-                x_data = []
-                y_data = []
-                current_time_minutes = 0
-                
-                # Plot schedule data
-                for cycle in self.current_schedule:
-                    cycle_time_minutes = self.time_to_minutes(cycle['CycleTime'])
-                    x_data.extend([current_time_minutes, current_time_minutes + cycle_time_minutes])
-                    y_data.extend([cycle['StartTemp'], cycle['EndTemp']])
-                    current_time_minutes += cycle_time_minutes
+                with timer('tick.plot'):
+                    # The schedule curve is only redrawn on load; the next frame
+                    # moves the current time line
+                    if elapsed_seconds is None:
+                        elapsed_seconds = self.cycle_clock.elapsed_seconds()
+                    profile_minutes, setpoint, measured = self.sample_tick(elapsed_seconds)
+                    self.plot_minutes = profile_minutes
+                    self.frame_limiter.request()
                 
-                # Plot the schedule line
-                self.plot_widget.plot(x_data, y_data, pen={'color': 'g', 'width': 2})
+                if self.cycle_running:
+                    with timer('tick.eta'):
+                        remaining = self.eta.update(elapsed_seconds / 60, profile_minutes, measured)
+                        self.show_end_time(self.cycle_clock.wall_time_at(elapsed_seconds + remaining * 60))
                 
-                # Add vertical line for current time if cycle has started
-                if self.start_cycle_time:
-                    elapsed_minutes = (current_time - self.start_cycle_time).total_seconds() / 60
-                    self.plot_widget.addLine(x=elapsed_minutes, pen={'color': 'y', 'width': 2, 'style': Qt.DashLine})
+                # Update temperature display, measured when thermocouples are connected
+                with timer('tick.temperature'):
+                    current_temp = measured if measured is not None else setpoint
+                    if current_temp is not None:
+                        self.temp_display.setText(f"{current_temp:.1f}°C")
                 
-                # Update temperature display
-                current_temp = self.get_current_temperature(elapsed_minutes)
-                if current_temp is not None:
-                    self.temp_display.setText(f"{current_temp:.1f}°C")
+            else:
+                self.plot_minutes = None
+                self.frame_limiter.request()
                 
         except Exception as e:
-            logger.error(f"Error updating graph: {e}")
+            logger.error("Error updating graph: %s", e)
+
+    def show_end_time(self, end_time, force=False):
+        """Show the estimated end time, unless it moved less than the display hysteresis."""
+        if (force or self.shown_end_time is None
+                or abs((end_time - self.shown_end_time).total_seconds()) >= ETA_DISPLAY_HYSTERESIS_SECONDS):
+            self.shown_end_time = end_time
+            self.endTimeDisplay.setText(f"End: {end_time.strftime('%I:%M:%S %p')}")
+
+    def update_eta(self):
+        """Rebuild the end time estimator for the loaded schedule and learned model.
+
+        Guaranteed soaks only wait when the furnace is measured; without
+        thermocouples profile time never stops.
+        """
+        self.eta = EtaEstimator(self.profile, self.thermal_model, holds_wait=self.acquisition is not None)
+
+    def plot_schedule(self):
+        """Draw the loaded schedule, with repeat blocks expanded and curved ramps sampled."""
+        self.schedule_curve.setData(*self.profile.breakpoints())
+        if self.thermal_model is not None and len(self.profile):
+            self.prediction_curve.setData(*self.thermal_model.predict(self.profile))
+        else:
+            self.prediction_curve.setData([], [])
+
+    def draw_frame(self):
+        """Bring the plot up to date with the latest tick and samples."""
+        if self.plot_minutes is None:
+            self.time_line.hide()
+        else:
+            self.time_line.setValue(self.plot_minutes)
+            self.time_line.show()
+        if self.live_traces:
+            self.update_live_traces()
+
+    def live_data_pending(self) -> bool:
+        return self.live_traces is not None and self.acquisition.ring.written != self.live_seq
+
+    def update_live_traces(self):
+        """Move new thermocouple samples onto the plot, placed at profile time."""
+        self.live_seq, times, values = self.acquisition.ring.since(self.live_seq)
+        if len(times) and self.cycle_clock.origin is not None:
+            minutes = (times - self.cycle_clock.origin) / 60 - self.hold_tracker.held_minutes
+            self.live_traces.extend(minutes, values)
+        self.live_traces.refresh()
+
+    def sample_tick(self, elapsed_seconds, deadline=None):
+        """Take one tick's sample: measured temperature, profile time and setpoint.
+
+        Profile time stands still while a guaranteed soak waits for the
+        furnace, and a running cycle records the sample and checks alarms.
+
+        Args:
+            deadline: Monotonic time of a missed tick to look the measurement up at
+
+        Returns:
+            (profile minutes, setpoint or None, measured temperature or None)
+        """
+        measured = self.acquisition.temperature(deadline) if self.acquisition else None
+        profile_minutes = self.hold_tracker.update(elapsed_seconds / 60, measured)
+        setpoint = self.get_current_temperature(profile_minutes)
+        self.setpoint = setpoint
+        if setpoint is not None and self.run_recorder:
+            with timer('tick.record'):
+                self.run_recorder.record(elapsed_seconds, setpoint, math.nan if measured is None else measured)
+                if self.acquisition:
+                    self.alarm_engine.evaluate(self.run_recorder.furnace_id, elapsed_seconds, setpoint, measured,
+                                               profile_minutes * 60)
+        return profile_minutes, setpoint, measured
 
     def get_current_temperature(self, elapsed_time):
-        """Get the current temperature based on elapsed time."""
-        if not self.current_schedule:
-            return None
-        
-        current_time = 0
-        for cycle in self.current_schedule:
-            cycle_time = self.time_to_minutes(cycle['CycleTime'])
-            if current_time <= elapsed_time <= (current_time + cycle_time):
-                # Calculate progress through current cycle
-                cycle_progress = (elapsed_time - current_time) / cycle_time
-                start_temp = cycle['StartTemp']
-                end_temp = cycle['EndTemp']
-                # Linear interpolation
-                return start_temp + (end_temp - start_temp) * cycle_progress
-            current_time += cycle_time
-        return None
+        """Get the current temperature (minutes into the cycle), or None outside the schedule."""
+        return self.profile.temperature_at(elapsed_time)
 
     def time_to_minutes(self, time_str):
         """Convert HH:MM:SS to minutes."""
@@ -392,13 +521,13 @@ class MainWindow(QWidget):
             h, m, s = map(int, time_str.split(':'))
             return h * 60 + m + s / 60
         except Exception as e:
-            print(f"Error converting time: {e}")
+            logger.warning("Error converting time %r: %s", time_str, e)
             return 0
 
     def on_table_select(self):
         """Handle schedule selection from combo box."""
         selected_table = self.combo.currentText()
-        logger.debug(f"on_table_select called with: {selected_table}")
+        logger.debug("on_table_select called with: %s", selected_table)
         
         if selected_table == "Add Schedule":
             try:
@@ -411,10 +540,10 @@ class MainWindow(QWidget):
                 else:
                     logger.debug("Schedule window cancelled")
             except Exception as e:
-                logger.error(f"Error in on_table_select: {e}", exc_info=True)
+                logger.error("Error in on_table_select: %s", e, exc_info=True)
                 QMessageBox.critical(self, "Error", f"Failed to open schedule window: {str(e)}")
         else:
-            logger.debug(f"Loading existing schedule: {selected_table}")
+            logger.debug("Loading existing schedule: %s", selected_table)
             self.load_schedule(selected_table)
 
     def show_context_menu(self, position):
@@ -425,6 +554,8 @@ class MainWindow(QWidget):
         if current_text and current_text != "Add Schedule":
             # Add all actions in the simple, working style
             show_code_action = menu.addAction("Show Code")
+            replay_action = menu.addAction("Replay Run...")
+            compare_action = menu.addAction("Compare Runs...")
             edit_action = menu.addAction("Edit")
             delete_action = menu.addAction("Delete")
             
@@ -432,6 +563,10 @@ class MainWindow(QWidget):
             
             if action == show_code_action:
                 self.show_furnace_commands(current_text)
+            elif action == replay_action:
+                self.show_run_replay(current_text)
+            elif action == compare_action:
+                self.show_run_comparison(current_text)
             elif action == edit_action:
                 self.edit_schedule()
             elif action == delete_action:
@@ -448,11 +583,11 @@ class MainWindow(QWidget):
     def edit_schedule(self):
         """Edit the currently selected schedule."""
         schedule_name = self.combo.currentText()
-        logger.debug(f"edit_schedule called for: {schedule_name}")
+        logger.debug("edit_schedule called for: %s", schedule_name)
         
         if schedule_name and schedule_name != "Add Schedule":
             try:
-                logger.debug(f"Opening schedule_window in Edit mode for: {schedule_name}")
+                logger.debug("Opening schedule_window in Edit mode for: %s", schedule_name)
                 self.schedule_window = schedule_window(self, schedule_name)
                 
                 if self.schedule_window.exec_():
@@ -464,7 +599,7 @@ class MainWindow(QWidget):
                     logger.debug("Schedule edit cancelled")
                     
             except Exception as e:
-                logger.error(f"Exception in edit_schedule: {str(e)}", exc_info=True)
+                logger.error("Exception in edit_schedule: %s", e, exc_info=True)
                 QMessageBox.critical(self, "Error", f"Failed to edit schedule: {str(e)}")
 
     def show_options(self):
@@ -489,34 +624,32 @@ class MainWindow(QWidget):
         self.plot_widget.getAxis('bottom').setPen(theme['grid'])
         self.plot_widget.getAxis('left').setPen(theme['grid'])
 
+    @timed('ui.load_schedule')
     def load_schedule(self, schedule_name):
         """Load a schedule and show its graph."""
         try:
             self.current_schedule = []
+            self.profile = ScheduleProfile([])
+            self.plot_schedule()
             data = DatabaseManager.load_schedule(schedule_name)
             if data:
-                for row in data:
-                    logger.debug(f"Processing row: {row}")
-                    cycle = {
-                        'CycleType': row['CycleType'],
-                        'StartTemp': float(row['StartTemp']),
-                        'EndTemp': float(row['EndTemp']),
-                        'CycleTime': row['CycleTime']
-                    }
-                    logger.debug(f"Created cycle: {cycle}")
-                    self.current_schedule.append(cycle)
+                self.current_schedule = data
+                # Expands repeat blocks and rate-based ramps once, so lookups are O(log n)
+                self.profile = ScheduleProfile(self.current_schedule)
+                self.hold_tracker = HoldTracker(self.profile)
+                self.update_eta()
+                self.plot_schedule()
                 
                 logger.debug("Getting start cycle time")
                 self.start_cycle_time = self.get_start_cycle_time()
-                logger.debug(f"Start cycle time: {self.start_cycle_time}")
+                logger.debug("Start cycle time: %s", self.start_cycle_time)
                 
                 # Initialize time displays with AM/PM format
                 if self.start_cycle_time:
                     self.startTimeDisplay.setText(f"Start: {self.start_cycle_time.strftime('%I:%M:%S %p')}")
-                    total_minutes = sum(self.time_to_minutes(cycle['CycleTime']) for cycle in self.current_schedule)
-                    end_time = self.start_cycle_time + timedelta(minutes=total_minutes)
-                    self.endTimeDisplay.setText(f"End: {end_time.strftime('%I:%M:%S %p')}")
-                    self.currentTimeDisplay.setText(f"Current: {datetime.now().strftime('%I:%M:%S %p')}")
+                    end_time = self.start_cycle_time + timedelta(minutes=self.eta.initial_minutes())
+                    self.show_end_time(end_time, force=True)
+                    self.currentTimeDisplay.setText(f"Current: {self.cycle_clock.clock.now().strftime('%I:%M:%S %p')}")
                 
                 logger.debug("Updating graph")
                 self.update_graph()
@@ -524,7 +657,7 @@ class MainWindow(QWidget):
                 return True
             return False
         except Exception as e:
-            logger.error(f"Error loading schedule: {e}")
+            logger.error("Error loading schedule: %s", e)
             return False
 
     def setup_schedule_selector(self):
@@ -543,7 +676,7 @@ class MainWindow(QWidget):
                 self.schedule_window = schedule_window(self)  # Create new window
                 self.schedule_window.exec_()  # Show modal dialog
             except Exception as e:
-                logger.error(f"Failed to open schedule window: {e}")
+                logger.error("Failed to open schedule window: %s", e)
                 QMessageBox.critical(self, "Error", f"Failed to open schedule window: {str(e)}")
 
     def show_message(self, title: str, message: str, icon=QMessageBox.Information):
@@ -568,32 +701,38 @@ class MainWindow(QWidget):
             with open(self.start_time_file, 'r') as f:
                 return datetime.fromisoformat(f.read().strip())
         except (FileNotFoundError, ValueError) as e:
-            logger.debug(f"Error reading start time: {e}")
+            logger.debug("Error reading start time: %s", e)
             # Create file with current time if it doesn't exist
-            current_time = datetime.now()
+            current_time = self.cycle_clock.clock.now()
             self.write_start_cycle_time(current_time)
             return current_time
 
     def on_start_button_clicked(self):
         """Handle start button click."""
-        if not self.timer.isActive():
+        if not self.cycle_running:
             # Write new time and update start_cycle_time
-            current_time = datetime.now()
+            current_time = self.cycle_clock.clock.now()
             self.write_start_cycle_time(current_time)
+            self.hold_tracker.reset()
+            self.eta.reset()
+            if self.live_traces:
+                self.live_traces.clear()
             
             # Update start time display
             self.startTimeDisplay.setText(f"Start: {current_time.strftime('%I:%M:%S %p')}")
             
             # Calculate and update end time display
             if self.current_schedule:
-                total_minutes = sum(self.time_to_minutes(cycle['CycleTime']) for cycle in self.current_schedule)
-                end_time = current_time + timedelta(minutes=total_minutes)
-                self.endTimeDisplay.setText(f"End: {end_time.strftime('%I:%M:%S %p')}")
+                end_time = current_time + timedelta(minutes=self.eta.initial_minutes())
+                self.show_end_time(end_time, force=True)
             
-            self.timer.start(PLOT_UPDATE_INTERVAL)
+            self.start_ticks()
             self.start_button.setText("Stop Cycle")
+            self.start_run_recording()
         else:
+            self.cycle_running = False
             self.timer.stop()
+            self.stop_run_recording()
             self.start_button.setText("Start Cycle")
             self.reset_displays()
 
@@ -609,47 +748,281 @@ class MainWindow(QWidget):
         else:  # Running from source
             return os.path.abspath(os.path.dirname(__file__))
 
-    def update_display(self):
-        """Update the display (called by timer)."""
-        if self.timer.isActive():
-            current_time = datetime.now()
-            self.currentTimeDisplay.setText(f"Current: {current_time.strftime('%I:%M:%S %p')}")
-            self.update_graph()
-            self.update_temperature()
-
     def reset_displays(self):
         """Reset all displays to default state."""
         self.startTimeDisplay.setText("Start: --:--:--")
         self.currentTimeDisplay.setText("Current: --:--:--")
         self.endTimeDisplay.setText("End: --:--:--")
+        self.shown_end_time = None
         self.temp_display.setText("--°C")
+        self.plot_minutes = None
+        self.frame_limiter.request()
 
     def show_furnace_commands(self, schedule_name):
         """Show the furnace commands window."""
         if self.current_schedule:
-            dialog = FurnaceCommandsWindow(self, self.current_schedule)
+            # The controller has no repeat or rate segments, so send it the expanded profile
+            try:
+                dialog = FurnaceCommandsWindow(self, self.profile.expanded_cycles(), schedule_name)
+            except ValueError as e:  # the configured controller dialect cannot be loaded
+                logger.error("Error opening furnace commands: %s", e)
+                self.show_message("Furnace Commands", str(e), QMessageBox.Warning)
+                return
+            dialog.exec_()
+
+    def start_run_recording(self):
+        """Start recording the cycle so it can be replayed later."""
+        self.stop_run_recording()
+        schedule_name = self.combo.currentText()
+        if self.current_schedule and schedule_name and schedule_name != "Add Schedule":
+            self.run_recorder = RunRecorder(schedule_name)
+            set_log_context(self.run_recorder.furnace_id, self.run_recorder.run_id)
+            if self.acquisition:
+                self.alarm_engine.set_rules(self.run_recorder.furnace_id, default_rules(self.profile),
+                                            self.run_recorder.run_id)
+
+    def stop_run_recording(self):
+        if self.run_recorder:
+            furnace_id = self.run_recorder.furnace_id
+            self.alarm_engine.remove_furnace(furnace_id)
+            self.run_recorder.finish()
+            self.run_recorder = None
+            set_log_context()
+            self.update_thermal_model(furnace_id)
+            self.update_eta()
+            self.plot_schedule()
+
+    def show_run_replay(self, schedule_name):
+        """Let the user pick a recorded run of the schedule and replay it."""
+        runs = DatabaseManager.fetch_runs(schedule_name)
+        if not runs:
+            self.show_message("Replay", f"No recorded runs for {schedule_name}")
+            return
+        labels = [f"#{run['Id']} - {run['StartedAt']}" for run in runs]
+        label, ok = QInputDialog.getItem(self, "Replay Run", "Select run:", labels, 0, False)
+        if ok and label:
+            dialog = ReplayWindow(self, runs[labels.index(label)])
+            dialog.exec_()
+
+    def show_run_comparison(self, schedule_name):
+        """Overlay all recorded runs of the schedule on the schedule itself."""
+        data = DatabaseManager.load_schedule(schedule_name)
+        runs = [run for run in DatabaseManager.fetch_runs(schedule_name) if run['SampleFile']]
+        if not data or not runs:
+            self.show_message("Compare Runs", f"No recorded runs for {schedule_name}")
+            return
+        try:
+            dialog = CompareWindow(self, schedule_name, ScheduleProfile(data), runs)
             dialog.exec_()
+        except Exception as e:
+            logger.error("Error comparing runs: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to compare runs: {str(e)}")
+
+    def export_setpoint_table(self, schedule_name):
+        """Sample the schedule on a fine time grid and save it for PLCs or analysis."""
+        data = DatabaseManager.load_schedule(schedule_name)
+        if not data:
+            self.show_message("Export Setpoints", f"No schedule found with name: {schedule_name}")
+            return
+        labels = [f"{step:g} s" for step in SETPOINT_EXPORT_STEPS]
+        label, ok = QInputDialog.getItem(self, "Export Setpoints", "Resolution:", labels, 0, False)
+        if not ok:
+            return
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Setpoints", f"{schedule_name}_setpoints.csv",
+            "CSV (*.csv);;NumPy (*.npy);;Parquet (*.parquet)")
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += selected_filter[selected_filter.index('*') + 1:-1]
+        try:
+            rows, _ = export_setpoints(ScheduleProfile(data), path, SETPOINT_EXPORT_STEPS[labels.index(label)])
+            self.show_message("Export Setpoints", f"Exported {rows} setpoints to {path}")
+        except Exception as e:
+            logger.error("Error exporting setpoints: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to export setpoints: {str(e)}")
+
+    def export_plot_image(self, schedule_name):
+        """Render the schedule offscreen to a PNG, with the live traces if it is the running one."""
+        data = DatabaseManager.load_schedule(schedule_name)
+        if not data:
+            self.show_message("Export Plot Image", f"No schedule found with name: {schedule_name}")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Plot Image", f"{schedule_name}.png", "PNG (*.png)")
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += '.png'
+        measured = None
+        if self.live_traces and schedule_name == self.combo.currentText():
+            minutes = self.live_traces.minutes.view()[0]
+            measured = [(minutes, values) for values in self.live_traces.values.view()]
+        try:
+            render_profile_png(path, *ScheduleProfile(data).breakpoints(), measured=measured, title=schedule_name)
+            self.show_message("Export Plot Image", f"Saved plot to {path}")
+        except Exception as e:
+            logger.error("Error exporting plot image: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to export plot image: {str(e)}")
+
+    def generate_reports(self, schedule_name):
+        """Render reports of the schedule and each of its recorded runs in background processes."""
+        if self.report_batch is not None:
+            self.show_message("Generate Reports", "Reports are already being generated")
+            return
+        if not DatabaseManager.load_schedule(schedule_name):
+            self.show_message("Generate Reports", f"No schedule found with name: {schedule_name}")
+            return
+        fmt, ok = QInputDialog.getItem(self, "Generate Reports", "Format:",
+                                       [fmt.upper() for fmt in REPORT_FORMATS], 0, False)
+        if not ok:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "Generate Reports")
+        if not output_dir:
+            return
+        jobs = [ReportJob(None, schedule_name)] + run_jobs(schedule_name)
+        try:
+            self.report_batch = ReportBatch(jobs, output_dir, fmt.lower())
+        except Exception as e:
+            logger.error("Error starting reports: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to start reports: {str(e)}")
+            return
+        self.report_progress = QProgressDialog("Generating reports...", "Cancel", 0, len(jobs), self)
+        self.report_progress.setWindowTitle("Generate Reports")
+        self.report_progress.canceled.connect(self.cancel_reports)
+        self.report_progress.show()
+        self.report_timer = QTimer(self)
+        self.report_timer.timeout.connect(lambda: self.poll_reports(output_dir))
+        self.report_timer.start(REPORT_POLL_INTERVAL_MS)
+
+    def poll_reports(self, output_dir):
+        batch = self.report_batch
+        if batch is None:
+            return
+        batch.collect()
+        self.report_progress.setValue(len(batch.results))
+        if not batch.done:
+            return
+        self.finish_reports()
+        failed = [result for result in batch.results if result.error]
+        message = f"Wrote {len(batch.results) - len(failed)} of {batch.total} reports to {output_dir}"
+        if failed:
+            message += "\n\nFailed:\n" + "\n".join(
+                f"{'Run ' + str(result.job.run_id) if result.job.run_id is not None else result.job.schedule_name}: "
+                f"{result.error}" for result in failed)
+        self.show_message("Generate Reports", message)
+
+    def cancel_reports(self):
+        if self.report_batch is not None:
+            self.report_batch.close(cancel=True)
+            self.report_batch = None
+            self.finish_reports()
+
+    def finish_reports(self):
+        self.report_timer.stop()
+        self.report_progress.canceled.disconnect(self.cancel_reports)
+        self.report_progress.close()
+        if self.report_batch is not None:
+            self.report_batch.close()
+            self.report_batch = None
+
+    def setup_instrumentation(self):
+        """Hook up timing collection, the F12 overlay and metrics export.
+
+        Collection is off unless SMARTFURNACE_METRICS=1 or the overlay is opened,
+        and SMARTFURNACE_METRICS_PORT additionally serves /metrics over HTTP.
+        """
+        instrumentation.register_gauge('queue.log', log_queue_depth)
+        instrumentation.register_gauge('queue.run_samples',
+                                       lambda: self.run_recorder.pending if self.run_recorder else 0)
+        if os.environ.get(METRICS_ENV_VAR) == '1':
+            instrumentation.set_enabled(True)
+
+        self.perf_overlay = PerfOverlay(self.plot_widget)
+        self.perf_overlay.move(8, 8)
+        toggle = QShortcut(QKeySequence(Qt.Key_F12), self)
+        toggle.activated.connect(lambda: self.perf_overlay.set_visible(self.perf_overlay.isHidden()))
+
+        self.metrics_file = os.path.join(self.app_data_dir, METRICS_FILE_NAME)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.export_metrics)
+        self.metrics_timer.start(METRICS_EXPORT_INTERVAL_MS)
+
+        port = os.environ.get(METRICS_PORT_ENV_VAR)
+        if port:
+            try:
+                instrumentation.set_enabled(True)
+                instrumentation.start_metrics_server(int(port))
+            except ValueError:
+                logger.error("Invalid metrics port: %s", port)
+
+    def update_thermal_model(self, furnace_id='default'):
+        """Fold finished runs into the furnace's learned model; only runs not seen before are read."""
+        try:
+            _, self.thermal_model = update_fit(furnace_id)
+        except Exception as e:
+            logger.error("Error fitting the thermal model: %s", e, exc_info=True)
+
+    def setup_acquisition(self):
+        """Start reading thermocouples if SMARTFURNACE_ACQUISITION names a driver.
+
+        Without it the display shows the setpoint, as it always has. The
+        simulated driver follows the current setpoint.
+        """
+        spec = os.environ.get(ACQ_ENV_VAR)
+        if not spec:
+            return
+        try:
+            driver = driver_from_spec(spec, source=lambda: self.setpoint)
+            calibration_file = os.environ.get(ACQ_CALIBRATION_ENV_VAR)
+            calibration = Calibration.load(calibration_file, driver.channels) if calibration_file else None
+        except (ValueError, OSError) as e:
+            logger.error("Invalid acquisition settings %r: %s", spec, e)
+            return
+        self.acquisition = Acquisition(driver, calibration=calibration, clock=self.cycle_clock.clock)
+        self.live_traces = LiveTraces(self.plot_widget.getPlotItem(), driver.channels)
+        instrumentation.register_gauge('acquisition.overruns', lambda: self.acquisition.overruns)
+        instrumentation.register_gauge('acquisition.errors', lambda: self.acquisition.errors)
+        self.acquisition.start()
+
+    def export_metrics(self):
+        """Write the Prometheus text file while instrumentation is on."""
+        if instrumentation.is_enabled():
+            instrumentation.write_prometheus_file(self.metrics_file)
+
+    def closeEvent(self, event):
+        if self.acquisition:
+            self.acquisition.stop()
+        self.stop_run_recording()
+        self.alarm_engine.close()
+        self.cancel_reports()
+        self.export_metrics()
+        super().closeEvent(event)
 
 def fetch_schedule_data(table_name):
     try:
-        conn = sqlite3.connect('SmartFurnace.db')
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT CycleType, StartTemp, EndTemp, CycleTime, Notes FROM {table_name}")
-        schedule_data = cursor.fetchall()
-        conn.close()
-        return schedule_data
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT CycleType, StartTemp, EndTemp, CycleTime, Notes FROM {table_name}")
+            return cursor.fetchall()
     except sqlite3.OperationalError as e:
-        print(f"Error fetching schedule data: {e}")
+        logger.error("Error fetching schedule data: %s", e)
         return []
 
-# Initialize the QApplication instance
-app = QApplication(sys.argv)
+if __name__ == '__main__':
+    # Report workers are spawned processes that import this module; they must not start the app
+    multiprocessing.freeze_support()
+
+    # Route logging through the background writer before anything logs
+    setup_logging()
+
+    # Initialize the QApplication instance
+    app = QApplication(sys.argv)
 
-# Initialize database
-DatabaseManager.initialize_database()
+    # Initialize database
+    DatabaseManager.initialize_database()
 
-# Create and show the main window
-window = MainWindow()
-window.show()
+    # Create and show the main window
+    window = MainWindow()
+    window.show()
 
-sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
\ No newline at end of file
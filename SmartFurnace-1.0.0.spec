@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['schedule_window', 'database', 'custom_combobox', 'constants', 'styles'],
+    hiddenimports=['schedule_window', 'database', 'custom_combobox', 'constants', 'styles', 'dialects'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
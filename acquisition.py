@@ -0,0 +1,585 @@
+import json
+import logging
+import math
+import socket
+import struct
+import threading
+import time
+import warnings
+from typing import Callable, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from constants import (ACQ_RATE_HZ, ACQ_CHANNELS, ACQ_BUFFER_SECONDS, ACQ_FILTER_WINDOW,
+                       ACQ_OUTLIER_LIMIT, ACQ_STALE_SECONDS, ACQ_TIMEOUT_SECONDS,
+                       ACQ_REOPEN_SECONDS, ACQ_SIMULATED_TAU_SECONDS, ACQ_SIMULATED_NOISE,
+                       ACQ_SIMULATED_SPIKE_PROBABILITY, DEFAULT_TEMP)
+from cycle_clock import SystemClock
+from instrumentation import timer
+from plugins import transports
+from runs import RunReader
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionDriver:
+    """Reads every thermocouple channel of one furnace in a single request.
+
+    read() returns raw temperatures in °C, one per channel, with NaN for
+    channels that gave no reading (open thermocouple, bad token). A request
+    that fails as a whole raises OSError or ValueError.
+    """
+
+    channels = ACQ_CHANNELS
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self) -> np.ndarray:
+        raise NotImplementedError
+
+
+def _parse_float(token: str) -> float:
+    try:
+        return float(token)
+    except ValueError:
+        return math.nan
+
+
+class SerialAsciiDriver(AcquisitionDriver):
+    """Multi-channel readers answering a text query with one line of comma-separated values.
+
+    Needs pyserial, which is only imported when the port is opened.
+    """
+
+    def __init__(self, port: str, channels: int = ACQ_CHANNELS, baudrate: int = 9600,
+                 query: str = 'READ? 1-{channels}\r', timeout: float = ACQ_TIMEOUT_SECONDS):
+        self.port = port
+        self.channels = channels
+        self.baudrate = baudrate
+        self.query = query.format(channels=channels).encode('ascii')
+        self.timeout = timeout
+        self._serial = None
+
+    def open(self):
+        import serial
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def read(self) -> np.ndarray:
+        self._serial.reset_input_buffer()
+        self._serial.write(self.query)
+        line = self._serial.readline()
+        if not line.endswith(b'\n'):
+            raise TimeoutError(f"No reply from {self.port}")
+        tokens = line.decode('ascii', 'replace').strip().split(',')
+        values = np.full(self.channels, np.nan)
+        values[:len(tokens)] = [_parse_float(token) for token in tokens[:self.channels]]
+        return values
+
+
+class ModbusDriver(AcquisitionDriver):
+    """Reads one input register per channel with a single Modbus function 4 request.
+
+    Registers hold signed tenths of a degree by default; the values
+    +/-32767/-32768 that modules report for a broken thermocouple read as NaN.
+    """
+
+    READ_INPUT_REGISTERS = 4
+
+    def __init__(self, unit: int = 1, register: int = 0, channels: int = ACQ_CHANNELS,
+                 scale: float = 0.1, signed: bool = True, timeout: float = ACQ_TIMEOUT_SECONDS):
+        self.unit = unit
+        self.register = register
+        self.channels = channels
+        self.scale = scale
+        self.dtype = '>i2' if signed else '>u2'
+        self.timeout = timeout
+
+    def request_pdu(self) -> bytes:
+        return struct.pack('>BHH', self.READ_INPUT_REGISTERS, self.register, self.channels)
+
+    def decode(self, pdu: bytes) -> np.ndarray:
+        if pdu[0] & 0x80:
+            raise ValueError(f"Modbus exception {pdu[1] if len(pdu) > 1 else '?'} from unit {self.unit}")
+        count = pdu[1]
+        if count != 2 * self.channels or len(pdu) < 2 + count:
+            raise ValueError(f"Modbus reply has {count} bytes, expected {2 * self.channels}")
+        registers = np.frombuffer(pdu, dtype=self.dtype, count=self.channels, offset=2)
+        values = registers * self.scale
+        values[np.isin(registers, (-32768, 32767)) if self.dtype == '>i2' else registers == 0xFFFF] = np.nan
+        return values
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the device")
+        data += chunk
+    return bytes(data)
+
+
+class ModbusTcpDriver(ModbusDriver):
+    """Modbus over TCP with the standard library's sockets."""
+
+    def __init__(self, host: str, port: int = 502, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self._socket = None
+        self._transaction = 0
+
+    def open(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def read(self) -> np.ndarray:
+        self._transaction = (self._transaction + 1) & 0xFFFF
+        pdu = self.request_pdu()
+        self._socket.sendall(struct.pack('>HHHB', self._transaction, 0, len(pdu) + 1, self.unit) + pdu)
+        transaction, _, length, _ = struct.unpack('>HHHB', _recv_exact(self._socket, 7))
+        reply = _recv_exact(self._socket, length - 1)
+        if transaction != self._transaction:
+            raise ValueError(f"Modbus reply to transaction {transaction}, expected {self._transaction}")
+        return self.decode(reply)
+
+
+def _crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16(data: bytes) -> int:
+    """Modbus RTU CRC."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+class ModbusRtuDriver(ModbusDriver):
+    """Modbus RTU over a serial line; needs pyserial, imported when the port is opened."""
+
+    def __init__(self, port: str, baudrate: int = 9600, **kwargs):
+        super().__init__(**kwargs)
+        self.port = port
+        self.baudrate = baudrate
+        self._serial = None
+
+    def open(self):
+        import serial
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def read(self) -> np.ndarray:
+        frame = bytes([self.unit]) + self.request_pdu()
+        self._serial.reset_input_buffer()
+        self._serial.write(frame + struct.pack('<H', crc16(frame)))
+        head = self._serial.read(3)
+        if len(head) < 3:
+            raise TimeoutError(f"No reply from unit {self.unit} on {self.port}")
+        rest = self._serial.read(2 if head[1] & 0x80 else head[2] + 2)
+        reply = head + rest
+        if len(reply) < 5 or crc16(reply[:-2]) != struct.unpack('<H', reply[-2:])[0]:
+            raise ValueError(f"Bad Modbus frame from unit {self.unit} on {self.port}")
+        return self.decode(reply[1:-2])
+
+
+class SimulatedDriver(AcquisitionDriver):
+    """Thermocouples lagging behind a source temperature, with offsets, noise and rare spikes.
+
+    The source is usually the current setpoint; None leaves the channels
+    where they are. Each channel follows it as a first-order lag.
+    """
+
+    def __init__(self, source: Callable[[], Optional[float]], channels: int = ACQ_CHANNELS,
+                 tau: float = ACQ_SIMULATED_TAU_SECONDS, noise: float = ACQ_SIMULATED_NOISE,
+                 spike_probability: float = ACQ_SIMULATED_SPIKE_PROBABILITY,
+                 seed: Optional[int] = None):
+        self.source = source
+        self.channels = channels
+        self.tau = tau
+        self.noise = noise
+        self.spike_probability = spike_probability
+        self._rng = np.random.default_rng(seed)
+        # Thermocouples in different spots of the chamber do not read alike
+        self.offsets = self._rng.uniform(-2.0, 2.0, channels)
+        self._state = np.full(channels, float(DEFAULT_TEMP))
+        self._last = None
+
+    def read(self) -> np.ndarray:
+        now = time.monotonic()
+        target = self.source()
+        if target is not None and self._last is not None:
+            alpha = 1.0 - math.exp(-(now - self._last) / self.tau)
+            self._state += (target + self.offsets - self._state) * alpha
+        self._last = now
+        values = self._state + self._rng.normal(0.0, self.noise, self.channels)
+        spikes = self._rng.random(self.channels) < self.spike_probability
+        values[spikes] += self._rng.choice((-1.0, 1.0), spikes.sum()) * 500.0
+        return values
+
+
+class ReplayDriver(AcquisitionDriver):
+    """Plays back recorded readings, one row per read, looping at the end."""
+
+    def __init__(self, samples: np.ndarray, loop: bool = True):
+        samples = np.asarray(samples, dtype=float)
+        self.samples = samples[:, np.newaxis] if samples.ndim == 1 else samples
+        self.channels = self.samples.shape[1]
+        self.loop = loop
+        self._index = 0
+
+    @classmethod
+    def from_run_file(cls, sample_file: str, channels: int = 1, loop: bool = True) -> 'ReplayDriver':
+        """Replay a recorded run's measured temperatures, or its setpoints if nothing was measured."""
+        samples = RunReader(sample_file).samples
+        if not len(samples):
+            raise ValueError(f"No samples in {sample_file}")
+        measured = np.asarray(samples['measured'], dtype=float)
+        if np.isnan(measured).all():
+            measured = np.asarray(samples['setpoint'], dtype=float)
+        return cls(np.repeat(measured[:, np.newaxis], channels, axis=1), loop)
+
+    def read(self) -> np.ndarray:
+        if self._index >= len(self.samples):
+            if not self.loop:
+                return np.full(self.channels, np.nan)
+            self._index = 0
+        row = self.samples[self._index]
+        self._index += 1
+        return row.copy()
+
+
+class Calibration:
+    """Per-channel linear correction, corrected = raw * gain + offset."""
+
+    def __init__(self, channels: int, gain: Optional[Sequence[float]] = None,
+                 offset: Optional[Sequence[float]] = None):
+        self.gain = np.ones(channels) if gain is None else np.asarray(gain, dtype=float)
+        self.offset = np.zeros(channels) if offset is None else np.asarray(offset, dtype=float)
+        if self.gain.shape != (channels,) or self.offset.shape != (channels,):
+            raise ValueError(f"Calibration needs one gain and offset per channel ({channels})")
+
+    @classmethod
+    def load(cls, path: str, channels: int) -> 'Calibration':
+        """From a JSON file like {"gain": [...], "offset": [...]}; either list may be left out."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(channels, data.get('gain'), data.get('offset'))
+
+    def apply(self, raw: np.ndarray) -> np.ndarray:
+        """Correct a (samples, channels) block; NaN stays NaN."""
+        return raw * self.gain + self.offset
+
+
+class ChannelFilter:
+    """Outlier rejection followed by a moving average, over all channels at once.
+
+    A reading further than outlier_limit from the median of the channel's
+    last window readings is dropped as a spike. The output is the mean of
+    the readings kept in the window, so a missing reading is bridged by its
+    neighbours until the whole window is missing.
+    """
+
+    def __init__(self, channels: int, window: int = ACQ_FILTER_WINDOW,
+                 outlier_limit: float = ACQ_OUTLIER_LIMIT):
+        self.channels = channels
+        self.window = window
+        self.outlier_limit = outlier_limit
+        self.reset()
+
+    def reset(self):
+        self._raw = np.full((self.window - 1, self.channels), np.nan)
+        self._kept = np.full((self.window - 1, self.channels), np.nan)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Filter a (samples, channels) block, continuing from the previous block."""
+        raw = np.concatenate((self._raw, block))
+        with warnings.catch_warnings():
+            # All-NaN windows (a dead channel) give NaN, which is what we want
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(sliding_window_view(raw, self.window, axis=0), axis=-1)
+            with np.errstate(invalid='ignore'):
+                kept = np.where(np.abs(block - median) <= self.outlier_limit, block, np.nan)
+            history = np.concatenate((self._kept, kept))
+            filtered = np.nanmean(sliding_window_view(history, self.window, axis=0), axis=-1)
+        self._raw = raw[len(raw) - self.window + 1:]
+        self._kept = history[len(history) - self.window + 1:]
+        return filtered
+
+
+class SampleRing:
+    """Fixed-size buffer of timestamped samples; the oldest are overwritten.
+
+    Samples are numbered from 0 in the order written, so a reader can ask
+    for everything after the last sample it saw.
+    """
+
+    def __init__(self, capacity: int, channels: int):
+        self.capacity = capacity
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, channels), np.nan)
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def extend(self, times: np.ndarray, values: np.ndarray):
+        with self._lock:
+            skipped = max(0, len(times) - self.capacity)
+            positions = (self.written + skipped + np.arange(len(times) - skipped)) % self.capacity
+            self.times[positions] = times[skipped:]
+            self.values[positions] = values[skipped:]
+            self.written += len(times)
+
+    def since(self, seq: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Samples numbered seq and later that are still held.
+
+        Returns:
+            (number to pass next time, times, values)
+        """
+        with self._lock:
+            first = max(seq, self.written - self.capacity)
+            positions = np.arange(first, self.written) % self.capacity
+            return self.written, self.times[positions], self.values[positions]
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        with self._lock:
+            if not self.written:
+                return None
+            position = (self.written - 1) % self.capacity
+            return self.times[position], self.values[position].copy()
+
+    def at(self, timestamp: float) -> Optional[Tuple[float, np.ndarray]]:
+        """The last sample taken at or before a time, by binary search."""
+        with self._lock:
+            low, high = max(0, self.written - self.capacity), self.written
+            while low < high:
+                middle = (low + high) // 2
+                if self.times[middle % self.capacity] <= timestamp:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == max(0, self.written - self.capacity):
+                return None
+            position = (low - 1) % self.capacity
+            return self.times[position], self.values[position].copy()
+
+
+class Acquisition:
+    """Polls one furnace's thermocouples on a background thread.
+
+    Each poll is one batched request for all channels, stamped with the
+    clock's monotonic time when the request went out. Readings are
+    calibrated and filtered as arrays and published to a SampleRing. Polls
+    follow absolute deadlines, so a slow read delays one sample instead of
+    every later one; deadlines missed entirely are counted as overruns.
+    A failing driver is closed and reopened after ACQ_REOPEN_SECONDS, with
+    NaN samples published in the meantime.
+    """
+
+    def __init__(self, driver: AcquisitionDriver, rate_hz: float = ACQ_RATE_HZ,
+                 calibration: Optional[Calibration] = None,
+                 channel_filter: Optional[ChannelFilter] = None,
+                 control_channels: Optional[Sequence[int]] = None, clock=None,
+                 buffer_seconds: float = ACQ_BUFFER_SECONDS, furnace_id: str = 'default'):
+        """
+        Args:
+            control_channels: Channels averaged into the furnace temperature (default all)
+            clock: Provides monotonic() for timestamps, e.g. the cycle clock's
+        """
+        self.driver = driver
+        self.channels = driver.channels
+        self.period = 1.0 / rate_hz
+        self.calibration = calibration or Calibration(self.channels)
+        self.filter = channel_filter or ChannelFilter(self.channels)
+        self.control_channels = list(control_channels) if control_channels else list(range(self.channels))
+        self.clock = clock or SystemClock()
+        self.furnace_id = furnace_id
+        self.ring = SampleRing(max(1, int(buffer_seconds * rate_hz)), self.channels)
+        self.reads = 0
+        self.errors = 0
+        self.overruns = 0
+        self._missing = np.full(self.channels, np.nan)
+        self._opened = False
+        self._failing = False
+        self._reopen_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"acquisition-{self.furnace_id}", daemon=True)
+        self._thread.start()
+        logger.info("Acquisition started for %s: %d channels at %.1f Hz",
+                    self.furnace_id, self.channels, 1.0 / self.period)
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._close()
+        logger.info("Acquisition stopped for %s: %d reads, %d errors, %d overruns",
+                    self.furnace_id, self.reads, self.errors, self.overruns)
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("Acquisition poll failed: %s", e, exc_info=True)
+            deadline += self.period
+            now = time.monotonic()
+            if now - deadline > self.period:
+                missed = int((now - deadline) / self.period)
+                self.overruns += missed
+                deadline += missed * self.period
+            self._stop.wait(max(0.0, deadline - now))
+
+    def _close(self):
+        if self._opened:
+            try:
+                self.driver.close()
+            except OSError as e:
+                logger.debug("Error closing acquisition driver: %s", e)
+            self._opened = False
+
+    def _read(self) -> np.ndarray:
+        try:
+            if not self._opened:
+                if time.monotonic() < self._reopen_at:
+                    return self._missing
+                self.driver.open()
+                self._opened = True
+            with timer('acquisition.read'):
+                raw = self.driver.read()
+        except (OSError, ValueError, ImportError) as e:
+            self.errors += 1
+            if not self._failing:
+                logger.warning("Thermocouple read failed on %s: %s", self.furnace_id, e)
+                self._failing = True
+            self._close()
+            self._reopen_at = time.monotonic() + ACQ_REOPEN_SECONDS
+            return self._missing
+        self.reads += 1
+        if self._failing:
+            logger.info("Thermocouple reads recovered on %s", self.furnace_id)
+            self._failing = False
+        return raw
+
+    def poll(self) -> np.ndarray:
+        """Take, correct and publish one sample of every channel; returns the filtered values."""
+        timestamp = self.clock.monotonic()
+        raw = self._read()
+        with timer('acquisition.filter'):
+            values = self.filter.process(self.calibration.apply(raw[np.newaxis]))
+        self.ring.extend(np.array([timestamp]), values)
+        return values[0]
+
+    def temperature(self, at: Optional[float] = None) -> Optional[float]:
+        """Furnace temperature now, or at a monotonic time, from the filtered control channels.
+
+        None when there is no reading younger than ACQ_STALE_SECONDS.
+        """
+        sample = self.ring.latest() if at is None else self.ring.at(at)
+        if sample is None:
+            return None
+        timestamp, values = sample
+        now = self.clock.monotonic() if at is None else at
+        if (now - timestamp) / getattr(self.clock, 'rate', 1.0) > ACQ_STALE_SECONDS:
+            return None
+        values = values[self.control_channels]
+        values = values[np.isfinite(values)]
+        return float(values.mean()) if len(values) else None
+
+
+def _modbus_options(options: dict, channels: int) -> dict:
+    return {
+        'unit': int(options.get('unit', 1)),
+        'register': int(options.get('register', 0)),
+        'scale': float(options.get('scale', 0.1)),
+        'signed': options.get('signed', '1') not in ('0', 'false', 'no'),
+        'channels': channels,
+    }
+
+
+def simulated_transport(target: str, options: dict, channels: int, source=None) -> AcquisitionDriver:
+    return SimulatedDriver(source or (lambda: None), int(target) if target else channels)
+
+
+def serial_transport(target: str, options: dict, channels: int, source=None) -> AcquisitionDriver:
+    kwargs = {'query': options['query']} if 'query' in options else {}
+    return SerialAsciiDriver(target, channels, int(options.get('baudrate', 9600)), **kwargs)
+
+
+def modbus_tcp_transport(target: str, options: dict, channels: int, source=None) -> AcquisitionDriver:
+    host, _, port = target.rpartition(':') if ':' in target else (target, '', '502')
+    return ModbusTcpDriver(host, int(port), **_modbus_options(options, channels))
+
+
+def modbus_rtu_transport(target: str, options: dict, channels: int, source=None) -> AcquisitionDriver:
+    return ModbusRtuDriver(target, int(options.get('baudrate', 9600)), **_modbus_options(options, channels))
+
+
+def replay_transport(target: str, options: dict, channels: int, source=None) -> AcquisitionDriver:
+    return ReplayDriver.from_run_file(target, channels)
+
+
+def driver_from_spec(spec: str, source: Optional[Callable[[], Optional[float]]] = None) -> AcquisitionDriver:
+    """Build a driver from a spec such as
+
+        simulated:8
+        serial:COM3?channels=8&baudrate=9600
+        modbus-tcp:10.0.0.5:502?unit=1&register=0&channels=8&scale=0.1
+        modbus-rtu:/dev/ttyUSB0?unit=1&baudrate=19200&channels=8
+        replay:runs/run_12.bin?channels=8
+
+    The part before the first colon names a transport plugin; installed
+    packages add their own to the smartfurnace.transports entry points.
+
+    Args:
+        source: Target temperature the simulated driver follows
+
+    Raises:
+        ValueError: for an unknown driver or bad option
+    """
+    kind, _, rest = spec.partition(':')
+    target, _, query = rest.partition('?')
+    options = dict(parse_qsl(query))
+    channels = int(options.pop('channels', ACQ_CHANNELS))
+    return transports.load(kind.strip().lower())(target, options, channels, source)
@@ -0,0 +1,320 @@
+import logging
+import math
+import queue
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from constants import (ALARM_DEVIATION_LIMIT, ALARM_DEVIATION_HOLD_SECONDS,
+                       ALARM_MAX_RAMP_RATE, ALARM_RAMP_WINDOW_SECONDS,
+                       ALARM_SOAK_TOLERANCE, ALARM_SOAK_GRACE_MINUTES,
+                       ALARM_SENSOR_STALE_SECONDS)
+from database import DatabaseManager
+from schedule_profile import ScheduleProfile
+
+logger = logging.getLogger(__name__)
+
+ALARM_RAISED = 'raised'
+ALARM_CLEARED = 'cleared'
+
+AlarmEvent = namedtuple('AlarmEvent', ['furnace_id', 'rule', 'kind', 'state',
+                                       'elapsed_seconds', 'value', 'message'])
+
+
+def _is_valid(measured: Optional[float]) -> bool:
+    return measured is not None and not math.isnan(measured)
+
+
+class AlarmRule:
+    """Base class for streaming alarm rules.
+
+    Each rule keeps a fixed amount of state and sees every sample exactly once,
+    so evaluating it never depends on how long the run has been going.
+    """
+
+    kind = 'rule'
+    profile_time = False  # whether elapsed_seconds is profile time rather than cycle time
+
+    def __init__(self, name: str):
+        self.name = name
+        self.active = False
+
+    def reset(self):
+        self.active = False
+
+    def check(self, elapsed_seconds: float, setpoint: float,
+              measured: Optional[float]) -> Tuple[bool, float]:
+        """Return (violated, value) for one sample."""
+        raise NotImplementedError
+
+    def describe(self, value: float) -> str:
+        return f"{self.name}: {value:.1f}"
+
+    def evaluate(self, elapsed_seconds: float, setpoint: float,
+                 measured: Optional[float]) -> Optional[Tuple[str, float]]:
+        """Feed one sample and return (state, value) if the alarm changed state."""
+        violated, value = self.check(elapsed_seconds, setpoint, measured)
+        if violated == self.active:
+            return None
+        self.active = violated
+        return (ALARM_RAISED if violated else ALARM_CLEARED), value
+
+
+class DeviationRule(AlarmRule):
+    """Raised when |measured - setpoint| stays above a limit for a minimum time."""
+
+    kind = 'deviation'
+
+    def __init__(self, limit: float = ALARM_DEVIATION_LIMIT,
+                 hold_seconds: float = ALARM_DEVIATION_HOLD_SECONDS, name: str = None):
+        super().__init__(name or f"Deviation > {limit:g}°C for {hold_seconds:g}s")
+        self.limit = limit
+        self.hold_seconds = hold_seconds
+        self.exceeded_since = None
+
+    def reset(self):
+        super().reset()
+        self.exceeded_since = None
+
+    def check(self, elapsed_seconds, setpoint, measured):
+        if not _is_valid(measured):
+            return self.active, 0.0
+        deviation = measured - setpoint
+        if abs(deviation) <= self.limit:
+            self.exceeded_since = None
+            return False, deviation
+        if self.exceeded_since is None:
+            self.exceeded_since = elapsed_seconds
+        return elapsed_seconds - self.exceeded_since >= self.hold_seconds, deviation
+
+    def describe(self, value):
+        return f"{self.name}: deviation {value:+.1f}°C"
+
+
+class RampRateRule(AlarmRule):
+    """Raised when the measured rate of change exceeds a limit in °C/min.
+
+    The rate is measured between anchor samples at least window_seconds apart
+    so sensor noise on single samples does not trip it.
+    """
+
+    kind = 'ramp_rate'
+
+    def __init__(self, max_rate: float = ALARM_MAX_RAMP_RATE,
+                 window_seconds: float = ALARM_RAMP_WINDOW_SECONDS, name: str = None):
+        super().__init__(name or f"Ramp rate > {max_rate:g}°C/min")
+        self.max_rate = max_rate
+        self.window_seconds = window_seconds
+        self.anchor_time = None
+        self.anchor_temp = None
+
+    def reset(self):
+        super().reset()
+        self.anchor_time = None
+        self.anchor_temp = None
+
+    def check(self, elapsed_seconds, setpoint, measured):
+        if not _is_valid(measured):
+            return self.active, 0.0
+        if self.anchor_time is None:
+            self.anchor_time = elapsed_seconds
+            self.anchor_temp = measured
+            return False, 0.0
+        span = elapsed_seconds - self.anchor_time
+        if span < self.window_seconds:
+            return self.active, 0.0
+        rate = (measured - self.anchor_temp) / span * 60
+        self.anchor_time = elapsed_seconds
+        self.anchor_temp = measured
+        return abs(rate) > self.max_rate, rate
+
+    def describe(self, value):
+        return f"{self.name}: {value:+.1f}°C/min"
+
+
+class SoakDeadlineRule(AlarmRule):
+    """Raised when a soak temperature has not been reached by a deadline.
+
+    Latches once the temperature is within tolerance after the soak starts,
+    so passing through the target on an earlier ramp does not count and
+    later excursions are left to DeviationRule. Start and deadline are in
+    profile time, which stands still while a guaranteed soak waits for the
+    furnace.
+    """
+
+    kind = 'soak_deadline'
+    profile_time = True
+
+    def __init__(self, target: float, deadline_seconds: float,
+                 tolerance: float = ALARM_SOAK_TOLERANCE, name: str = None, start_seconds: float = 0.0):
+        super().__init__(name or f"Soak {target:g}°C not reached by {deadline_seconds / 60:g} min")
+        self.target = target
+        self.deadline_seconds = deadline_seconds
+        self.start_seconds = start_seconds
+        self.tolerance = tolerance
+        self.reached = False
+
+    def reset(self):
+        super().reset()
+        self.reached = False
+
+    def check(self, elapsed_seconds, setpoint, measured):
+        if self.reached or elapsed_seconds < self.start_seconds:
+            return False, 0.0
+        if _is_valid(measured) and abs(measured - self.target) <= self.tolerance:
+            self.reached = True
+            return False, measured
+        return elapsed_seconds >= self.deadline_seconds, measured if _is_valid(measured) else 0.0
+
+    def describe(self, value):
+        return f"{self.name}: at {value:.1f}°C"
+
+
+class SensorStaleRule(AlarmRule):
+    """Raised when no valid reading has arrived for max_age_seconds."""
+
+    kind = 'sensor_stale'
+
+    def __init__(self, max_age_seconds: float = ALARM_SENSOR_STALE_SECONDS, name: str = None):
+        super().__init__(name or f"Sensor stale > {max_age_seconds:g}s")
+        self.max_age_seconds = max_age_seconds
+        self.last_valid = None
+
+    def reset(self):
+        super().reset()
+        self.last_valid = None
+
+    def check(self, elapsed_seconds, setpoint, measured):
+        if _is_valid(measured):
+            self.last_valid = elapsed_seconds
+            return False, 0.0
+        if self.last_valid is None:
+            self.last_valid = elapsed_seconds
+        age = elapsed_seconds - self.last_valid
+        return age > self.max_age_seconds, age
+
+    def describe(self, value):
+        return f"{self.name}: no reading for {value:.0f}s"
+
+
+def soak_deadline_rules(profile: ScheduleProfile,
+                        grace_minutes: float = ALARM_SOAK_GRACE_MINUTES,
+                        tolerance: float = ALARM_SOAK_TOLERANCE) -> List[SoakDeadlineRule]:
+    """One SoakDeadlineRule per soak segment, due grace_minutes after the soak starts."""
+    rules = []
+    for start, duration, start_temp, end_temp in zip(profile.starts, profile.durations,
+                                                     profile.start_temps, profile.end_temps):
+        if duration > 0 and start_temp == end_temp:
+            rules.append(SoakDeadlineRule(end_temp, (start + grace_minutes) * 60, tolerance,
+                                          start_seconds=start * 60))
+    return rules
+
+
+def default_rules(profile: ScheduleProfile) -> List[AlarmRule]:
+    """The standard rule set for a furnace running the given profile."""
+    return [DeviationRule(), RampRateRule(), SensorStaleRule()] + soak_deadline_rules(profile)
+
+
+class AlarmEventWriter:
+    """Saves alarm events on a background thread, so raising an alarm never waits on the database."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, events: List[AlarmEvent], run_id: Optional[int]):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='alarm-writer', daemon=True)
+            self._thread.start()
+        self._queue.put((events, run_id))
+
+    def flush(self):
+        """Wait until every queued event is saved."""
+        self._queue.join()
+
+    def close(self):
+        """Save what is queued and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                DatabaseManager.save_alarm_events(*item)
+            finally:
+                self._queue.task_done()
+
+
+class AlarmEngine:
+    """Evaluates alarm rules for many furnaces, one sample at a time.
+
+    Only state transitions produce events, and those are handed to a
+    background thread that writes them to the database.
+    """
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self.writer = AlarmEventWriter() if persist else None
+        self.rules: Dict[str, List[AlarmRule]] = {}
+        self.run_ids: Dict[str, Optional[int]] = {}
+
+    def add_rule(self, furnace_id: str, rule: AlarmRule):
+        self.rules.setdefault(furnace_id, []).append(rule)
+
+    def set_rules(self, furnace_id: str, rules: List[AlarmRule], run_id: Optional[int] = None):
+        """Replace the rules for a furnace, e.g. when a new cycle starts."""
+        self.rules[furnace_id] = list(rules)
+        self.run_ids[furnace_id] = run_id
+
+    def remove_furnace(self, furnace_id: str):
+        self.rules.pop(furnace_id, None)
+        self.run_ids.pop(furnace_id, None)
+
+    def reset(self, furnace_id: str):
+        for rule in self.rules.get(furnace_id, ()):
+            rule.reset()
+
+    def active_alarms(self, furnace_id: str) -> List[AlarmRule]:
+        return [rule for rule in self.rules.get(furnace_id, ()) if rule.active]
+
+    def evaluate(self, furnace_id: str, elapsed_seconds: float, setpoint: float,
+                 measured: Optional[float], profile_seconds: Optional[float] = None) -> List[AlarmEvent]:
+        """Feed one sample for a furnace and return any alarm state changes.
+
+        Pass measured=None when a tick passes without a reading so stale
+        sensors are still detected.
+
+        Args:
+            profile_seconds: Time into the profile, behind elapsed_seconds once a guaranteed
+                soak has waited; rules timed against the schedule use it
+        """
+        if profile_seconds is None:
+            profile_seconds = elapsed_seconds
+        events = []
+        for rule in self.rules.get(furnace_id, ()):
+            change = rule.evaluate(profile_seconds if rule.profile_time else elapsed_seconds, setpoint, measured)
+            if change:
+                state, value = change
+                events.append(AlarmEvent(furnace_id, rule.name, rule.kind, state,
+                                         elapsed_seconds, value, rule.describe(value)))
+
+        if events:
+            for event in events:
+                logger.warning("Alarm %s on %s: %s", event.state, furnace_id, event.message)
+            if self.persist:
+                self.writer.put(events, self.run_ids.get(furnace_id))
+        return events
+
+    def flush(self):
+        """Wait until the events raised so far are saved."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
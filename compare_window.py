@@ -0,0 +1,104 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QPushButton, QLabel,
+                             QTableWidget, QTableWidgetItem, QSplitter)
+from PyQt5.QtCore import Qt
+import numpy as np
+import pyqtgraph as pg
+import logging
+
+from styles import get_dialog_style, get_button_style, get_plot_theme
+from run_compare import compare_runs, furnace_drift
+from runs import RunReader
+from constants import COMPARE_MAX_OVERLAYS, REPLAY_MAX_POINTS
+
+logger = logging.getLogger(__name__)
+
+
+class CompareWindow(QDialog):
+    """Overlays recorded runs of a schedule on its golden profile."""
+
+    def __init__(self, parent=None, schedule_name=None, profile=None, runs=None):
+        super().__init__(parent)
+        self.schedule_name = schedule_name
+        self.profile = profile
+        self.runs = runs or []
+        self.result = compare_runs(self.runs, profile)
+        self.setup_ui()
+        self.plot_comparison()
+        self.fill_stats()
+
+    def setup_ui(self):
+        """Set up the user interface."""
+        self.setWindowTitle(f"Compare Runs - {self.schedule_name} ({len(self.runs)} runs)")
+        self.setStyleSheet(get_dialog_style())
+        self.resize(900, 700)
+
+        layout = QVBoxLayout()
+        splitter = QSplitter(Qt.Vertical)
+
+        theme = get_plot_theme()
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground(theme['background'])
+        self.plot_widget.setLabel('left', text='Temperature', units='°C')
+        self.plot_widget.setLabel('bottom', text='Time (min)')
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.5)
+        self.plot_widget.addLegend(offset=(-10, 10))
+        splitter.addWidget(self.plot_widget)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Run", "Furnace", "Started", "RMS Dev (°C)", "Max Dev (°C)"])
+        splitter.addWidget(self.table)
+        layout.addWidget(splitter)
+
+        self.drift_label = QLabel()
+        layout.addWidget(self.drift_label)
+
+        close_button = QPushButton("Close")
+        close_button.setStyleSheet(get_button_style())
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def plot_comparison(self):
+        """Draw the percentile envelope, the median, a few recent runs and the schedule."""
+        theme = get_plot_theme()
+        minutes = self.result.time / 60
+        envelope = self.result.envelope
+
+        if len(self.result.percentiles) >= 2:
+            lower = self.plot_widget.plot(minutes, envelope[0], pen=None, connect='finite')
+            upper = self.plot_widget.plot(minutes, envelope[-1], pen=None, connect='finite')
+            fill = pg.FillBetweenItem(lower, upper, brush=pg.mkBrush(theme['curve'] + '40'))
+            self.plot_widget.addItem(fill)
+        if len(self.result.percentiles) >= 3:
+            middle = len(self.result.percentiles) // 2
+            self.plot_widget.plot(minutes, envelope[middle], pen=pg.mkPen(theme['curve'], width=2),
+                                  name=f"p{self.result.percentiles[middle]:g}", connect='finite')
+
+        # Individual traces are decimated and limited to the most recent runs
+        for run in self.runs[:COMPARE_MAX_OVERLAYS]:
+            if not run['SampleFile']:
+                continue
+            reader = RunReader(run['SampleFile'])
+            samples = reader.window(0, reader.duration + 1, REPLAY_MAX_POINTS // 4)
+            self.plot_widget.plot(samples['elapsed'] / 60, samples['measured'],
+                                  pen=pg.mkPen(theme['grid'], width=1), connect='finite')
+
+        self.plot_widget.plot(*self.profile.breakpoints(), pen=pg.mkPen('g', width=2), name="Schedule")
+
+    def fill_stats(self):
+        """List runs, worst RMS deviation first, and summarise drift per furnace."""
+        stats = sorted(self.result.stats, key=lambda stat: -np.nan_to_num(stat.rms, nan=-1))
+        self.table.setRowCount(len(stats))
+        for row, stat in enumerate(stats):
+            values = [str(stat.run_id), stat.furnace_id, str(stat.started_at),
+                      f"{stat.rms:.2f}", f"{stat.max_abs:.2f}"]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
+
+        drift = furnace_drift(self.result.stats)
+        if drift:
+            self.drift_label.setText("Drift (RMS °C/run): " +
+                                     ", ".join(f"{furnace}: {slope:+.3f}" for furnace, slope in drift.items()))
@@ -1,3 +1,4 @@
+import re
 from typing import Dict, Any
 
 # Database Configuration
@@ -54,9 +55,9 @@ SUCCESS_MESSAGES = {
     'update_success': "Schedule updated successfully"
 }
 
-# Validation Patterns
-TIME_PATTERN = r'^([0-1]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$'
-TEMP_PATTERN = r'^\d+(\.\d+)?$'
+# Validation Patterns (compiled once; hours may exceed a day)
+TIME_PATTERN = re.compile(r'^(\d{1,2}):([0-5]?\d):([0-5]?\d)$')
+TEMP_PATTERN = re.compile(r'^\d+(\.\d+)?$')
 
 def validate_temperature(temp: float) -> bool:
     """Validate temperature is within acceptable range."""
@@ -64,5 +65,158 @@ def validate_temperature(temp: float) -> bool:
 
 def validate_time_format(time_str: str) -> bool:
     """Validate time string matches required format."""
-    import re
-    return bool(re.match(TIME_PATTERN, time_str)) 
\ No newline at end of file
+    return bool(TIME_PATTERN.match(time_str))
+
+# Controller Configuration
+CONTROL_TICK_SECONDS = 1.0
+CONTROL_OUTPUT_MIN = 0.0  # percent heater power
+CONTROL_OUTPUT_MAX = 100.0
+AUTOTUNE_CYCLES = 3
+AUTOTUNE_MAX_TICKS = 6 * 3600
+
+# Alarm Configuration
+ALARM_DEVIATION_LIMIT = 10.0  # °C
+ALARM_DEVIATION_HOLD_SECONDS = 60.0
+ALARM_MAX_RAMP_RATE = 30.0  # °C/min
+ALARM_RAMP_WINDOW_SECONDS = 30.0
+ALARM_SOAK_TOLERANCE = 5.0  # °C
+ALARM_SOAK_GRACE_MINUTES = 15.0
+ALARM_SENSOR_STALE_SECONDS = 10.0
+
+# Run Recording and Replay
+RUN_FLUSH_SAMPLES = 60
+REPLAY_MAX_POINTS = 2000
+REPLAY_TICK_MS = 100
+REPLAY_SPEEDS = (1, 10, 60, 100, 600, 1000)
+REPLAY_WINDOW_MINUTES = 60
+
+# Run Comparison
+COMPARE_STEP_SECONDS = 10.0
+COMPARE_CHUNK_SECONDS = 3600.0
+COMPARE_PERCENTILES = (5, 50, 95)
+COMPARE_MAX_OVERLAYS = 20
+
+# Schedule Versioning
+SCHEDULE_VERSION_SNAPSHOT_INTERVAL = 20  # full copy every N versions, deltas in between
+SCHEDULE_VERSION_CACHE_SIZE = 128
+
+# Logging Configuration
+LOG_LEVEL = 'INFO'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_INTERVAL_SECONDS = 24 * 3600
+LOG_QUEUE_SIZE = 10000
+
+# Instrumentation
+METRICS_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+METRICS_ENV_VAR = 'SMARTFURNACE_METRICS'  # set to 1 to collect timings from startup
+METRICS_PORT_ENV_VAR = 'SMARTFURNACE_METRICS_PORT'  # serve /metrics on this port
+METRICS_FILE_NAME = 'metrics.prom'
+METRICS_EXPORT_INTERVAL_MS = 10000
+METRICS_OVERLAY_REFRESH_MS = 1000
+
+# Cycle Clock
+CYCLE_TICK_SECONDS = PLOT_UPDATE_INTERVAL / 1000
+CYCLE_MAX_CATCH_UP_TICKS = 300  # samples filled in after a stall before older ticks are dropped
+
+# Setpoint Export
+SETPOINT_EXPORT_CHUNK_ROWS = 100000
+SETPOINT_EXPORT_STEPS = (1.0, 0.1, 10.0, 60.0)  # seconds, first is the default
+
+# Database Access
+DB_PATH_ENV_VAR = 'SMARTFURNACE_DB'  # overrides the database location
+DB_JOURNAL_ENV_VAR = 'SMARTFURNACE_DB_JOURNAL'  # overrides WAL/DELETE selection
+DB_BUSY_TIMEOUT_MS = 5000
+DB_LOCK_RETRIES = 6
+DB_LOCK_BACKOFF_SECONDS = 0.05
+DB_LOCK_BACKOFF_MAX_SECONDS = 2.0
+DB_WRITER_PORT_BASE = 47000  # writer port is derived from the database path
+DB_WRITER_PORT_RANGE = 1000
+DB_WRITER_RESEND_ATTEMPTS = 5
+DB_WRITER_BACKLOG = 64
+DB_WRITE_TOKEN_RETENTION_SECONDS = 3600
+
+# Profile Segments
+PROFILE_SHAPES = ('linear', 'exp', 'scurve')
+PROFILE_EXP_SHAPE_K = 3.0  # curvature of exponential ramps; larger approaches the target sooner
+PROFILE_HOLD_TOLERANCE = 5.0  # °C band a guaranteed soak waits for when none is given
+PROFILE_MAX_SEGMENTS = 100000  # cap on segments after repeat blocks are expanded
+PROFILE_CURVE_POINTS = 32  # plot vertices per curved segment
+PROFILE_SIMPLIFY_TOLERANCE = 1.0  # °C the optimizer may move the setpoint by default
+
+# Schedule Validation
+VALIDATION_MAX_RAMP_RATE = ALARM_MAX_RAMP_RATE  # faster ramps would trip the ramp-rate alarm
+VALIDATION_CONTINUITY_TOLERANCE = 0.5  # °C allowed between a row's start and the previous end
+VALIDATION_MAX_REPORTED_ISSUES = 10  # issues listed in the editor's warning
+
+# Schedule Editor Preview
+SCHEDULE_PREVIEW_DEBOUNCE_MS = 150  # quiet time after the last keystroke before redrawing
+SCHEDULE_PREVIEW_HEIGHT = 200
+
+# Schedule Editor Undo
+SCHEDULE_UNDO_LIMIT = 500  # undo steps kept; older ones are dropped
+SCHEDULE_UNDO_MERGE_SECONDS = 2.0  # keystrokes in one cell closer than this undo together
+
+# Recipe Sync
+SYNC_HUB_FILE_SUFFIX = '.changes.jsonl'  # one append-only change feed per station in a hub directory
+
+# Thermocouple Acquisition
+ACQ_ENV_VAR = 'SMARTFURNACE_ACQUISITION'  # driver spec, e.g. simulated:8 or modbus-tcp:10.0.0.5:502?channels=8
+ACQ_CALIBRATION_ENV_VAR = 'SMARTFURNACE_CALIBRATION'  # JSON file with per-channel gain and offset
+ACQ_RATE_HZ = 10.0
+ACQ_CHANNELS = 8
+ACQ_BUFFER_SECONDS = 3600  # samples kept in memory per furnace
+ACQ_FILTER_WINDOW = 5  # samples in the moving average and outlier median
+ACQ_OUTLIER_LIMIT = 25.0  # °C from the window median before a reading is rejected
+ACQ_STALE_SECONDS = 2.0  # a furnace temperature older than this is reported as missing
+ACQ_TIMEOUT_SECONDS = 0.05  # per batched read; must stay below the poll period
+ACQ_REOPEN_SECONDS = 5.0  # wait before reopening a driver after a failed read
+ACQ_SIMULATED_TAU_SECONDS = 60.0  # lag of the simulated thermocouples behind the setpoint
+ACQ_SIMULATED_NOISE = 0.3  # °C standard deviation
+ACQ_SIMULATED_SPIKE_PROBABILITY = 0.001  # per reading
+
+# Live Plot
+LIVE_PLOT_WINDOW_SECONDS = 3600  # measured history kept on the main plot; memory is fixed by this
+LIVE_PLOT_LINE_WIDTH = 1
+
+# Plot Rendering
+PLOT_RENDER_ENV_VAR = 'SMARTFURNACE_RENDER'  # quality, fast or opengl
+PLOT_RENDER_MODES = ('quality', 'fast', 'opengl')  # first is the default
+PLOT_MAX_FPS = 10  # plot redraws per second, however fast data arrives
+PLOT_DOWNSAMPLE_FACTOR = 1.0  # samples per pixel drawn from dense curves (one min/max pair)
+PLOT_IMAGE_SIZE = (1200, 600)  # pixels of plots rendered to PNG
+
+# Run Reports
+REPORT_FORMATS = ('pdf', 'png')
+REPORT_PAGE_WIDTH = 800  # layout width in pixels; PDFs are scaled to A4 from it
+REPORT_PNG_SCALE = 2.0  # PNG pixels per layout pixel
+REPORT_PLOT_SIZE = (1600, 700)
+REPORT_MAX_TABLE_ROWS = 500  # longer segment and command tables are cut off
+REPORT_POLL_INTERVAL_MS = 200
+
+# Controller Programs
+PROGRAM_SLOT_COUNT = 100  # C0-C99 and t0-t99
+PROGRAM_ALLOCATION_STRATEGIES = ('best-fit', 'first-fit')  # first is the default
+PROGRAM_CONTROLLER_ID = 'default'  # the controller whose slot map the commands window edits
+
+# Learned Thermal Model
+THERMAL_FIT_STEP_SECONDS = 5.0  # recorded samples are averaged into steps of this length before fitting
+THERMAL_MAX_DEAD_TIME_SECONDS = 300  # longest dead time tried
+THERMAL_MIN_FIT_SAMPLES = 360  # steps of usable data before a model is trusted (30 minutes)
+THERMAL_ORDER_IMPROVEMENT = 0.05  # residual reduction the second-order model must give to be used
+THERMAL_RIDGE = 1e-6  # regularisation for regressors the data never excites
+
+# End Time Estimation
+ETA_SETTLE_TOLERANCE = 5.0  # °C from the final temperature at which a cycle counts as finished
+ETA_MAX_WAIT_MINUTES = 600  # cap on any one predicted wait, for furnaces that never get there
+ETA_RATE_INTERVAL_MINUTES = 1.0  # measured rate of change is taken over intervals this long
+ETA_RATE_SMOOTHING = 0.3  # weight of each new interval's rate
+ETA_MIN_RATE = 0.01  # °C/min; slower than this, a furnace is not heading anywhere
+ETA_DISPLAY_HYSTERESIS_SECONDS = 30  # the End label only moves when the estimate moves this much
+
+# Plugins
+DIALECT_PLUGIN_GROUP = 'smartfurnace.dialects'  # entry point groups installed packages add plugins to
+TRANSPORT_PLUGIN_GROUP = 'smartfurnace.transports'
+FURNACE_MODEL_PLUGIN_GROUP = 'smartfurnace.furnace_models'
+DIALECT_ENV_VAR = 'SMARTFURNACE_DIALECT'  # controller dialect the furnace commands are written in
+DEFAULT_DIALECT = 'pv-sv'
@@ -0,0 +1,229 @@
+import logging
+import math
+from collections import namedtuple
+from typing import Callable, Optional
+
+from constants import (CONTROL_TICK_SECONDS, CONTROL_OUTPUT_MIN, CONTROL_OUTPUT_MAX,
+                       AUTOTUNE_MAX_TICKS, AUTOTUNE_CYCLES)
+from schedule_profile import HoldTracker, ScheduleProfile
+from thermal_model import ThermalModel
+
+logger = logging.getLogger(__name__)
+
+AutotuneResult = namedtuple('AutotuneResult', ['ku', 'pu', 'kp', 'ki', 'kd'])
+
+# (Kp, Ti, Td) as fractions of (Ku, Pu, Pu)
+TUNING_RULES = {
+    'ziegler-nichols': (0.6, 0.5, 0.125),
+    'tyreus-luyben': (0.45, 2.2, 0.159),
+    'no-overshoot': (0.2, 0.5, 0.333),
+}
+
+
+class FurnaceBackend:
+    """Interface a control loop uses to read and drive a furnace."""
+
+    def read_temperature(self) -> float:
+        raise NotImplementedError
+
+    def write_output(self, output: float):
+        raise NotImplementedError
+
+
+class SimulatedFurnace(FurnaceBackend):
+    """Furnace backend driven by a local ThermalModel, one model step per output write."""
+
+    def __init__(self, model: Optional[ThermalModel] = None):
+        self.model = model or ThermalModel(dt=CONTROL_TICK_SECONDS)
+
+    def read_temperature(self) -> float:
+        return self.model.temperature
+
+    def write_output(self, output: float):
+        self.model.step(output)
+
+
+class PIDController:
+    """PID with setpoint weighting, back-calculation anti-windup and ramp feed-forward.
+
+    Designed for a fixed tick period: update() only reads and writes float
+    attributes, so a tick does not allocate.
+    """
+
+    __slots__ = ('kp', 'ki', 'kd', 'dt', 'output_min', 'output_max', 'setpoint_weight',
+                 'derivative_weight', 'feedforward_gain', 'derivative_filter', 'tracking_time',
+                 'integral', 'derivative', 'output', '_last_error_d', '_initialized')
+
+    def __init__(self, kp: float, ki: float = 0.0, kd: float = 0.0,
+                 dt: float = CONTROL_TICK_SECONDS,
+                 output_min: float = CONTROL_OUTPUT_MIN, output_max: float = CONTROL_OUTPUT_MAX,
+                 setpoint_weight: float = 1.0, derivative_weight: float = 0.0,
+                 feedforward_gain: float = 0.0, derivative_filter: float = 10.0,
+                 tracking_time: Optional[float] = None):
+        """
+        Args:
+            kp, ki, kd: Parallel-form gains (output per °C, per °C·s, per °C/s)
+            dt: Tick period in seconds
+            setpoint_weight: Fraction of the setpoint seen by the proportional term (b)
+            derivative_weight: Fraction of the setpoint seen by the derivative term (c)
+            feedforward_gain: Output per °C/min of known setpoint slope
+            derivative_filter: Derivative filter divisor N (Tf = Td / N)
+            tracking_time: Anti-windup back-calculation time constant in seconds
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.dt = dt
+        self.output_min = output_min
+        self.output_max = output_max
+        self.setpoint_weight = setpoint_weight
+        self.derivative_weight = derivative_weight
+        self.feedforward_gain = feedforward_gain
+        self.derivative_filter = derivative_filter
+        if tracking_time is None:
+            # Common choice: geometric mean of Ti and Td, falling back to Ti
+            ti = kp / ki if ki else 0.0
+            td = kd / kp if kp else 0.0
+            tracking_time = math.sqrt(ti * td) if ti and td else (ti or dt)
+        self.tracking_time = tracking_time
+        self.reset()
+
+    def reset(self, output: float = 0.0):
+        """Clear controller state, optionally starting from a known output (bumpless start)."""
+        self.integral = output
+        self.derivative = 0.0
+        self.output = output
+        self._last_error_d = 0.0
+        self._initialized = False
+
+    def update(self, setpoint: float, measurement: float, slope: float = 0.0) -> float:
+        """Compute the output for one tick.
+
+        Args:
+            setpoint: Target temperature in °C
+            measurement: Measured temperature in °C
+            slope: Known setpoint slope in °C/min, used for feed-forward
+        """
+        error = setpoint - measurement
+        proportional = self.kp * (self.setpoint_weight * setpoint - measurement)
+
+        error_d = self.derivative_weight * setpoint - measurement
+        if not self._initialized:
+            self._last_error_d = error_d
+            self._initialized = True
+        if self.kd:
+            tf = (self.kd / self.kp) / self.derivative_filter if self.kp else 0.0
+            self.derivative = (tf * self.derivative + self.kd * (error_d - self._last_error_d)) / (tf + self.dt)
+        self._last_error_d = error_d
+
+        unsaturated = proportional + self.integral + self.derivative + self.feedforward_gain * slope
+        output = min(max(unsaturated, self.output_min), self.output_max)
+
+        # Integrate, bleeding off the excess while saturated so the integral cannot wind up.
+        # Without integral action there is nothing to wind up, and tracking would only leave a bias.
+        if self.ki:
+            self.integral += self.ki * self.dt * error + (self.dt / self.tracking_time) * (output - unsaturated)
+        self.output = output
+        return output
+
+
+class ControlLoop:
+    """Drives a furnace backend along a schedule profile with a PID controller."""
+
+    def __init__(self, controller: PIDController, backend: FurnaceBackend, profile: ScheduleProfile):
+        self.controller = controller
+        self.backend = backend
+        self.profile = profile
+        self.hold = HoldTracker(profile)
+        self.setpoint = 0.0
+        self.measurement = 0.0
+        self.output = 0.0
+
+    def tick(self, elapsed_minutes: float) -> float:
+        """Run one control tick at the given time into the cycle and return the output written.
+
+        Guaranteed soaks pause the profile while the furnace is outside their band.
+        """
+        self.measurement = self.backend.read_temperature()
+        self.setpoint, slope = self.profile.setpoint_at(self.hold.update(elapsed_minutes, self.measurement))
+        self.output = self.controller.update(self.setpoint, self.measurement, slope)
+        self.backend.write_output(self.output)
+        return self.output
+
+
+def relay_autotune(backend: FurnaceBackend, setpoint: float, dt: float = CONTROL_TICK_SECONDS,
+                   relay_high: float = CONTROL_OUTPUT_MAX, relay_low: float = CONTROL_OUTPUT_MIN,
+                   hysteresis: float = 1.0, cycles: int = AUTOTUNE_CYCLES,
+                   max_ticks: int = AUTOTUNE_MAX_TICKS, rule: str = 'tyreus-luyben',
+                   wait: Optional[Callable[[], None]] = None) -> Optional[AutotuneResult]:
+    """Estimate PID gains with the relay (Åström–Hägglund) method.
+
+    The relay switches the output between relay_high and relay_low around the
+    setpoint until the temperature settles into a limit cycle. The ultimate gain
+    and period are read from that oscillation and converted with a tuning rule.
+
+    Args:
+        backend: Furnace to tune, e.g. SimulatedFurnace for a local thermal model
+        setpoint: Temperature to oscillate around in °C
+        dt: Tick period in seconds
+        cycles: Number of complete oscillations to average over
+        wait: Called once per tick; pass a sleep for real hardware
+    Returns:
+        AutotuneResult, or None if no stable oscillation was found
+    """
+    if rule not in TUNING_RULES:
+        raise ValueError(f"Unknown tuning rule: {rule}")
+
+    relay_on = True
+    switch_times = []
+    peaks_high = []
+    peaks_low = []
+    extreme = None
+
+    for tick in range(max_ticks):
+        temperature = backend.read_temperature()
+        if relay_on and temperature > setpoint + hysteresis:
+            relay_on = False
+            switch_times.append(tick * dt)
+            if extreme is not None:
+                peaks_low.append(extreme)
+            extreme = temperature
+        elif not relay_on and temperature < setpoint - hysteresis:
+            relay_on = True
+            peaks_high.append(extreme)
+            extreme = temperature
+        elif extreme is not None:
+            # Track the overshoot past each switch caused by the furnace lag
+            extreme = min(extreme, temperature) if relay_on else max(extreme, temperature)
+
+        backend.write_output(relay_high if relay_on else relay_low)
+        if wait:
+            wait()
+
+        # The first switch ends the initial heat-up, so it does not count as a cycle
+        if len(peaks_low) >= cycles and len(peaks_high) >= cycles:
+            break
+    else:
+        logger.warning("Relay autotune did not reach %s cycles in %s ticks", cycles, max_ticks)
+        return None
+
+    periods = [b - a for a, b in zip(switch_times, switch_times[1:])]
+    pu = sum(periods[-cycles:]) / len(periods[-cycles:])
+    amplitude = (sum(peaks_high[-cycles:]) / len(peaks_high[-cycles:]) -
+                 sum(peaks_low[-cycles:]) / len(peaks_low[-cycles:])) / 2
+    if amplitude <= 0 or pu <= 0:
+        return None
+
+    ku = 4 * (relay_high - relay_low) / 2 / (math.pi * amplitude)
+    kp_factor, ti_factor, td_factor = TUNING_RULES[rule]
+    kp = kp_factor * ku
+    ti = ti_factor * pu
+    td = td_factor * pu
+    result = AutotuneResult(ku=ku, pu=pu, kp=kp, ki=kp / ti, kd=kp * td)
+    logger.info("Relay autotune: %s", result)
+    return result
+
+
+def feedforward_gain_for(model: ThermalModel) -> float:
+    """Output per °C/min of ramp needed to keep a first-order model on a ramp."""
+    return model.tau_heat / 60.0 / model.gain
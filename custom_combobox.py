@@ -12,7 +12,7 @@ class CustomComboBox(QComboBox):
         self.setup_context_menu()
         
     def setup_context_menu(self):
-        """Set up the context menu with Show Code, Edit and Delete actions."""
+        """Set up the context menu with Show Code, Replay Run, Compare Runs, export, Edit and Delete actions."""
         self.context_menu.setStyleSheet("""
             QMenu {
                 background-color: #2b2b2b;
@@ -24,13 +24,23 @@ class CustomComboBox(QComboBox):
             }
         """)
         
-        # Add Show Code, Edit and Delete actions
+        # Add Show Code, Replay Run, Compare Runs, Edit and Delete actions
         show_code_action = self.context_menu.addAction("Show Code")
+        replay_action = self.context_menu.addAction("Replay Run...")
+        compare_action = self.context_menu.addAction("Compare Runs...")
+        export_action = self.context_menu.addAction("Export Setpoints...")
+        image_action = self.context_menu.addAction("Export Plot Image...")
+        report_action = self.context_menu.addAction("Generate Reports...")
         edit_action = self.context_menu.addAction("Edit")
         delete_action = self.context_menu.addAction("Delete")
         
         # Connect actions to parent window methods
         show_code_action.triggered.connect(lambda: self.parent().show_furnace_commands(self.currentText()))
+        replay_action.triggered.connect(lambda: self.parent().show_run_replay(self.currentText()))
+        compare_action.triggered.connect(lambda: self.parent().show_run_comparison(self.currentText()))
+        export_action.triggered.connect(lambda: self.parent().export_setpoint_table(self.currentText()))
+        image_action.triggered.connect(lambda: self.parent().export_plot_image(self.currentText()))
+        report_action.triggered.connect(lambda: self.parent().generate_reports(self.currentText()))
         edit_action.triggered.connect(lambda: self.parent().edit_schedule())
         delete_action.triggered.connect(lambda: self.parent().delete_schedule())
     
@@ -0,0 +1,151 @@
+import math
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from constants import CYCLE_TICK_SECONDS, CYCLE_MAX_CATCH_UP_TICKS
+
+
+class SystemClock:
+    """Real time: time.monotonic for intervals, datetime.now for the wall clock."""
+
+    rate = 1.0
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class ManualClock:
+    """Clock that only moves when advanced, for tests."""
+
+    rate = 1.0
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._start = start or datetime(2000, 1, 1)
+        self._seconds = 0.0
+
+    def advance(self, seconds: float):
+        self._seconds += seconds
+
+    def step_wall_clock(self, seconds: float):
+        """Shift only the wall clock, like an NTP or DST correction."""
+        self._start += timedelta(seconds=seconds)
+
+    def monotonic(self) -> float:
+        return self._seconds
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._seconds)
+
+
+class AcceleratedClock:
+    """Real time sped up by a constant factor, for simulating long cycles."""
+
+    def __init__(self, rate: float, base: Optional[SystemClock] = None):
+        self.rate = rate
+        self._base = base or SystemClock()
+        self._mono_origin = self._base.monotonic()
+        self._wall_origin = self._base.now()
+
+    def monotonic(self) -> float:
+        return (self._base.monotonic() - self._mono_origin) * self.rate
+
+    def now(self) -> datetime:
+        return self._wall_origin + timedelta(seconds=self.monotonic())
+
+
+class CycleClock:
+    """Elapsed cycle time from a monotonic clock anchored to a wall-clock start.
+
+    The persisted start time is only compared with the wall clock once, when
+    the clock is started or resumed. From then on elapsed time comes from the
+    monotonic clock, so NTP steps and DST changes do not move the profile.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+        self.start_time: Optional[datetime] = None
+        self._anchor: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._anchor is not None
+
+    def start(self, start_time: Optional[datetime] = None):
+        """Start a cycle now, or resume one that started at start_time."""
+        now = self.clock.now()
+        self.start_time = start_time or now
+        already_elapsed = max(0.0, (now - self.start_time).total_seconds())
+        self._anchor = self.clock.monotonic() - already_elapsed
+
+    def stop(self):
+        self.start_time = None
+        self._anchor = None
+
+    def elapsed_seconds(self) -> float:
+        if self._anchor is None:
+            return 0.0
+        return self.clock.monotonic() - self._anchor
+
+    def elapsed_at(self, monotonic: float) -> float:
+        """Elapsed cycle time at a reading of the underlying monotonic clock."""
+        return monotonic - self._anchor if self._anchor is not None else 0.0
+
+    @property
+    def origin(self) -> Optional[float]:
+        """Monotonic reading at cycle start, used to align ticks to the cycle."""
+        return self._anchor
+
+    def wall_time_at(self, elapsed_seconds: float) -> datetime:
+        """Wall-clock time a point in the cycle falls on, e.g. the end time."""
+        return self.start_time + timedelta(seconds=elapsed_seconds)
+
+
+class TickScheduler:
+    """Fixed-rate ticks against absolute deadlines on a monotonic clock.
+
+    Deadlines sit on multiples of the interval from an origin (normally the
+    cycle start), so a late timer does not shift later ticks; ticks missed
+    while the event loop was busy are reported so their samples can be
+    filled in.
+    """
+
+    def __init__(self, clock=None, interval_seconds: float = CYCLE_TICK_SECONDS,
+                 max_catch_up: int = CYCLE_MAX_CATCH_UP_TICKS):
+        self.clock = clock or SystemClock()
+        self.interval = interval_seconds
+        self.max_catch_up = max_catch_up
+        self.next_deadline = 0.0
+        self.skipped = 0
+
+    def reset(self, origin: Optional[float] = None):
+        """Schedule the next tick on the next interval boundary after origin."""
+        now = self.clock.monotonic()
+        if origin is None:
+            origin = now
+        self.next_deadline = origin + math.floor((now - origin) / self.interval + 1) * self.interval
+
+    def due(self) -> List[float]:
+        """Monotonic deadlines of every tick that has passed, oldest first.
+
+        If more than max_catch_up ticks were missed, only the latest ones are
+        returned and the rest are counted in self.skipped.
+        """
+        now = self.clock.monotonic()
+        if now < self.next_deadline:
+            return []
+        count = int((now - self.next_deadline) // self.interval) + 1
+        if count > self.max_catch_up:
+            self.skipped += count - self.max_catch_up
+        first = max(0, count - self.max_catch_up)
+        deadlines = [self.next_deadline + i * self.interval for i in range(first, count)]
+        self.next_deadline += count * self.interval
+        return deadlines
+
+    def delay_ms(self) -> int:
+        """Real milliseconds until the next deadline, for arming a single-shot timer."""
+        remaining = self.next_deadline - self.clock.monotonic()
+        return max(0, math.ceil(remaining / self.clock.rate * 1000))
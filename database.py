@@ -1,82 +1,157 @@
 import os
-import sqlite3
 from typing import List, Tuple, Optional, Dict
 import logging
 from contextlib import contextmanager
-from version import APP_NAME
-
-# Create Windows app data directory
-app_data_dir = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), APP_NAME)
-os.makedirs(app_data_dir, exist_ok=True)
-
-# Setup logging with error handling
-log_file = os.path.join(app_data_dir, 'smartfurnace.log')
-try:
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-except Exception as e:
-    # Fallback to console logging if file logging fails
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-    logging.warning(f"Failed to create log file: {e}")
+import program_slots
+import recipe_sync
+import schedule_validation
+import schedule_versions
+from segment import Segment, pad_entry
+from instrumentation import timed
+from db_access import (WriteCoordinator, connect, get_app_data_dir, resolve_db_path,
+                       set_journal_mode, with_backoff)
+from recipe_sync import SyncResult
+from program_slots import ProgramMemory
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    APP_DATA = os.path.join(os.getenv('APPDATA') or 
-                           os.path.expanduser('~/.local/share'),
-                           APP_NAME)
-    DB_NAME = os.path.join(APP_DATA, 'SmartFurnace.db')
+    APP_DATA = get_app_data_dir()
+    DB_NAME = resolve_db_path()
+    _writer: Optional[WriteCoordinator] = None
     
     @classmethod
     def initialize_database(cls):
         """Create database directory and file if they don't exist."""
         try:
-            logger.info(f"Initializing database at {cls.DB_NAME}")
+            logger.info("Initializing database at %s", cls.DB_NAME)
             os.makedirs(cls.APP_DATA, exist_ok=True)
+            os.makedirs(os.path.dirname(cls.DB_NAME), exist_ok=True)
             
             with cls.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Create schedules table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS schedules
-                    (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT UNIQUE,
-                        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Create schedule_entries table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS schedule_entries
-                    (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        schedule_id INTEGER,
-                        cycle_type TEXT NOT NULL,
-                        start_temp INTEGER NOT NULL,
-                        end_temp INTEGER NOT NULL,
-                        duration TEXT NOT NULL,
-                        notes TEXT,
-                        position INTEGER,
-                        FOREIGN KEY (schedule_id) REFERENCES schedules (id)
-                            ON DELETE CASCADE
-                    )
-                """)
-                conn.commit()
+                with_backoff(lambda: cls._create_tables(conn))
                 logger.info("Database initialized successfully")
                 return True
         except Exception as e:
-            logger.error(f"Failed to initialize database: {e}")
+            logger.error("Failed to initialize database: %s", e)
             return False
 
+    @classmethod
+    def _create_tables(cls, conn):
+        """Create or migrate the schema; safe to run on every start."""
+        set_journal_mode(conn, cls.DB_NAME)
+        cursor = conn.cursor()
+        
+        # Create schedules table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schedules
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Create schedule_entries table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schedule_entries
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                schedule_id INTEGER,
+                cycle_type TEXT NOT NULL,
+                start_temp INTEGER NOT NULL,
+                end_temp INTEGER NOT NULL,
+                duration TEXT NOT NULL,
+                notes TEXT,
+                position INTEGER,
+                FOREIGN KEY (schedule_id) REFERENCES schedules (id)
+                    ON DELETE CASCADE
+            )
+        """)
+        # Optional segment fields, see segment.SEGMENT_OPTION_KEYS
+        cls._ensure_column(cursor, 'schedule_entries', 'shape', 'TEXT')
+        cls._ensure_column(cursor, 'schedule_entries', 'rate', 'REAL')
+        cls._ensure_column(cursor, 'schedule_entries', 'tolerance', 'REAL')
+        cls._ensure_column(cursor, 'schedule_entries', 'repeat_count', 'INTEGER')
+        cls._ensure_column(cursor, 'schedule_entries', 'repeat_span', 'INTEGER')
+        
+        # Create alarm_events table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alarm_events
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                furnace_id TEXT NOT NULL,
+                run_id INTEGER,
+                rule TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,
+                elapsed_seconds REAL NOT NULL,
+                value REAL,
+                message TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Create runs table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS runs
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                schedule_name TEXT NOT NULL,
+                furnace_id TEXT NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ended_at TIMESTAMP,
+                sample_file TEXT
+            )
+        """)
+        cls._ensure_column(cursor, 'runs', 'schedule_version_id', 'INTEGER')
+        
+        # Create schedule_versions table (immutable history, see schedule_versions.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schedule_versions
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                schedule_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                base_version_id INTEGER,
+                payload TEXT NOT NULL,
+                segment_count INTEGER NOT NULL,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (schedule_id, version)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_schedule_versions_hash
+            ON schedule_versions (schedule_id, content_hash)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alarm_events_run
+            ON alarm_events (run_id, elapsed_seconds)
+        """)
+        # Change log, cursors and conflicts for syncing recipes between stations
+        recipe_sync.create_tables(cursor)
+        # What each controller program slot holds, see program_slots.py
+        program_slots.create_tables(cursor)
+        # Least-squares statistics of each furnace's learned response, see thermal_fit.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS thermal_fits
+            (
+                furnace_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                last_run_id INTEGER NOT NULL,
+                modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, declaration: str):
+        """Add a column to an existing table if an older database lacks it."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
     @classmethod
     @contextmanager
     def get_connection(cls):
@@ -86,13 +161,38 @@ class DatabaseManager:
             
         conn = None
         try:
-            conn = sqlite3.connect(cls.DB_NAME)
+            conn = connect(cls.DB_NAME)
             yield conn
         finally:
             if conn:
                 conn.close()
 
     @classmethod
+    def get_writer(cls) -> WriteCoordinator:
+        """The write coordinator for the current database, created on first use."""
+        if cls._writer is None or cls._writer.path != cls.DB_NAME:
+            if cls._writer is not None:
+                # Stop serving the previous database so its port and connection are released
+                cls._writer.close()
+            cls._writer = WriteCoordinator(cls.DB_NAME, cls._resolve_transaction, cls.APP_DATA)
+        return cls._writer
+
+    @classmethod
+    def _resolve_transaction(cls, name: str):
+        # Only the _tx_ methods below can be requested by other processes
+        return getattr(cls, f'_tx_{name}')
+
+    @classmethod
+    def write(cls, name: str, *args):
+        """Run the write transaction _tx_<name> in the single writer process.
+
+        Reads open their own connections and see WAL snapshots, so only
+        writes need to be coordinated between processes.
+        """
+        return cls.get_writer().execute(name, args)
+
+    @classmethod
+    @timed('db.fetch_all_schedules')
     def fetch_all_schedules(cls) -> List[str]:
         """Fetch all schedule names from the database."""
         try:
@@ -101,10 +201,11 @@ class DatabaseManager:
                 cursor.execute("SELECT name FROM schedules ORDER BY name")
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching schedules: {e}", exc_info=True)
+            logger.error("Error fetching schedules: %s", e, exc_info=True)
             return []
 
     @classmethod
+    @timed('db.save_schedule')
     def save_schedule(cls, name: str, entries: List[Tuple]) -> bool:
         """Save a schedule to the database.
         
@@ -112,64 +213,85 @@ class DatabaseManager:
             name: Name of the schedule
             entries: List of tuples in format (CycleType, StartTemp, EndTemp, Duration, Notes)
                     DO NOT PASS DICTIONARIES - Must be tuples in exact order above
+                    Optionally followed by (Shape, Rate, Tolerance, RepeatCount, RepeatSpan)
         Returns:
             bool: True if save successful, False otherwise
         """
-        logger.debug(f"Saving schedule '{name}' with {len(entries)} entries")
+        logger.debug("Saving schedule '%s' with %s entries", name, len(entries))
         
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # First, ensure the schedule exists in schedules table
-                cursor.execute("""
-                    INSERT OR REPLACE INTO schedules (name, modified_date)
-                    VALUES (?, CURRENT_TIMESTAMP)
-                """, (name,))
-                
-                # Get the schedule_id
-                cursor.execute("SELECT id FROM schedules WHERE name = ?", (name,))
-                schedule_id = cursor.fetchone()[0]
-                
-                # Clear existing entries for this schedule
-                cursor.execute("DELETE FROM schedule_entries WHERE schedule_id = ?", (schedule_id,))
-                
-                # Insert new entries
-                for position, entry in enumerate(entries):
-                    cursor.execute("""
-                        INSERT INTO schedule_entries 
-                        (schedule_id, cycle_type, start_temp, end_temp, duration, notes, position)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (schedule_id, *entry, position))
-                
-                conn.commit()
-                logger.debug(f"Successfully saved schedule '{name}'")
-                return True
+            cls.write('save_schedule', name, [tuple(entry) for entry in entries])
+            logger.debug("Successfully saved schedule '%s'", name)
+            return True
                 
         except Exception as e:
-            logger.error(f"Error saving schedule '{name}': {e}", exc_info=True)
+            logger.error("Error saving schedule '%s': %s", name, e, exc_info=True)
             return False
 
     @classmethod
+    def _tx_save_schedule(cls, cursor, name: str, entries: List[Tuple]):
+        cls._store_schedule(cursor, name, entries)
+        recipe_sync.record_change(cursor, name, entries)
+
+    @classmethod
+    def _store_schedule(cls, cursor, name: str, entries: List[Tuple]):
+        # First, ensure the schedule exists in schedules table. INSERT OR REPLACE
+        # would delete the row and give the schedule a new id on every save.
+        cursor.execute("INSERT OR IGNORE INTO schedules (name) VALUES (?)", (name,))
+        cursor.execute("""
+            UPDATE schedules SET modified_date = CURRENT_TIMESTAMP WHERE name = ?
+        """, (name,))
+        
+        # Get the schedule_id
+        cursor.execute("SELECT id FROM schedules WHERE name = ?", (name,))
+        schedule_id = cursor.fetchone()[0]
+        
+        # Clear existing entries for this schedule
+        cursor.execute("DELETE FROM schedule_entries WHERE schedule_id = ?", (schedule_id,))
+        
+        # Insert new entries
+        for position, entry in enumerate(entries):
+            cursor.execute("""
+                INSERT INTO schedule_entries 
+                (schedule_id, cycle_type, start_temp, end_temp, duration, notes,
+                 shape, rate, tolerance, repeat_count, repeat_span, position)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (schedule_id, *pad_entry(entry), position))
+        
+        # Keep an immutable, deduplicated version of every distinct revision
+        schedule_versions.record_version(cursor, schedule_id, entries)
+
+    @classmethod
+    @timed('db.delete_schedule')
     def delete_schedule(cls, schedule_name: str) -> bool:
         """Delete a schedule from the database."""
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Delete from schedules table (cascade will handle entries)
-                cursor.execute("DELETE FROM schedules WHERE name = ?", (schedule_name,))
-                conn.commit()
-                
-                logger.debug(f"Successfully deleted schedule: {schedule_name}")
-                return True
+            cls.write('delete_schedule', schedule_name)
+            logger.debug("Successfully deleted schedule: %s", schedule_name)
+            return True
                 
         except Exception as e:
-            logger.error(f"Error deleting schedule '{schedule_name}': {e}", exc_info=True)
+            logger.error("Error deleting schedule '%s': %s", schedule_name, e, exc_info=True)
             return False
 
     @classmethod
-    def load_schedule(cls, schedule_name: str) -> List[Dict]:
+    def _tx_delete_schedule(cls, cursor, schedule_name: str):
+        if cls._remove_schedule(cursor, schedule_name):
+            # Tombstone, so the delete reaches stations that sync with this one
+            recipe_sync.record_change(cursor, schedule_name, None)
+
+    @staticmethod
+    def _remove_schedule(cursor, schedule_name: str) -> bool:
+        # Delete from schedules table (cascade will handle entries)
+        cursor.execute("DELETE FROM schedules WHERE name = ?", (schedule_name,))
+        removed = cursor.rowcount > 0
+        # Its controller slots become free; what they hold is still known
+        cursor.execute("UPDATE program_slots SET schedule_name = NULL WHERE schedule_name = ?", (schedule_name,))
+        return removed
+
+    @classmethod
+    @timed('db.load_schedule')
+    def load_schedule(cls, schedule_name: str) -> Optional[List[Segment]]:
         """Load a schedule from the database."""
         try:
             with cls.get_connection() as conn:
@@ -180,39 +302,459 @@ class DatabaseManager:
                 schedule_id = cursor.fetchone()
                 
                 if not schedule_id:
-                    logger.warning(f"No schedule found with name: {schedule_name}")
+                    logger.warning("No schedule found with name: %s", schedule_name)
                     return None
                     
                 # Get entries for this schedule
                 cursor.execute("""
-                    SELECT 
-                        position as Cycle,
-                        cycle_type as CycleType,
-                        start_temp as StartTemp,
-                        end_temp as EndTemp,
-                        duration as CycleTime,
-                        notes as Notes
+                    SELECT cycle_type, start_temp, end_temp, duration, notes,
+                           shape, rate, tolerance, repeat_count, repeat_span
                     FROM schedule_entries 
                     WHERE schedule_id = ?
                     ORDER BY position
                 """, (schedule_id[0],))
                 
-                entries = []
-                for row in cursor.fetchall():
-                    entries.append({
-                        'Cycle': row[0] + 1,  # Convert 0-based position to 1-based cycle
-                        'CycleType': row[1],
-                        'StartTemp': row[2],
-                        'EndTemp': row[3],
-                        'CycleTime': row[4],
-                        'Notes': row[5] if row[5] else ''
-                    })
-                
-                return entries
+                return [Segment.from_row(row) for row in cursor.fetchall()]
                 
         except Exception as e:
-            logger.error(f"Error loading schedule '{schedule_name}': {e}", exc_info=True)
+            logger.error("Error loading schedule '%s': %s", schedule_name, e, exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.save_alarm_events')
+    def save_alarm_events(cls, events: List, run_id: Optional[int] = None) -> bool:
+        """Save alarm events (alarms.AlarmEvent) in a single transaction."""
+        try:
+            cls.write('save_alarm_events', [(event.furnace_id, run_id, event.rule, event.kind, event.state,
+                                             event.elapsed_seconds, event.value, event.message)
+                                            for event in events])
+            return True
+        except Exception as e:
+            logger.error("Error saving alarm events: %s", e, exc_info=True)
+            return False
+
+    @classmethod
+    def _tx_save_alarm_events(cls, cursor, rows: List[Tuple]):
+        cursor.executemany("""
+            INSERT INTO alarm_events
+            (furnace_id, run_id, rule, kind, state, elapsed_seconds, value, message)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    @classmethod
+    @timed('db.load_alarm_events')
+    def load_alarm_events(cls, run_id: Optional[int] = None,
+                          furnace_id: Optional[str] = None) -> List[Dict]:
+        """Load alarm events, optionally filtered by run and furnace, in time order."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT furnace_id, run_id, rule, kind, state, elapsed_seconds, value, message
+                    FROM alarm_events WHERE 1 = 1
+                """
+                params = []
+                if run_id is not None:
+                    query += " AND run_id = ?"
+                    params.append(run_id)
+                if furnace_id is not None:
+                    query += " AND furnace_id = ?"
+                    params.append(furnace_id)
+                cursor.execute(query + " ORDER BY elapsed_seconds", params)
+                return [{
+                    'FurnaceId': row[0],
+                    'RunId': row[1],
+                    'Rule': row[2],
+                    'Kind': row[3],
+                    'State': row[4],
+                    'ElapsedSeconds': row[5],
+                    'Value': row[6],
+                    'Message': row[7]
+                } for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error loading alarm events: %s", e, exc_info=True)
+            return []
+
+    @classmethod
+    @timed('db.create_run')
+    def create_run(cls, schedule_name: str, furnace_id: str) -> Optional[int]:
+        """Register a new run and return its id."""
+        try:
+            return cls.write('create_run', schedule_name, furnace_id)
+        except Exception as e:
+            logger.error("Error creating run for '%s': %s", schedule_name, e, exc_info=True)
+            return None
+
+    @classmethod
+    def _tx_create_run(cls, cursor, schedule_name: str, furnace_id: str) -> int:
+        version_id = cls._current_version_id(cursor, schedule_name)
+        cursor.execute("""
+            INSERT INTO runs (schedule_name, furnace_id, schedule_version_id) VALUES (?, ?, ?)
+        """, (schedule_name, furnace_id, version_id))
+        return cursor.lastrowid
+
+    @classmethod
+    @timed('db.set_run_sample_file')
+    def set_run_sample_file(cls, run_id: int, sample_file: str) -> bool:
+        """Record where the samples of a run are stored."""
+        try:
+            cls.write('set_run_sample_file', run_id, sample_file)
+            return True
+        except Exception as e:
+            logger.error("Error updating run %s: %s", run_id, e, exc_info=True)
+            return False
+
+    @classmethod
+    @timed('db.finish_run')
+    def finish_run(cls, run_id: int) -> bool:
+        """Mark a run as ended now."""
+        try:
+            cls.write('finish_run', run_id)
+            return True
+        except Exception as e:
+            logger.error("Error finishing run %s: %s", run_id, e, exc_info=True)
+            return False
+
+    @classmethod
+    def _tx_set_run_sample_file(cls, cursor, run_id: int, sample_file: str):
+        cursor.execute("UPDATE runs SET sample_file = ? WHERE id = ?", (sample_file, run_id))
+
+    @classmethod
+    def _tx_finish_run(cls, cursor, run_id: int):
+        cursor.execute("UPDATE runs SET ended_at = CURRENT_TIMESTAMP WHERE id = ?", (run_id,))
+
+    @classmethod
+    @timed('db.fetch_runs')
+    def fetch_runs(cls, schedule_name: Optional[str] = None) -> List[Dict]:
+        """Fetch recorded runs, newest first, optionally for one schedule."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT id, schedule_name, furnace_id, started_at, ended_at, sample_file,
+                           schedule_version_id
+                    FROM runs
+                """
+                params = ()
+                if schedule_name is not None:
+                    query += " WHERE schedule_name = ?"
+                    params = (schedule_name,)
+                cursor.execute(query + " ORDER BY id DESC", params)
+                return [cls._run_row_to_dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error fetching runs: %s", e, exc_info=True)
+            return []
+
+    @classmethod
+    @timed('db.load_run')
+    def load_run(cls, run_id: int) -> Optional[Dict]:
+        """Load a single run record."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, schedule_name, furnace_id, started_at, ended_at, sample_file,
+                           schedule_version_id
+                    FROM runs WHERE id = ?
+                """, (run_id,))
+                row = cursor.fetchone()
+                return cls._run_row_to_dict(row) if row else None
+        except Exception as e:
+            logger.error("Error loading run %s: %s", run_id, e, exc_info=True)
+            return None
+
+    @staticmethod
+    def _run_row_to_dict(row) -> Dict:
+        return {
+            'Id': row[0],
+            'ScheduleName': row[1],
+            'FurnaceId': row[2],
+            'StartedAt': row[3],
+            'EndedAt': row[4],
+            'SampleFile': row[5],
+            'ScheduleVersionId': row[6]
+        }
+
+    @classmethod
+    def _current_version_id(cls, cursor, schedule_name: str) -> Optional[int]:
+        """Id of the latest version of a schedule, versioning its current entries if needed."""
+        cursor.execute("SELECT id FROM schedules WHERE name = ?", (schedule_name,))
+        schedule_id = cursor.fetchone()
+        if not schedule_id:
             return None
+        latest = schedule_versions.latest_version(cursor, schedule_id[0])
+        if latest:
+            return latest[0]
+        # Schedules saved before versioning existed get their first version here
+        cursor.execute("""
+            SELECT cycle_type, start_temp, end_temp, duration, notes,
+                   shape, rate, tolerance, repeat_count, repeat_span
+            FROM schedule_entries WHERE schedule_id = ? ORDER BY position
+        """, (schedule_id[0],))
+        return schedule_versions.record_version(cursor, schedule_id[0], cursor.fetchall())
+
+    @classmethod
+    @timed('db.fetch_schedule_versions')
+    def fetch_schedule_versions(cls, schedule_name: str) -> List[Dict]:
+        """Fetch the version history of a schedule, newest first."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT v.id, v.version, v.content_hash, v.segment_count, v.created_date
+                    FROM schedule_versions v JOIN schedules s ON s.id = v.schedule_id
+                    WHERE s.name = ?
+                    ORDER BY v.version DESC
+                """, (schedule_name,))
+                return [{
+                    'Id': row[0],
+                    'Version': row[1],
+                    'ContentHash': row[2],
+                    'SegmentCount': row[3],
+                    'CreatedDate': row[4]
+                } for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error fetching versions of '%s': %s", schedule_name, e, exc_info=True)
+            return []
+
+    @classmethod
+    @timed('db.load_schedule_version')
+    def load_schedule_version(cls, version_id: int) -> Optional[List[Segment]]:
+        """Load the exact entries of a schedule version, in the same format as load_schedule."""
+        try:
+            with cls.get_connection() as conn:
+                segments = schedule_versions.load_segments(conn.cursor(), version_id)
+                if segments is None:
+                    logger.warning("No schedule version with id: %s", version_id)
+                    return None
+                return [Segment.from_row(segment) for segment in segments]
+        except Exception as e:
+            logger.error("Error loading schedule version %s: %s", version_id, e, exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.diff_schedule_versions')
+    def diff_schedule_versions(cls, old_version_id: int, new_version_id: int) -> Optional[List]:
+        """Segment changes between two versions (schedule_versions.SegmentChange list)."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                old = schedule_versions.load_segments(cursor, old_version_id)
+                new = schedule_versions.load_segments(cursor, new_version_id)
+                if old is None or new is None:
+                    return None
+                return schedule_versions.diff_segments(old, new)
+        except Exception as e:
+            logger.error("Error diffing versions %s and %s: %s", old_version_id, new_version_id, e,
+                         exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.sync_recipes')
+    def sync_recipes(cls, target: str) -> Optional[SyncResult]:
+        """Exchange schedule changes with another station.
+
+        Args:
+            target: another station's database file, or a hub directory
+                    (e.g. on a shared drive) where every station keeps a change feed
+        Returns:
+            SyncResult with the number of changes sent and received and
+            conflicts found, or None if the sync failed
+        """
+        try:
+            station = cls.write('prepare_sync')
+            if os.path.isdir(target):
+                result = cls._sync_hub(target, station)
+            else:
+                result = cls._sync_peer(target, station)
+            logger.info("Synced recipes with %s: %d sent, %d received, %d conflicts", target, *result)
+            return result
+        except Exception as e:
+            logger.error("Error syncing recipes with %s: %s", target, e, exc_info=True)
+            return None
+
+    @classmethod
+    def _sync_hub(cls, hub_dir: str, station: str) -> SyncResult:
+        # Publish this station's own changes; the other feeds carry everyone else's
+        push_key = f"push:{os.path.abspath(hub_dir)}"
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            pushed = int(recipe_sync.get_state(cursor, push_key, 0))
+            outgoing, position = recipe_sync.changes_since(cursor, pushed, only_origin=station)
+            offsets = {feed: int(recipe_sync.get_state(cursor, f"pull:{feed}", 0))
+                       for feed in recipe_sync.hub_feeds(hub_dir, station)}
+        if outgoing:
+            recipe_sync.append_hub(recipe_sync.hub_file(hub_dir, station), outgoing)
+        cls.write('set_sync_state', push_key, position)
+
+        incoming = []
+        cursors = {}
+        for feed, offset in offsets.items():
+            changes, cursors[f"pull:{feed}"] = recipe_sync.read_hub(feed, offset)
+            incoming.extend(changes)
+        applied, conflicts = cls.write('receive_changes', incoming, cursors)
+        return SyncResult(len(outgoing), applied, conflicts)
+
+    @classmethod
+    def _sync_peer(cls, peer_path: str, station: str) -> SyncResult:
+        if not os.path.exists(peer_path):
+            raise FileNotFoundError(peer_path)
+
+        def peer_transaction(transaction, *args):
+            def run():
+                cursor = peer.cursor()
+                try:
+                    result = transaction(cursor, *args)
+                    peer.commit()
+                    return result
+                except Exception:
+                    peer.rollback()
+                    raise
+            return with_backoff(run)
+
+        peer = connect(peer_path)
+        try:
+            peer_station = peer_transaction(recipe_sync.prepare)
+            # Each side keeps its own position in the other's change log
+            received_key, sent_key = f"pull:{peer_station}", f"pull:{station}"
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                outgoing, sent_position = recipe_sync.changes_since(
+                    cursor, int(recipe_sync.get_state(peer.cursor(), sent_key, 0)), exclude_origin=peer_station)
+                received = int(recipe_sync.get_state(cursor, received_key, 0))
+            sent, sent_conflicts = peer_transaction(recipe_sync.receive, outgoing, {sent_key: sent_position},
+                                                    cls._store_schedule, cls._remove_schedule)
+
+            incoming, received_position = recipe_sync.changes_since(peer.cursor(), received, exclude_origin=station)
+            applied, conflicts = cls.write('receive_changes', incoming, {received_key: received_position})
+            return SyncResult(sent, applied, conflicts + sent_conflicts)
+        finally:
+            peer.close()
+
+    @classmethod
+    def _tx_prepare_sync(cls, cursor) -> str:
+        return recipe_sync.prepare(cursor)
+
+    @classmethod
+    def _tx_set_sync_state(cls, cursor, key: str, value):
+        recipe_sync.set_state(cursor, key, value)
+
+    @classmethod
+    def _tx_receive_changes(cls, cursor, changes: List, cursors: Dict) -> List[int]:
+        return list(recipe_sync.receive(cursor, changes, cursors, cls._store_schedule, cls._remove_schedule))
+
+    @classmethod
+    @timed('db.fetch_sync_conflicts')
+    def fetch_sync_conflicts(cls) -> List[Dict]:
+        """Schedules changed here and on another station since they last synced."""
+        try:
+            with cls.get_connection() as conn:
+                return recipe_sync.conflicts(conn.cursor())
+        except Exception as e:
+            logger.error("Error fetching sync conflicts: %s", e, exc_info=True)
+            return []
+
+    @classmethod
+    @timed('db.resolve_sync_conflict')
+    def resolve_sync_conflict(cls, schedule_name: str, keep_remote: bool) -> bool:
+        """Keep this station's or the other station's version of a conflicting schedule."""
+        try:
+            return cls.write('resolve_sync_conflict', schedule_name, keep_remote)
+        except Exception as e:
+            logger.error("Error resolving sync conflict for '%s': %s", schedule_name, e, exc_info=True)
+            return False
+
+    @classmethod
+    def _tx_resolve_sync_conflict(cls, cursor, schedule_name: str, keep_remote: bool) -> bool:
+        return recipe_sync.resolve(cursor, schedule_name, keep_remote, cls._store_schedule, cls._remove_schedule)
+
+    @classmethod
+    @timed('db.validate_schedules')
+    def validate_schedules(cls) -> Optional[Dict[str, List]]:
+        """Validate every stored schedule in one pass (schedule_validation.ValidationIssue lists by name)."""
+        try:
+            with cls.get_connection() as conn:
+                return schedule_validation.validate_database(conn.cursor())
+        except Exception as e:
+            logger.error("Error validating schedules: %s", e, exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.load_program_memory')
+    def load_program_memory(cls, controller_id: str, dialect=None) -> Optional[ProgramMemory]:
+        """Load what a controller's program slots hold and which recipe uses each."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT slot, schedule_name, temperature, minutes
+                    FROM program_slots WHERE controller_id = ?
+                """, (controller_id,))
+                memory = ProgramMemory(dialect=dialect)
+                for slot, schedule_name, temperature, minutes in cursor.fetchall():
+                    if slot < memory.slot_count:
+                        memory.owners[slot] = schedule_name
+                        memory.contents[slot] = (temperature, minutes) if temperature is not None else None
+                return memory
+        except Exception as e:
+            logger.error("Error loading program slots of '%s': %s", controller_id, e, exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.save_program_memory')
+    def save_program_memory(cls, controller_id: str, memory: ProgramMemory) -> bool:
+        """Record a controller's program slots, e.g. after the commands of a ProgramPlan were sent."""
+        try:
+            rows = [(controller_id, slot, owner, *(content or (None, None)))
+                    for slot, (owner, content) in enumerate(zip(memory.owners, memory.contents))
+                    if owner is not None or content is not None]
+            cls.write('save_program_memory', controller_id, rows)
+            return True
+        except Exception as e:
+            logger.error("Error saving program slots of '%s': %s", controller_id, e, exc_info=True)
+            return False
+
+    @classmethod
+    def _tx_save_program_memory(cls, cursor, controller_id: str, rows: List[Tuple]):
+        cursor.execute("DELETE FROM program_slots WHERE controller_id = ?", (controller_id,))
+        cursor.executemany("""
+            INSERT INTO program_slots (controller_id, slot, schedule_name, temperature, minutes)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+    @classmethod
+    @timed('db.load_thermal_fit')
+    def load_thermal_fit(cls, furnace_id: str) -> Optional[Dict]:
+        """Load a furnace's stored thermal fit statistics and the run id up to which every run is included."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT payload, last_run_id, modified_date FROM thermal_fits WHERE furnace_id = ?
+                """, (furnace_id,))
+                row = cursor.fetchone()
+                return {'Payload': row[0], 'LastRunId': row[1], 'ModifiedDate': row[2]} if row else None
+        except Exception as e:
+            logger.error("Error loading thermal fit of '%s': %s", furnace_id, e, exc_info=True)
+            return None
+
+    @classmethod
+    @timed('db.save_thermal_fit')
+    def save_thermal_fit(cls, furnace_id: str, payload: str, last_run_id: int) -> bool:
+        """Store a furnace's thermal fit statistics, replacing the previous ones."""
+        try:
+            cls.write('save_thermal_fit', furnace_id, payload, last_run_id)
+            return True
+        except Exception as e:
+            logger.error("Error saving thermal fit of '%s': %s", furnace_id, e, exc_info=True)
+            return False
+
+    @classmethod
+    def _tx_save_thermal_fit(cls, cursor, furnace_id: str, payload: str, last_run_id: int):
+        cursor.execute("""
+            INSERT OR REPLACE INTO thermal_fits (furnace_id, payload, last_run_id, modified_date)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (furnace_id, payload, last_run_id))
 
     @classmethod
     def diagnose_database(cls):
@@ -224,17 +766,17 @@ class DatabaseManager:
                 # List all tables
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
                 tables = cursor.fetchall()
-                logger.info(f"Existing tables: {tables}")
+                logger.info("Existing tables: %s", tables)
                 
                 # Check schedules table
                 cursor.execute("SELECT * FROM schedules;")
                 schedules = cursor.fetchall()
-                logger.info(f"Existing schedules: {schedules}")
+                logger.info("Existing schedules: %s", schedules)
                 
                 # Check schedule_entries
                 cursor.execute("SELECT * FROM schedule_entries;")
                 entries = cursor.fetchall()
-                logger.info(f"Existing entries: {entries}")
+                logger.info("Existing entries: %s", entries)
                 
         except Exception as e:
-            logger.error(f"Diagnostic error: {e}", exc_info=True)
\ No newline at end of file
+            logger.error("Diagnostic error: %s", e, exc_info=True)
\ No newline at end of file
@@ -0,0 +1,337 @@
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Optional
+
+from constants import (DB_NAME, DB_PATH_ENV_VAR, DB_JOURNAL_ENV_VAR, DB_BUSY_TIMEOUT_MS,
+                       DB_LOCK_RETRIES, DB_LOCK_BACKOFF_SECONDS, DB_LOCK_BACKOFF_MAX_SECONDS,
+                       DB_WRITER_PORT_BASE, DB_WRITER_PORT_RANGE, DB_WRITER_RESEND_ATTEMPTS,
+                       DB_WRITER_BACKLOG, DB_WRITE_TOKEN_RETENTION_SECONDS)
+from version import APP_NAME
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWriteError(Exception):
+    """A write transaction failed in the writer process."""
+
+
+def get_app_data_dir() -> str:
+    """Per-user directory for the database, run files and other app data."""
+    return os.path.join(os.getenv('APPDATA') or os.path.expanduser('~/.local/share'), APP_NAME)
+
+
+def resolve_db_path() -> str:
+    """The one database path every entry point should use.
+
+    SMARTFURNACE_DB overrides the default, e.g. to point stations at a
+    database on a shared drive.
+    """
+    override = os.environ.get(DB_PATH_ENV_VAR)
+    if override:
+        return os.path.abspath(os.path.expanduser(override))
+    return os.path.join(get_app_data_dir(), DB_NAME)
+
+
+def is_network_path(path: str) -> bool:
+    """Best-effort check for a database on a network share."""
+    path = os.path.abspath(path)
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if platform.system() == 'Windows':
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0]
+            return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    return False
+
+
+def journal_mode_for(path: str) -> str:
+    """WAL locally; rollback journal on network shares, where WAL's shared memory is unsafe."""
+    override = os.environ.get(DB_JOURNAL_ENV_VAR)
+    if override:
+        return override.upper()
+    return 'DELETE' if is_network_path(path) else 'WAL'
+
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection with the busy timeout and foreign keys every caller relies on."""
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=check_same_thread)
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def set_journal_mode(conn: sqlite3.Connection, path: str) -> str:
+    """Switch the database to its journal mode; persists in the file for WAL."""
+    mode = journal_mode_for(path)
+    result = conn.execute(f"PRAGMA journal_mode = {mode}").fetchone()[0]
+    if mode == 'WAL':
+        # Safe in WAL mode and avoids an fsync per commit
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return result
+
+
+def is_locked_error(error: Exception) -> bool:
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def with_backoff(operation: Callable, retries: int = DB_LOCK_RETRIES,
+                 base_delay: float = DB_LOCK_BACKOFF_SECONDS,
+                 max_delay: float = DB_LOCK_BACKOFF_MAX_SECONDS):
+    """Run operation, retrying "database is locked" with jittered exponential backoff.
+
+    The busy timeout already waits inside SQLite; this covers locks held
+    longer than that, e.g. by another station on a shared drive.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == retries:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning("Database locked, retrying in %.2fs (attempt %d/%d)", delay, attempt + 1, retries)
+            time.sleep(delay)
+
+
+def writer_address(path: str):
+    """Local address of the writer for a database, the same in every process."""
+    digest = hashlib.sha256(os.path.normcase(os.path.abspath(path)).encode('utf-8')).digest()
+    return '127.0.0.1', DB_WRITER_PORT_BASE + int.from_bytes(digest[:4], 'big') % DB_WRITER_PORT_RANGE
+
+
+def load_authkey(key_dir: str) -> bytes:
+    """Per-user secret that clients must prove before the writer accepts requests."""
+    os.makedirs(key_dir, exist_ok=True)
+    key_file = os.path.join(key_dir, 'writer.key')
+    try:
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process may still be writing it
+        for _ in range(50):
+            with open(key_file, 'rb') as f:
+                key = f.read()
+            if len(key) == 32:
+                return key
+            time.sleep(0.01)
+        raise DatabaseWriteError(f"Invalid writer key file: {key_file}")
+    key = os.urandom(32)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+class WriteCoordinator:
+    """Funnels all write transactions on a database through one writer process.
+
+    The first process to bind the writer address becomes the writer and runs
+    transactions on its own connection, one at a time. Other processes on the
+    same machine send (name, args) requests over a local authenticated
+    connection and wait for the result. If the writer exits, the next write
+    elects a new one. Readers are not involved and read WAL snapshots directly.
+
+    Writer ports are derived from the database path and can collide, so a
+    client first names its database and only uses a writer serving the same
+    one; otherwise it writes directly.
+
+    Transactions are looked up by name with resolve(name), which returns a
+    callable taking a cursor and the request arguments. Results must be
+    JSON-serialisable: they are stored with each request's token so a
+    request resent after the writer exited is not applied twice.
+    """
+
+    def __init__(self, path: str, resolve: Callable[[str], Callable], key_dir: str):
+        self.path = path
+        self.database = os.path.normcase(os.path.realpath(path))
+        self.resolve = resolve
+        self.address = writer_address(path)
+        self.authkey = load_authkey(key_dir)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._client = None
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def is_writer(self) -> bool:
+        return self._db is not None
+
+    def execute(self, name: str, args: tuple = ()):
+        """Run a named write transaction and return its result."""
+        with self._lock:
+            if self._db is None and self._client is None:
+                self._connect_or_serve()
+            if self._client is None:
+                return self._run(name, args)
+
+            # The token lets a new writer recognise a request the old one already committed
+            token = uuid.uuid4().hex
+            for attempt in range(DB_WRITER_RESEND_ATTEMPTS):
+                try:
+                    self._client.send((name, args, token))
+                    status, value = self._client.recv()
+                    break
+                except (OSError, EOFError):
+                    # The writer exited; elect a new one and resend
+                    self._close_client()
+                    self._connect_or_serve()
+                    if self._client is None:
+                        return self._run(name, args, token)
+            else:
+                raise DatabaseWriteError(f"No database writer available for '{name}'")
+            if status == 'error':
+                raise DatabaseWriteError(value)
+            return value
+
+    def close(self):
+        with self._lock:
+            self._close_client()
+            if self._listener is not None:
+                self._listener.close()
+                self._listener = None
+            with self._db_lock:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
+
+    def _connect_or_serve(self):
+        error = None
+        for attempt in range(DB_WRITER_RESEND_ATTEMPTS):
+            try:
+                client = Client(self.address, authkey=self.authkey)
+            except Exception:
+                client = None
+            else:
+                try:
+                    serves_ours = self._handshake(client)
+                except (OSError, EOFError):
+                    # The writer exited during the handshake
+                    client.close()
+                    client = None
+            if client is not None:
+                if serves_ours:
+                    self._client = client
+                    logger.debug("Sending database writes to writer at %s:%s", *self.address)
+                    return
+                client.close()
+                logger.warning("The writer on %s:%s serves another database; writing %s directly",
+                               *self.address, self.path)
+                break
+            try:
+                # The default backlog of 1 drops handshakes when several clients connect at once
+                self._listener = Listener(self.address, backlog=DB_WRITER_BACKLOG, authkey=self.authkey)
+                logger.info("This process is the database writer on %s:%s", *self.address)
+                break
+            except OSError as e:
+                # Usually another process won the election a moment ago
+                error = e
+                time.sleep(random.uniform(0.01, 0.05))
+        else:
+            # The port is taken by something else; write directly and rely on backoff
+            logger.warning("Cannot start database writer on %s:%s (%s); writing directly", *self.address, error)
+        self._db = connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS write_requests
+            (token TEXT PRIMARY KEY, result TEXT, created REAL NOT NULL)
+        """)
+        self._db.commit()
+        if self._listener is not None:
+            threading.Thread(target=self._serve, name='db-writer', daemon=True).start()
+
+    def _handshake(self, client) -> bool:
+        """Tell a writer which database this process writes; whether it serves that one."""
+        client.send(('database', self.database))
+        status, _ = client.recv()
+        return status == 'ok'
+
+    def _close_client(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except OSError:
+                pass
+            self._client = None
+
+    def _run(self, name: str, args: tuple, token: Optional[str] = None):
+        transaction = self.resolve(name)
+        with self._db_lock:
+            return with_backoff(lambda: self._transaction(transaction, args, token))
+
+    def _transaction(self, transaction: Callable, args: tuple, token: Optional[str]):
+        cursor = self._db.cursor()
+        try:
+            if token is not None:
+                cursor.execute("SELECT result FROM write_requests WHERE token = ?", (token,))
+                done = cursor.fetchone()
+                if done:
+                    return json.loads(done[0])
+            result = transaction(cursor, *args)
+            if token is not None:
+                now = time.time()
+                cursor.execute("INSERT INTO write_requests (token, result, created) VALUES (?, ?, ?)",
+                               (token, json.dumps(result), now))
+                cursor.execute("DELETE FROM write_requests WHERE created < ?",
+                               (now - DB_WRITE_TOKEN_RETENTION_SECONDS,))
+            self._db.commit()
+            return result
+        except Exception:
+            self._db.rollback()
+            raise
+
+    def _serve(self):
+        listener = self._listener
+        while listener is self._listener:
+            try:
+                conn = listener.accept()
+            except OSError:
+                break  # Listener closed
+            except Exception as e:
+                logger.warning("Rejected database writer client: %s", e)
+                continue
+            if listener is not self._listener:
+                # Closed while waiting in accept; the client elects a new writer
+                conn.close()
+                break
+            threading.Thread(target=self._handle, args=(conn,), name='db-writer-client', daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                kind, database = conn.recv()
+                if kind != 'database' or database != self.database:
+                    conn.send(('error', f"This writer serves {self.database}"))
+                    return
+                conn.send(('ok', None))
+            except (OSError, EOFError, ValueError, TypeError):
+                return
+            while True:
+                try:
+                    name, args, token = conn.recv()
+                except (OSError, EOFError):
+                    return
+                if not self.is_writer:
+                    return  # Closed since; the client resends to a new writer
+                try:
+                    reply = ('ok', self._run(name, args, token))
+                except Exception as e:
+                    logger.error("Write transaction '%s' failed: %s", name, e)
+                    reply = ('error', f"{type(e).__name__}: {e}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
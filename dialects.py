@@ -0,0 +1,45 @@
+from typing import Tuple
+
+
+class ControllerDialect:
+    """How one brand of controller is programmed.
+
+    A recipe takes one program per segment, holding a temperature and a
+    time in the controller's own units. A dialect converts segments to
+    those values and formats the commands that write them. Other brands
+    are added as plugins (see plugins.py).
+    """
+
+    name = ''
+
+    def temperature_value(self, temperature: float) -> int:
+        return int(temperature)
+
+    def time_value(self, seconds: int) -> int:
+        """A segment's duration in the controller's time unit."""
+        raise NotImplementedError
+
+    def program_step(self, segment) -> Tuple[int, int]:
+        """(temperature, time) the controller stores for a segment."""
+        return self.temperature_value(segment.start_temp), self.time_value(segment.seconds)
+
+    def temperature_command(self, program: int, temperature: int) -> str:
+        raise NotImplementedError
+
+    def time_command(self, program: int, time: int) -> str:
+        raise NotImplementedError
+
+
+class PvSvDialect(ControllerDialect):
+    """Controllers set with PV=C<n>, SV=<°C> and PV=t<n>, SV=<minutes>, timed in whole minutes."""
+
+    name = 'pv-sv'
+
+    def time_value(self, seconds: int) -> int:
+        return seconds // 60 + (1 if seconds % 60 else 0)  # Round up if there are seconds
+
+    def temperature_command(self, program: int, temperature: int) -> str:
+        return f"PV=C{program}, SV={temperature}"
+
+    def time_command(self, program: int, time: int) -> str:
+        return f"PV=t{program}, SV={time}"
@@ -0,0 +1,150 @@
+import math
+from collections import deque
+from typing import List, Optional
+
+from constants import (ETA_SETTLE_TOLERANCE, ETA_MAX_WAIT_MINUTES, ETA_RATE_INTERVAL_MINUTES,
+                       ETA_RATE_SMOOTHING, ETA_MIN_RATE)
+from schedule_profile import ScheduleProfile
+
+
+def settle_minutes(temperature: float, target: float, tolerance: float, model=None,
+                   rate: Optional[float] = None) -> Optional[float]:
+    """Minutes until the furnace is within tolerance of target, or None if it cannot be told.
+
+    With a learned model (thermal_fit.LearnedModel) this is its dead time
+    plus the first-order approach from the current error. Without one, the
+    measured rate of change in °C/min is extrapolated when it is heading
+    towards the target.
+    """
+    error = abs(target - temperature)
+    if error <= tolerance:
+        return 0.0
+    if model is not None:
+        tau = model.tau_heat if target > temperature else model.tau_cool
+        return min(ETA_MAX_WAIT_MINUTES, (model.dead_time + tau * math.log(error / tolerance)) / 60)
+    if rate is not None and abs(rate) >= ETA_MIN_RATE and (rate > 0) == (target > temperature):
+        return min(ETA_MAX_WAIT_MINUTES, (error - tolerance) / abs(rate))
+    return None
+
+
+def expected_waits(profile: ScheduleProfile, model, tolerance: float = ETA_SETTLE_TOLERANCE,
+                   holds_wait: bool = True):
+    """Minutes each segment is expected to wait and the minutes to settle after the end.
+
+    Runs the learned model through the schedule once, stopping profile time
+    at guaranteed soaks the way HoldTracker does, so the waits include the
+    lag built up by every ramp before them.
+    """
+    waits = [0.0] * len(profile)
+    if model is None or not len(profile):
+        return waits, 0.0
+    step_minutes = model.step / 60
+    delayed = deque([profile.start_temps[0]] * (model.dead_steps + 1))
+    temperature = profile.start_temps[0]
+    change = previous = 0.0
+    minutes = 0.0
+    steps = 0
+    max_steps = int((profile.total_minutes + ETA_MAX_WAIT_MINUTES * (1 + profile.cycle_types.count('Hold')))
+                    / step_minutes) + 1
+
+    def advance(setpoint):
+        nonlocal temperature, change, previous
+        delayed.append(setpoint)
+        error = delayed.popleft() - temperature
+        change, previous = ((model.heat if error > 0 else model.cool) * error + model.momentum * previous
+                            + model.drift, change)
+        temperature += change
+
+    while minutes < profile.total_minutes and steps < max_steps:
+        steps += 1
+        index = profile.segment_index(minutes)
+        tolerance_band = profile.tolerances[index]
+        if (holds_wait and tolerance_band is not None and waits[index] < ETA_MAX_WAIT_MINUTES
+                and abs(temperature - profile.end_temps[index]) > tolerance_band):
+            waits[index] += step_minutes
+        else:
+            minutes += step_minutes
+        advance(profile.setpoint_at(minutes)[0])
+
+    final = profile.end_temps[-1]
+    settle = 0.0
+    while abs(temperature - final) > tolerance and settle < ETA_MAX_WAIT_MINUTES:
+        settle += step_minutes
+        advance(final)
+    return waits, settle
+
+
+class EtaEstimator:
+    """Minutes left in a cycle, including guaranteed soak waits and the furnace settling at the end.
+
+    The expected waits of every segment are worked out once per schedule,
+    and suffix sums of them make each tick's update a constant amount of
+    work: the current segment only moves forward, so finding it is
+    amortized O(1). The segment being waited on, and the settling after
+    the end, are estimated live from the measured temperature.
+    """
+
+    def __init__(self, profile: ScheduleProfile, model=None, holds_wait: bool = True,
+                 tolerance: float = ETA_SETTLE_TOLERANCE):
+        self.profile = profile
+        self.model = model
+        self.holds_wait = holds_wait
+        self.tolerance = tolerance
+        waits, self.settle = expected_waits(profile, model, tolerance, holds_wait)
+        # later_waits[i]: expected waits of the segments after i
+        self.later_waits: List[float] = [0.0] * len(waits)
+        for index in range(len(waits) - 2, -1, -1):
+            self.later_waits[index] = self.later_waits[index + 1] + waits[index + 1]
+        self.waits = waits
+        self.reset()
+
+    def reset(self):
+        self.index = 0
+        self.rate: Optional[float] = None  # smoothed measured °C/min
+        self._rate_start = None  # (elapsed minutes, temperature) the current rate interval began at
+        self.remaining = self.initial_minutes()
+
+    def initial_minutes(self) -> float:
+        """Expected length of the whole cycle before it starts."""
+        return self.profile.total_minutes + sum(self.waits) + self.settle
+
+    def update(self, elapsed_minutes: float, profile_minutes: float, measured: Optional[float]) -> float:
+        """Account for one tick and return the expected minutes left."""
+        profile = self.profile
+        if not len(profile):
+            self.remaining = 0.0
+            return self.remaining
+        if measured is not None:
+            # Rates over whole intervals; tick-to-tick differences would be mostly sensor noise
+            if self._rate_start is None or elapsed_minutes < self._rate_start[0]:
+                self._rate_start = (elapsed_minutes, measured)
+            elif elapsed_minutes - self._rate_start[0] >= ETA_RATE_INTERVAL_MINUTES:
+                rate = (measured - self._rate_start[1]) / (elapsed_minutes - self._rate_start[0])
+                self.rate = rate if self.rate is None else self.rate + ETA_RATE_SMOOTHING * (rate - self.rate)
+                self._rate_start = (elapsed_minutes, measured)
+
+        starts = profile.starts
+        while self.index + 1 < len(starts) and starts[self.index + 1] <= profile_minutes:
+            self.index += 1
+        index = self.index
+
+        if profile_minutes >= profile.total_minutes:
+            # Schedule done; only the furnace settling on its final temperature is left
+            settle = settle_minutes(measured, profile.end_temps[-1], self.tolerance, self.model, self.rate) \
+                if measured is not None else None
+            self.remaining = settle if settle is not None else 0.0
+            return self.remaining
+
+        remaining = profile.total_minutes - profile_minutes + self.later_waits[index] + self.settle
+        band = profile.tolerances[index]
+        if self.holds_wait and band is not None:
+            target = profile.end_temps[index]
+            if measured is None:
+                wait = self.waits[index]
+            else:
+                wait = settle_minutes(measured, target, band, self.model, self.rate)
+                if wait is None:  # not heading for the soak yet; assume it goes as planned
+                    wait = self.waits[index]
+            remaining += wait
+        self.remaining = remaining
+        return remaining
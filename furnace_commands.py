@@ -1,13 +1,48 @@
+from typing import List, Sequence, Tuple
+
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, 
-                            QLabel, QSpinBox, QTableWidget, QTableWidgetItem)
+                            QLabel, QSpinBox, QTableWidget, QTableWidgetItem, QComboBox, QMessageBox)
 from PyQt5.QtCore import Qt
 from styles import get_dialog_style, get_button_style
+from constants import PROGRAM_SLOT_COUNT, PROGRAM_ALLOCATION_STRATEGIES, PROGRAM_CONTROLLER_ID
+from database import DatabaseManager
+from plugins import load_dialect
+from program_slots import ProgramSpaceError
+
+
+def program_steps(segments: Sequence, dialect=None) -> List[Tuple[int, int]]:
+    """(temperature, time) the controller stores for each segment.
+
+    Args:
+        segments: Expanded segments, e.g. ScheduleProfile.expanded_cycles()
+        dialect: Controller dialect, the configured one if None
+    """
+    dialect = dialect or load_dialect()
+    return [dialect.program_step(cycle) for cycle in segments]
+
+
+def furnace_commands(segments: Sequence, initial_program: int = 0, dialect=None) -> List[Tuple[str, str]]:
+    """(temperature command, time command) for each segment, numbered from initial_program."""
+    dialect = dialect or load_dialect()
+    return [(dialect.temperature_command(initial_program + i, temperature),
+             dialect.time_command(initial_program + i, time))
+            for i, (temperature, time) in enumerate(program_steps(segments, dialect))]
+
 
 class FurnaceCommandsWindow(QDialog):
-    def __init__(self, parent=None, schedule_data=None):
+    def __init__(self, parent=None, schedule_data=None, schedule_name=None,
+                 controller_id=PROGRAM_CONTROLLER_ID):
         super().__init__(parent)
         self.schedule_data = schedule_data
+        self.schedule_name = schedule_name
+        self.controller_id = controller_id
         self.initial_program = 0
+        self.dialect = load_dialect()
+        self.steps = program_steps(schedule_data or [], self.dialect)
+        # The controller's slot map; None without a schedule name or if it cannot be loaded
+        self.memory = DatabaseManager.load_program_memory(controller_id, self.dialect) if schedule_name else None
+        self.plan = None
+        self.pending_memory = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -23,17 +58,46 @@ class FurnaceCommandsWindow(QDialog):
         number_layout = QHBoxLayout()
         label = QLabel("Initial Program Number:")
         self.program_spin = QSpinBox()
-        self.program_spin.setRange(0, 99)
+        self.program_spin.setRange(0, PROGRAM_SLOT_COUNT - 1)
         self.program_spin.valueChanged.connect(self.update_commands)
         
         number_layout.addWidget(label)
         number_layout.addWidget(self.program_spin)
         number_layout.addStretch()
+
+        # Slot map: pack this recipe among the others already in the controller
+        slot_layout = QHBoxLayout()
+        self.strategy_combo = QComboBox()
+        self.strategy_combo.addItems(PROGRAM_ALLOCATION_STRATEGIES)
+        self.allocate_button = QPushButton("Allocate Slots")
+        self.allocate_button.setStyleSheet(get_button_style())
+        self.allocate_button.clicked.connect(self.allocate)
+        self.record_button = QPushButton("Record as Written")
+        self.record_button.setStyleSheet(get_button_style())
+        self.record_button.clicked.connect(self.record_written)
+        self.record_button.setEnabled(False)
+        slot_layout.addWidget(self.strategy_combo)
+        slot_layout.addWidget(self.allocate_button)
+        slot_layout.addWidget(self.record_button)
+        slot_layout.addStretch()
         
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+
         # Commands table
         self.table = QTableWidget()
         self.table.setColumnCount(2)
         self.table.setHorizontalHeaderLabels(["Temperature Commands", "Time Commands"])
+
+        # Recipes resident in the controller
+        self.recipe_table = QTableWidget()
+        self.recipe_table.setColumnCount(2)
+        self.recipe_table.setHorizontalHeaderLabels(["Recipe", "Programs"])
+        self.recipe_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.recipe_table.setMaximumHeight(150)
+        self.remove_button = QPushButton("Free Selected Recipe")
+        self.remove_button.setStyleSheet(get_button_style())
+        self.remove_button.clicked.connect(self.free_selected)
         
         # Close button
         close_button = QPushButton("Close")
@@ -42,33 +106,111 @@ class FurnaceCommandsWindow(QDialog):
         
         # Add widgets to layout
         layout.addLayout(number_layout)
+        if self.memory is not None:
+            layout.addLayout(slot_layout)
+        layout.addWidget(self.status_label)
         layout.addWidget(self.table)
+        if self.memory is not None:
+            layout.addWidget(self.recipe_table)
+            layout.addWidget(self.remove_button)
         layout.addWidget(close_button)
         
         self.setLayout(layout)
+        self.update_recipes()
         self.update_commands()
         
     def update_commands(self):
         """Update the commands table based on schedule and program number."""
         if not self.schedule_data:
             return
-            
+
+        # Picking a number by hand discards an allocation not yet recorded
+        self.plan = self.pending_memory = None
+        self.record_button.setEnabled(False)
+        self.table.setHorizontalHeaderLabels(["Temperature Commands", "Time Commands"])
+        start = self.program_spin.value()
         self.table.setRowCount(len(self.schedule_data))
-        program_num = self.program_spin.value()
+        commands = furnace_commands(self.schedule_data, start, self.dialect)
         
-        for i, cycle in enumerate(self.schedule_data):
-            # Temperature command
-            temp_cmd = f"PV=C{program_num + i}, SV={int(cycle['StartTemp'])}"
+        for i, (temp_cmd, time_cmd) in enumerate(commands):
             self.table.setItem(i, 0, QTableWidgetItem(temp_cmd))
-            
-            # Time command
-            time_minutes = self.parse_time_to_minutes(cycle['CycleTime'])
-            time_cmd = f"PV=t{program_num + i}, SV={time_minutes}"
             self.table.setItem(i, 1, QTableWidgetItem(time_cmd))
             
         self.table.resizeColumnsToContents()
-        
-    def parse_time_to_minutes(self, time_str):
-        """Convert time string (HH:MM:SS) to minutes."""
-        h, m, s = map(int, time_str.split(':'))
-        return h * 60 + m + (1 if s > 0 else 0)  # Round up if there are seconds 
\ No newline at end of file
+        self.status_label.setText(self.check_range(start))
+
+    def check_range(self, start: int) -> str:
+        """A warning if the programs from start overflow the controller or overlap other recipes."""
+        problems = []
+        end = start + len(self.steps)
+        if end > PROGRAM_SLOT_COUNT:
+            problems.append(f"Programs {start}-{end - 1} run past the last program, {PROGRAM_SLOT_COUNT - 1}.")
+        if self.memory is not None:
+            others = [name for name in self.memory.owners_between(start, len(self.steps))
+                      if name != self.schedule_name]
+            if others:
+                problems.append("Overwrites " + ", ".join(others) + ".")
+        return " ".join(problems)
+
+    def allocate(self):
+        """Place the recipe in the slot map and list only the writes that takes."""
+        memory = self.memory.copy()
+        try:
+            plan = memory.load(self.schedule_name, self.steps, self.strategy_combo.currentText())
+        except ProgramSpaceError as e:
+            QMessageBox.warning(self, "Allocate Slots", f"{e}. Free a recipe to make room.")
+            return
+        self.program_spin.blockSignals(True)
+        self.program_spin.setValue(plan.start)
+        self.program_spin.blockSignals(False)
+        self.plan, self.pending_memory = plan, memory
+
+        # Write pairs per slot are not needed any more, just the changed values in order
+        self.table.setHorizontalHeaderLabels(["Commands to Write", ""])
+        self.table.setRowCount(len(plan.commands))
+        for i, command in enumerate(plan.commands):
+            self.table.setItem(i, 0, QTableWidgetItem(command))
+            self.table.setItem(i, 1, QTableWidgetItem(""))
+        self.table.resizeColumnsToContents()
+
+        status = (f"Programs {plan.start}-{plan.start + len(self.steps) - 1}: "
+                  f"{len(plan.commands)} of {2 * len(self.steps)} commands to write.")
+        if plan.moved:
+            status += " Moves " + ", ".join(plan.moved) + " to make room."
+        self.status_label.setText(status)
+        self.record_button.setEnabled(True)
+
+    def record_written(self):
+        """Save the slot map once the listed commands have been sent to the controller."""
+        if self.pending_memory is None:
+            return
+        if DatabaseManager.save_program_memory(self.controller_id, self.pending_memory):
+            self.memory = self.pending_memory
+            self.pending_memory = None
+            self.record_button.setEnabled(False)
+            self.update_recipes()
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save the program slot map")
+
+    def free_selected(self):
+        """Mark a recipe's slots free; nothing is written to the controller."""
+        row = self.recipe_table.currentRow()
+        if row < 0:
+            return
+        memory = self.memory.copy()
+        memory.remove(self.recipe_table.item(row, 0).text())
+        if DatabaseManager.save_program_memory(self.controller_id, memory):
+            self.memory = memory
+            self.update_recipes()
+            self.update_commands()
+
+    def update_recipes(self):
+        if self.memory is None:
+            return
+        recipes = self.memory.recipes()
+        self.recipe_table.setRowCount(len(recipes))
+        for i, (name, (start, length)) in enumerate(recipes.items()):
+            self.recipe_table.setItem(i, 0, QTableWidgetItem(name))
+            self.recipe_table.setItem(i, 1, QTableWidgetItem(f"{start}-{start + length - 1}"))
+        self.recipe_table.resizeColumnsToContents()
+        self.recipe_table.setToolTip(f"{self.memory.free_slots} of {PROGRAM_SLOT_COUNT} programs free")
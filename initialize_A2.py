@@ -1,11 +1,14 @@
-import sqlite3
+import os
+from db_access import connect, resolve_db_path, with_backoff
 
 def run_sql_file(filename):
-    conn = sqlite3.connect('SmartFurnace.db')
+    db_path = resolve_db_path()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = connect(db_path)
     cursor = conn.cursor()
     with open(filename, 'r') as sql_file:
         sql_script = sql_file.read()
-    cursor.executescript(sql_script)
+    with_backoff(lambda: cursor.executescript(sql_script))
     conn.commit()
     conn.close()
 
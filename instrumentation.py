@@ -0,0 +1,217 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+from constants import METRICS_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+# Checked before any timing work so disabled instrumentation costs one global lookup
+_enabled = False
+
+_histograms: Dict[str, 'Histogram'] = {}
+_gauges: Dict[str, Callable[[], float]] = {}
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool):
+    """Turn timing collection on or off; collected data is kept."""
+    global _enabled
+    _enabled = enabled
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    __slots__ = ('name', 'bounds', 'counts', 'total', 'count', 'max')
+
+    def __init__(self, name: str, bounds=METRICS_BUCKETS_MS):
+        self.name = name
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, milliseconds: float):
+        self.counts[bisect.bisect_left(self.bounds, milliseconds)] += 1
+        self.total += milliseconds
+        self.count += 1
+        if milliseconds > self.max:
+            self.max = milliseconds
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bucket bound below which the given fraction of observations fall."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+def histogram(name: str) -> Histogram:
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms[name] = Histogram(name)
+    return hist
+
+
+def observe(name: str, milliseconds: float):
+    if _enabled:
+        histogram(name).observe(milliseconds)
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        histogram(self.name).observe((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    """Context manager timing a block into the named histogram (no-op when disabled)."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name: str):
+    """Decorator timing every call of a function into the named histogram."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram(name).observe((time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+def register_gauge(name: str, read: Callable[[], float]):
+    """Register a value read at export time, e.g. a queue depth."""
+    _gauges[name] = read
+
+
+def snapshot() -> Dict[str, Histogram]:
+    return dict(_histograms)
+
+
+def read_gauges() -> Dict[str, float]:
+    values = {}
+    for name, read in list(_gauges.items()):
+        try:
+            values[name] = float(read())
+        except Exception as e:
+            logger.debug("Gauge %s failed: %s", name, e)
+    return values
+
+
+def _metric_name(name: str) -> str:
+    return 'smartfurnace_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+
+def export_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, hist in sorted(_histograms.items()):
+        metric = _metric_name(name) + '_ms'
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in zip(hist.bounds, hist.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+        lines.append(f"{metric}_sum {hist.total:.3f}")
+        lines.append(f"{metric}_count {hist.count}")
+    for name, value in sorted(read_gauges().items()):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value:g}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus_file(path: str) -> bool:
+    """Write metrics for a node-exporter style textfile collector."""
+    try:
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(export_prometheus())
+        # Replace atomically so scrapers never read a partial file
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        logger.error("Error writing metrics file: %s", e)
+        return False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = export_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Metrics request: " + format, *args)
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> bool:
+    """Serve /metrics over HTTP from a daemon thread."""
+    global _server
+    if _server is not None:
+        return True
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error("Failed to start metrics server on port %s: %s", port, e)
+        return False
+    threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return True
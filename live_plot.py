@@ -0,0 +1,84 @@
+from typing import Optional
+
+import numpy as np
+import pyqtgraph as pg
+
+from constants import LIVE_PLOT_WINDOW_SECONDS, LIVE_PLOT_LINE_WIDTH, ACQ_RATE_HZ
+from plot_rendering import curve_options, optimize_curve
+
+
+class RingBuffer:
+    """Fixed-capacity series for one or more channels with a copy-free view of its contents.
+
+    Every value is stored twice, at i and i + capacity, so the newest
+    capacity values always form one contiguous slice. view() returns that
+    slice, which plot items can take without copying. Memory is allocated
+    once and never grows.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.full((channels, 2 * capacity), np.nan)
+        self.written = 0
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def clear(self):
+        self.written = 0
+
+    def extend(self, values: np.ndarray):
+        """Append (samples,) values for a single channel or (samples, channels) blocks."""
+        values = np.asarray(values, dtype=float).reshape(-1, self.channels)
+        skipped = max(0, len(values) - self.capacity)
+        positions = (self.written + skipped + np.arange(len(values) - skipped)) % self.capacity
+        block = values[skipped:].T
+        self.data[:, positions] = block
+        self.data[:, positions + self.capacity] = block
+        self.written += len(values)
+
+    def view(self) -> np.ndarray:
+        """The retained values, oldest first, as a (channels, samples) view into the buffer.
+
+        The view is only valid until the next extend().
+        """
+        if self.written <= self.capacity:
+            return self.data[:, :self.written]
+        start = self.written % self.capacity
+        return self.data[:, start:start + self.capacity]
+
+
+class LiveTraces:
+    """One curve per thermocouple channel over the last window_seconds of a cycle."""
+
+    def __init__(self, plot_item: pg.PlotItem, channels: int, rate_hz: float = ACQ_RATE_HZ,
+                 window_seconds: float = LIVE_PLOT_WINDOW_SECONDS):
+        capacity = max(1, int(window_seconds * rate_hz))
+        self.minutes = RingBuffer(capacity)
+        self.values = RingBuffer(capacity, channels)
+        self.curves = []
+        for channel in range(channels):
+            curve = pg.PlotDataItem(pen=pg.mkPen(pg.intColor(channel, hues=max(channels, 2)),
+                                                 width=LIVE_PLOT_LINE_WIDTH),
+                                  **curve_options())
+            plot_item.addItem(optimize_curve(curve))
+            self.curves.append(curve)
+
+    def clear(self):
+        self.minutes.clear()
+        self.values.clear()
+        self.refresh()
+
+    def extend(self, minutes: np.ndarray, values: np.ndarray):
+        """Append samples at the given plot times, one column of values per channel."""
+        self.minutes.extend(minutes)
+        self.values.extend(values)
+
+    def refresh(self, visible: Optional[bool] = None):
+        """Hand the current views to the curves; nothing is copied on this side."""
+        x = self.minutes.view()[0]
+        for curve, y in zip(self.curves, self.values.view()):
+            curve.setData(x, y)
+            if visible is not None:
+                curve.setVisible(visible)
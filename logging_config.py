@@ -0,0 +1,168 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from constants import (LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                       LOG_ROTATE_INTERVAL_SECONDS, LOG_QUEUE_SIZE)
+from version import APP_NAME
+
+_furnace_id = contextvars.ContextVar('furnace_id', default=None)
+_run_id = contextvars.ContextVar('run_id', default=None)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def get_log_dir() -> str:
+    """Directory the rotating log files are written to."""
+    return os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), APP_NAME)
+
+
+@contextmanager
+def log_context(furnace_id: Optional[str] = None, run_id: Optional[int] = None):
+    """Tag every record logged inside the block with a furnace and run id."""
+    furnace_token = _furnace_id.set(furnace_id)
+    run_token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _furnace_id.reset(furnace_token)
+        _run_id.reset(run_token)
+
+
+def set_log_context(furnace_id: Optional[str] = None, run_id: Optional[int] = None):
+    """Set the furnace and run id for records logged from now on in this context."""
+    _furnace_id.set(furnace_id)
+    _run_id.set(run_id)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current furnace/run ids onto records unless passed in extra=."""
+
+    def filter(self, record):
+        if not hasattr(record, 'furnace_id'):
+            record.furnace_id = _furnace_id.get()
+        if not hasattr(record, 'run_id'):
+            record.run_id = _run_id.get()
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats every record before enqueueing it, which
+    puts the cost on the calling (GUI) thread. Records stay in-process here,
+    so they can be enqueued as-is. Arguments are formatted later and should
+    not be mutated after logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the caller on a stalled disk; drop the record instead
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields of a record."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        furnace_id = getattr(record, 'furnace_id', None)
+        run_id = getattr(record, 'run_id', None)
+        if furnace_id is not None:
+            entry['furnace_id'] = furnace_id
+        if run_id is not None:
+            entry['run_id'] = run_id
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeTimeRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file exceeds max_bytes or when the interval has elapsed."""
+
+    def __init__(self, filename, max_bytes: int, backup_count: int, interval_seconds: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval_seconds = interval_seconds
+        self.rollover_at = time.time() + interval_seconds
+
+    def shouldRollover(self, record):
+        if self.interval_seconds and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval_seconds
+
+
+def setup_logging(level: str = LOG_LEVEL, log_dir: Optional[str] = None):
+    """Route all logging through a queue to a background writer thread.
+
+    The writer thread owns a size/time rotating JSON log file, so calls from
+    the GUI thread only enqueue a record. Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_dir = log_dir or get_log_dir()
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        target = SizeTimeRotatingFileHandler(os.path.join(log_dir, 'smartfurnace.log'),
+                                             LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                                             LOG_ROTATE_INTERVAL_SECONDS)
+    except OSError as e:
+        # Fall back to the console if the log file cannot be created
+        target = logging.StreamHandler()
+        logging.getLogger(__name__).warning("Failed to create log file: %s", e)
+    target.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    _queue_handler = LazyQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(log_queue, target, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+def log_queue_depth() -> int:
+    """Records waiting for the writer thread."""
+    return _queue_handler.queue.qsize() if _queue_handler else 0
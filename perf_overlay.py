@@ -0,0 +1,62 @@
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, QTimer
+import logging
+
+import instrumentation
+from constants import METRICS_OVERLAY_REFRESH_MS
+
+logger = logging.getLogger(__name__)
+
+
+class PerfOverlay(QLabel):
+    """Translucent panel over the plot listing hot-path timings and queue depths."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setStyleSheet("""
+            QLabel {
+                background-color: rgba(0, 0, 0, 160);
+                color: #E0E0E0;
+                font-family: monospace;
+                font-size: 11px;
+                padding: 6px;
+                border-radius: 4px;
+            }
+        """)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        # Whether collection was on before the overlay turned it on, e.g. from SMARTFURNACE_METRICS
+        self.collecting_before = False
+        self.hide()
+
+    def set_visible(self, visible: bool):
+        """Show or hide the overlay; timings are collected while it is shown.
+
+        Hiding it turns collection back off unless it was already on when the
+        overlay was shown.
+        """
+        if visible != self.isHidden():
+            return
+        if visible:
+            self.collecting_before = instrumentation.is_enabled()
+            instrumentation.set_enabled(True)
+            self.refresh()
+            self.refresh_timer.start(METRICS_OVERLAY_REFRESH_MS)
+            self.show()
+            self.raise_()
+        else:
+            instrumentation.set_enabled(self.collecting_before)
+            self.refresh_timer.stop()
+            self.hide()
+
+    def refresh(self):
+        lines = [f"{'metric':<28}{'n':>7}{'p50':>8}{'p95':>8}{'max':>9}"]
+        for name, hist in sorted(instrumentation.snapshot().items()):
+            lines.append(f"{name:<28}{hist.count:>7}{hist.percentile(0.5):>8g}"
+                         f"{hist.percentile(0.95):>8g}{hist.max:>9.2f}")
+        for name, value in sorted(instrumentation.read_gauges().items()):
+            lines.append(f"{name:<28}{value:>7g}")
+        self.setText('\n'.join(lines))
+        self.adjustSize()
@@ -0,0 +1,197 @@
+import logging
+import os
+import sys
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pyqtgraph as pg
+import pyqtgraph.exporters
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QObject, QTimer, Qt
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication
+
+from constants import (PLOT_RENDER_ENV_VAR, PLOT_RENDER_MODES, PLOT_MAX_FPS, PLOT_IMAGE_SIZE,
+                       PLOT_DOWNSAMPLE_FACTOR)
+from instrumentation import timer
+from styles import get_plot_theme
+
+logger = logging.getLogger(__name__)
+
+_mode = PLOT_RENDER_MODES[0]
+_application = None  # created by offscreen_application; must outlive the plots
+
+
+def opengl_available() -> bool:
+    """Whether plots can be drawn through an OpenGL viewport on this display."""
+    app = QApplication.instance()
+    if app is not None and app.platformName() in ('offscreen', 'minimal'):
+        return False
+    # Qt builds without OpenGL support leave QOpenGLWidget out of QtWidgets
+    return hasattr(QtWidgets, 'QOpenGLWidget')
+
+
+def configure_rendering(mode: Optional[str] = None) -> str:
+    """Choose how plots are drawn; call once the QApplication exists, before creating plots.
+
+    quality: antialiased lines, the default look
+    fast: lines without antialiasing, several times cheaper to draw
+    opengl: as fast, drawn through an OpenGL viewport; falls back to fast
+        where OpenGL is unavailable, e.g. headless machines
+
+    The mode comes from SMARTFURNACE_RENDER unless one is given.
+
+    Returns:
+        str: the mode in use
+    """
+    global _mode
+    mode = (mode or os.environ.get(PLOT_RENDER_ENV_VAR) or PLOT_RENDER_MODES[0]).strip().lower()
+    if mode not in PLOT_RENDER_MODES:
+        logger.warning("Unknown plot rendering mode %r, using %s", mode, PLOT_RENDER_MODES[0])
+        mode = PLOT_RENDER_MODES[0]
+    if mode == 'opengl' and not opengl_available():
+        logger.warning("OpenGL is not available, using fast software rendering")
+        mode = 'fast'
+    pg.setConfigOptions(antialias=mode == 'quality', useOpenGL=mode == 'opengl')
+    _mode = mode
+    logger.info("Plot rendering mode: %s", mode)
+    return mode
+
+
+def rendering_mode() -> str:
+    return _mode
+
+
+def curve_options(finite: bool = False) -> dict:
+    """PlotDataItem keyword arguments for how a curve's data is connected.
+
+    Args:
+        finite: The data never holds NaN, so the finite check can be skipped;
+            otherwise NaN leaves a gap in the line
+    """
+    return {'skipFiniteCheck': True} if finite else {'connect': 'finite'}
+
+
+def optimize_plot(plot_item: pg.PlotItem):
+    """Draw only the visible part of each curve, peak-downsampled to the view's width.
+
+    Set on the plot rather than on curves, since adding a curve applies the
+    plot's settings to it. Peak downsampling keeps each bin's min and max, so
+    the drawn envelope looks the same as the full data.
+    """
+    plot_item.setClipToView(True)
+    plot_item.setDownsampling(auto=True, mode='peak')
+
+
+def optimize_curve(curve: pg.PlotDataItem) -> pg.PlotDataItem:
+    """Keep PLOT_DOWNSAMPLE_FACTOR samples per pixel of a dense curve instead of pyqtgraph's five."""
+    # PlotDataItem reads the factor from its options and has no setter for it
+    curve.opts['autoDownsampleFactor'] = PLOT_DOWNSAMPLE_FACTOR
+    return curve
+
+
+class FrameLimiter(QObject):
+    """Redraws a view at most max_fps times a second, and only when something changed.
+
+    Data may arrive at any rate: request() marks the view stale and the next
+    frame draws it once. has_new_data is polled each frame for sources that
+    cannot call request(), like a sample ring filled by another thread.
+    """
+
+    def __init__(self, draw: Callable[[], None], max_fps: float = PLOT_MAX_FPS,
+                 has_new_data: Optional[Callable[[], bool]] = None, parent=None):
+        super().__init__(parent)
+        self.draw = draw
+        self.has_new_data = has_new_data
+        self.stale = False
+        self.frames = 0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame)
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps: float):
+        self.timer.start(max(1, int(round(1000 / max_fps))))
+
+    def stop(self):
+        self.timer.stop()
+
+    def request(self):
+        self.stale = True
+
+    def on_frame(self):
+        if not (self.stale or (self.has_new_data is not None and self.has_new_data())):
+            return
+        self.stale = False
+        self.frames += 1
+        with timer('plot.frame'):
+            self.draw()
+
+
+def offscreen_application() -> QApplication:
+    """The running QApplication, or a new one that renders offscreen when there is no display."""
+    global _application
+    app = QApplication.instance()
+    if app is None:
+        if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+            os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        app = _application = QApplication(sys.argv[:1])
+    return app
+
+
+def export_png(plot_item: pg.PlotItem, path: str, width: int = PLOT_IMAGE_SIZE[0]) -> str:
+    """Render a plot to a PNG file of the given pixel width, whether or not it is on screen."""
+    with timer('plot.export_png'):
+        exporter = pg.exporters.ImageExporter(plot_item)
+        exporter.parameters()['width'] = int(width)
+        exporter.export(path)
+    return path
+
+
+def render_profile_image(minutes: Sequence[float], temperatures: Sequence[float],
+                         measured: Optional[Sequence[np.ndarray]] = None,
+                         size=PLOT_IMAGE_SIZE, title: Optional[str] = None) -> QImage:
+    """Draw a schedule, and optionally measured traces, offscreen.
+
+    Args:
+        minutes, temperatures: Schedule breakpoints, e.g. ScheduleProfile.breakpoints()
+        measured: (minutes, temperatures) pairs drawn as thin traces
+    """
+    offscreen_application()
+    theme = get_plot_theme()
+    widget = pg.PlotWidget(background=theme['background'])
+    try:
+        # Laid out like a shown window, without appearing on screen
+        widget.setAttribute(Qt.WA_DontShowOnScreen)
+        widget.resize(*size)
+        widget.show()
+        plot_item = widget.getPlotItem()
+        plot_item.showGrid(x=True, y=True, alpha=0.5)
+        plot_item.setLabel('left', text='Temperature', units='°C', color=theme['text'])
+        plot_item.setLabel('bottom', text='Time (min)', color=theme['text'])
+        if title:
+            plot_item.setTitle(title, color=theme['text'])
+        plot_item.plot(np.asarray(minutes, dtype=float), np.asarray(temperatures, dtype=float),
+                       pen={'color': 'g', 'width': 2})
+        for index, (x, y) in enumerate(measured or ()):
+            plot_item.plot(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                           pen=pg.mkPen(pg.intColor(index, hues=max(len(measured), 2)), width=1),
+                           connect='finite')
+        # Let the axes size themselves to their tick labels before rendering
+        QApplication.processEvents()
+        with timer('plot.render_image'):
+            exporter = pg.exporters.ImageExporter(plot_item)
+            exporter.parameters()['width'] = int(size[0])
+            return exporter.export(toBytes=True)
+    finally:
+        widget.hide()
+        widget.deleteLater()
+
+
+def render_profile_png(path: str, minutes: Sequence[float], temperatures: Sequence[float],
+                       measured: Optional[Sequence[np.ndarray]] = None,
+                       size=PLOT_IMAGE_SIZE, title: Optional[str] = None) -> str:
+    """render_profile_image saved as a PNG file."""
+    if not render_profile_image(minutes, temperatures, measured, size, title).save(path, 'PNG'):
+        raise OSError(f"Could not write {path}")
+    return path
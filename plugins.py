@@ -0,0 +1,103 @@
+import importlib
+import logging
+import os
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional
+
+from constants import (DIALECT_PLUGIN_GROUP, TRANSPORT_PLUGIN_GROUP, FURNACE_MODEL_PLUGIN_GROUP,
+                       DIALECT_ENV_VAR, DEFAULT_DIALECT)
+
+logger = logging.getLogger(__name__)
+
+
+class PluginRegistry:
+    """Named plugins of one kind: those built in and those installed packages declare as entry points.
+
+    Built-in plugins are 'module:attribute' references, and installed ones
+    are only looked up the first time a plugin of the kind is needed, so
+    nothing is imported until a plugin is loaded by name. An installed
+    plugin with the name of a built-in one replaces it.
+    """
+
+    def __init__(self, group: str, label: str, builtins: Optional[Dict[str, str]] = None):
+        self.group = group
+        self.label = label
+        self.builtins = dict(builtins or {})
+        self._references = None
+        self._loaded = {}
+
+    def _discover(self) -> Dict[str, object]:
+        if self._references is None:
+            references = dict(self.builtins)
+            try:
+                installed = entry_points(group=self.group)
+            except Exception as e:
+                logger.error("Error listing %s plugins: %s", self.group, e)
+                installed = ()
+            for entry_point in installed:
+                if entry_point.name in self.builtins:
+                    logger.info("Installed %s %r replaces the built-in one", self.label, entry_point.name)
+                references[entry_point.name] = entry_point
+            self._references = references
+        return self._references
+
+    def names(self) -> List[str]:
+        """Names of every available plugin, without loading any."""
+        return sorted(self._discover())
+
+    def load(self, name: str):
+        """The plugin called name, imported the first time it is asked for.
+
+        Raises:
+            ValueError: for an unknown plugin or one that cannot be imported
+        """
+        if name in self._loaded:
+            return self._loaded[name]
+        reference = self._discover().get(name)
+        if reference is None:
+            raise ValueError(f"Unknown {self.label}: {name!r} (available: {', '.join(self.names())})")
+        try:
+            if isinstance(reference, str):
+                module, _, attribute = reference.partition(':')
+                plugin = getattr(importlib.import_module(module), attribute)
+            else:
+                plugin = reference.load()
+        except Exception as e:
+            raise ValueError(f"Could not load {self.label} {name!r}: {e}") from e
+        logger.debug("Loaded %s %r", self.label, name)
+        self._loaded[name] = plugin
+        return plugin
+
+    def register(self, name: str, plugin):
+        """Add an already imported plugin, e.g. from a script, replacing any of the same name."""
+        self._discover()[name] = plugin
+        self._loaded[name] = plugin
+
+
+# Controller dialects: classes of dialects.ControllerDialect
+dialects = PluginRegistry(DIALECT_PLUGIN_GROUP, 'controller dialect', {
+    'pv-sv': 'dialects:PvSvDialect',
+})
+
+# Acquisition transports: factory(target, options, channels, source) -> acquisition.AcquisitionDriver
+transports = PluginRegistry(TRANSPORT_PLUGIN_GROUP, 'acquisition driver', {
+    'simulated': 'acquisition:simulated_transport',
+    'serial': 'acquisition:serial_transport',
+    'modbus-tcp': 'acquisition:modbus_tcp_transport',
+    'modbus-rtu': 'acquisition:modbus_rtu_transport',
+    'replay': 'acquisition:replay_transport',
+})
+
+# Furnace models a control loop can drive: classes of controller.FurnaceBackend
+furnace_models = PluginRegistry(FURNACE_MODEL_PLUGIN_GROUP, 'furnace model', {
+    'simulated': 'controller:SimulatedFurnace',
+})
+
+
+def load_dialect(name: Optional[str] = None):
+    """The controller dialect named, else the one SMARTFURNACE_DIALECT names, else PV/SV.
+
+    Raises:
+        ValueError: for an unknown dialect or one that cannot be imported
+    """
+    return dialects.load(name or os.environ.get(DIALECT_ENV_VAR) or DEFAULT_DIALECT)()
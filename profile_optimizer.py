@@ -0,0 +1,163 @@
+from collections import namedtuple
+from typing import List, Sequence
+
+import numpy as np
+
+from constants import PROFILE_SIMPLIFY_TOLERANCE, PROGRAM_SLOT_COUNT
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+# rows count schedule rows; slots count controller programs, one per expanded segment
+ProfileOptimization = namedtuple('ProfileOptimization', ['segments', 'rows_before', 'rows_after',
+                                                         'slots_before', 'slots_after', 'max_error'])
+
+_EPSILON = 1e-9  # °C; differences below this are rounding, not shape
+
+
+def simplify_vertices(times: np.ndarray, temperatures: np.ndarray, max_error: float) -> np.ndarray:
+    """Indices of the vertices a polyline keeps under Douglas-Peucker.
+
+    Errors are measured in temperature at the same time, not as distances
+    in the plane, so max_error bounds how far the setpoint moves. The first
+    and last vertices are always kept.
+    """
+    count = len(times)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, count - 1]] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = slice(first + 1, last)
+        slope = (temperatures[last] - temperatures[first]) / (times[last] - times[first])
+        errors = np.abs(temperatures[first] + slope * (times[inner] - times[first]) - temperatures[inner])
+        worst = int(np.argmax(errors))
+        if errors[worst] > max_error:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def _flatten(segments: Sequence[Segment]) -> List[Segment]:
+    """Ramp/Soak/Hold segments with durations in seconds.
+
+    Repeat rows are expanded, which drops notes as ScheduleProfile does;
+    without them rows keep their notes and rate-based ramps get the
+    duration their rate gives.
+    """
+    if any(segment.cycle_type == 'Repeat' for segment in segments):
+        return ScheduleProfile(list(segments)).expanded_cycles()
+    flat = []
+    for segment in segments:
+        seconds = segment.seconds
+        if segment.rate and segment.start_temp is not None and segment.end_temp is not None:
+            seconds = round(abs(segment.end_temp - segment.start_temp) / segment.rate * 60)
+        flat.append(Segment(segment.cycle_type, segment.start_temp, segment.end_temp, seconds,
+                            segment.notes, segment.shape, tolerance=segment.tolerance))
+    return flat
+
+
+def _drop_instants(flat: List[Segment]) -> List[Segment]:
+    """Segments without the zero-length Ramps and Soaks that leave the setpoint unchanged.
+
+    A zero-length segment only matters for the temperature it steps to. It
+    can go when the next segment starts from that temperature anyway, or
+    when it steps to the temperature the setpoint already has. Leading and
+    trailing steps set the start and final setpoints and are kept.
+    """
+    kept = []
+    for index, segment in enumerate(flat):
+        if segment.seconds > 0 or segment.cycle_type == 'Hold':
+            kept.append(segment)
+            continue
+        # Without the segment the setpoint goes from current straight to following
+        current = kept[-1].end_temp if kept else segment.start_temp
+        following = flat[index + 1].start_temp if index + 1 < len(flat) else current
+        carried = abs(segment.end_temp - following) < _EPSILON and (
+            bool(kept) or abs(segment.start_temp - following) < _EPSILON)
+        no_op = bool(kept) and max(abs(segment.start_temp - current), abs(segment.end_temp - current)) < _EPSILON
+        if not (carried or no_op):
+            kept.append(segment)
+    return kept or flat[:1]
+
+
+def _mergeable(segment: Segment) -> bool:
+    """Whether a segment is a straight line that may be merged with its neighbours."""
+    return segment.cycle_type in ('Ramp', 'Soak') and segment.seconds > 0 and (
+        segment.shape == 'linear' or abs(segment.end_temp - segment.start_temp) < _EPSILON)
+
+
+def _merge_run(run: List[Segment], max_error: float):
+    """Simplified segments for consecutive straight segments, and the largest error made."""
+    times = np.concatenate(([0], np.cumsum([segment.seconds for segment in run]))).astype(float)
+    temperatures = np.array([run[0].start_temp] + [segment.end_temp for segment in run])
+    kept = simplify_vertices(times, temperatures, max_error)
+    error = float(np.max(np.abs(np.interp(times, times[kept], temperatures[kept]) - temperatures)))
+
+    merged = []
+    for first, last in zip(kept[:-1], kept[1:]):
+        start_temp, end_temp = float(temperatures[first]), float(temperatures[last])
+        notes = '; '.join(dict.fromkeys(segment.notes for segment in run[first:last] if segment.notes))
+        if abs(end_temp - start_temp) < _EPSILON:
+            merged.append(Segment('Soak', start_temp, start_temp, int(times[last] - times[first]), notes))
+        else:
+            merged.append(Segment('Ramp', start_temp, end_temp, int(times[last] - times[first]), notes))
+    return merged, error
+
+
+def optimize_segments(segments: Sequence[Segment],
+                      max_error: float = PROFILE_SIMPLIFY_TOLERANCE) -> ProfileOptimization:
+    """Fewest segments that keep the setpoint curve within max_error °C of the original.
+
+    Zero-length Ramps and Soaks are dropped where they do not change the
+    curve, since they take no time and cost a controller program each;
+    temperature steps the next segment does not carry are kept. Runs of straight, continuous Ramps and
+    Soaks are then simplified with Douglas-Peucker on their breakpoints:
+    collinear ramps and equal-temperature soaks merge even at a max_error
+    of 0, and a larger max_error also smooths noisy imported profiles.
+    Holds, curved ramps, temperature steps and zero-length steps end a
+    run and are kept as they are.
+    """
+    flat = _drop_instants(_flatten(segments))
+    tolerance = max(max_error, _EPSILON)
+
+    optimized = []
+    run = []
+    largest_error = 0.0
+
+    def close_run():
+        nonlocal largest_error
+        if run:
+            merged, error = _merge_run(run, tolerance)
+            optimized.extend(merged)
+            largest_error = max(largest_error, error)
+            run.clear()
+
+    for segment in flat:
+        if not _mergeable(segment):
+            close_run()
+            optimized.append(segment)
+            continue
+        if run and abs(run[-1].end_temp - segment.start_temp) >= _EPSILON:
+            close_run()
+        run.append(segment)
+    close_run()
+
+    return ProfileOptimization(optimized, len(segments), len(optimized),
+                               len(ScheduleProfile(list(segments))), len(ScheduleProfile(optimized)),
+                               largest_error if largest_error > _EPSILON else 0.0)
+
+
+def format_optimization(result: ProfileOptimization, slot_count: int = PROGRAM_SLOT_COUNT) -> str:
+    """Rows and controller programs saved, for showing to the user."""
+    lines = [f"Rows: {result.rows_before} → {result.rows_after}",
+             f"Controller programs: {result.slots_before} → {result.slots_after} of {slot_count}"]
+    if result.slots_after > slot_count:
+        lines.append(f"Still {result.slots_after - slot_count} programs more than the controller holds")
+    elif result.slots_before > slot_count:
+        lines.append("Now fits in the controller")
+    lines.append(f"Largest setpoint change: {result.max_error:.2f} °C")
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+from collections import namedtuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from constants import PROGRAM_SLOT_COUNT, PROGRAM_ALLOCATION_STRATEGIES
+from plugins import load_dialect
+
+# commands holds only the writes needed, for relocated recipes first; moved names those recipes
+ProgramPlan = namedtuple('ProgramPlan', ['schedule_name', 'start', 'commands', 'moved'])
+
+
+class ProgramSpaceError(Exception):
+    """A recipe does not fit in the controller's free program slots."""
+
+
+def create_tables(cursor):
+    """Create the table of what each controller's program slots hold."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS program_slots
+        (
+            controller_id TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            schedule_name TEXT,
+            temperature INTEGER,
+            minutes INTEGER,
+            PRIMARY KEY (controller_id, slot)
+        )
+    """)
+
+
+class ProgramMemory:
+    """The program slots of one controller: what each holds and which recipe owns it.
+
+    contents[i] is the (temperature, time) last written to slot i, or None
+    when unknown, and owners[i] the recipe using it, or None when free. Freed
+    slots keep their contents, so loading a recipe back where it used to be
+    costs no writes. Commands are written in the controller's dialect, the
+    configured one unless given.
+    """
+
+    def __init__(self, slot_count: int = PROGRAM_SLOT_COUNT,
+                 contents: Optional[List[Optional[Tuple[int, int]]]] = None,
+                 owners: Optional[List[Optional[str]]] = None, dialect=None):
+        self.slot_count = slot_count
+        self.contents = list(contents) if contents is not None else [None] * slot_count
+        self.owners = list(owners) if owners is not None else [None] * slot_count
+        self.dialect = dialect or load_dialect()
+
+    def copy(self) -> 'ProgramMemory':
+        return ProgramMemory(self.slot_count, self.contents, self.owners, self.dialect)
+
+    @property
+    def free_slots(self) -> int:
+        return self.owners.count(None)
+
+    def recipes(self) -> Dict[str, Tuple[int, int]]:
+        """(start, length) of each resident recipe, in slot order."""
+        recipes = {}
+        for slot, owner in enumerate(self.owners):
+            if owner is not None:
+                start, length = recipes.get(owner, (slot, 0))
+                recipes[owner] = (start, length + 1)
+        return recipes
+
+    def free_extents(self) -> List[Tuple[int, int]]:
+        """(start, length) of each run of free slots, in slot order."""
+        extents = []
+        start = None
+        for slot, owner in enumerate(self.owners + ['']):
+            if owner is None and start is None:
+                start = slot
+            elif owner is not None and start is not None:
+                extents.append((start, slot - start))
+                start = None
+        return extents
+
+    def owners_between(self, start: int, length: int) -> List[str]:
+        """Recipes using any of the slots start to start + length - 1."""
+        return list(dict.fromkeys(owner for owner in self.owners[start:start + length] if owner is not None))
+
+    def writes(self, start: int, steps: Sequence[Tuple[int, int]]) -> List[str]:
+        """Commands that put steps in the slots from start, skipping values already there."""
+        commands = []
+        for offset, (temperature, time) in enumerate(steps):
+            slot = start + offset
+            current = self.contents[slot]
+            if current is None or current[0] != temperature:
+                commands.append(self.dialect.temperature_command(slot, temperature))
+            if current is None or current[1] != time:
+                commands.append(self.dialect.time_command(slot, time))
+        return commands
+
+    def remove(self, schedule_name: str):
+        """Free a recipe's slots; their contents are kept."""
+        self.owners = [None if owner == schedule_name else owner for owner in self.owners]
+
+    def _store(self, schedule_name: str, start: int, steps: Sequence[Tuple[int, int]]) -> List[str]:
+        commands = self.writes(start, steps)
+        for offset, step in enumerate(steps):
+            self.contents[start + offset] = tuple(step)
+            self.owners[start + offset] = schedule_name
+        return commands
+
+    def load(self, schedule_name: str, steps: Sequence[Tuple[int, int]],
+             strategy: str = PROGRAM_ALLOCATION_STRATEGIES[0]) -> ProgramPlan:
+        """Place a recipe, or update it where it is, and return the writes that takes.
+
+        A resident recipe is rewritten in place when it still fits there.
+        Otherwise it goes in a free run of slots: any place where it is still
+        intact from an earlier load first, since that needs no writes; then
+        the smallest run that fits (best-fit) or the lowest (first-fit),
+        at the offset needing the fewest writes. When no run is long enough
+        but enough slots are free in total, other recipes are moved, either
+        one recipe out of the way or all compacted towards slot 0, whichever
+        rewrites fewer slots.
+
+        Raises:
+            ProgramSpaceError: if fewer slots are free than the recipe needs
+        """
+        if strategy not in PROGRAM_ALLOCATION_STRATEGIES:
+            raise ValueError(f"Unknown allocation strategy: {strategy!r}")
+        steps = [tuple(step) for step in steps]
+        needed = len(steps)
+        owners = list(self.owners)
+        resident = self.recipes().get(schedule_name)
+        if resident is not None:
+            start, length = resident
+            room = length
+            while start + room < self.slot_count and self.owners[start + room] is None:
+                room += 1
+            self.remove(schedule_name)
+            if needed <= room:
+                return ProgramPlan(schedule_name, start, self._store(schedule_name, start, steps), [])
+        if needed > self.free_slots:
+            self.owners = owners
+            raise ProgramSpaceError(f"'{schedule_name}' needs {needed} program slots "
+                                    f"but only {self.free_slots} of {self.slot_count} are free")
+
+        start = self._place(steps, strategy)
+        if start is not None:
+            return ProgramPlan(schedule_name, start, self._store(schedule_name, start, steps), [])
+
+        # Fragmented: try each way of making room on a copy and keep the cheapest
+        best = None
+        for memory, commands, moved in self._defragmentations(needed, strategy):
+            start = memory._place(steps, strategy)
+            if start is None:
+                continue
+            plan = ProgramPlan(schedule_name, start, commands + memory._store(schedule_name, start, steps), moved)
+            if best is None or len(plan.commands) < len(best[1].commands):
+                best = (memory, plan)
+        memory, plan = best  # compaction always makes room once enough slots are free
+        self.contents, self.owners = memory.contents, memory.owners
+        return plan
+
+    def _place(self, steps: Sequence[Tuple[int, int]], strategy: str) -> Optional[int]:
+        """Start slot for steps in a free run, or None if no run is long enough."""
+        needed = len(steps)
+        candidates = []
+        for start, length in self.free_extents():
+            for offset in range(length - needed + 1):
+                cost = len(self.writes(start + offset, steps))
+                order = length if strategy == 'best-fit' else start
+                candidates.append((cost > 0, order, cost, start + offset))
+        return min(candidates)[3] if candidates else None
+
+    def _defragmentations(self, needed: int, strategy: str):
+        """(memory, commands, moved) for each way of freeing a long enough run of slots."""
+        recipes = self.recipes()
+        for name, (start, length) in recipes.items():
+            memory = self.copy()
+            steps = memory.contents[start:start + length]
+            memory.remove(name)
+            if not any(size >= needed for _, size in memory.free_extents()):
+                continue
+            target = memory._place_aside(name, steps, needed, strategy)
+            if target is not None:
+                yield memory, memory._store(name, target, steps), [name]
+
+        memory = self.copy()
+        commands, moved = [], []
+        slot = 0
+        for name, (start, length) in recipes.items():
+            if start != slot:
+                steps = memory.contents[start:start + length]
+                memory.remove(name)
+                commands += memory._store(name, slot, steps)
+                moved.append(name)
+            slot += length
+        yield memory, commands, moved
+
+    def _place_aside(self, schedule_name: str, steps: Sequence[Tuple[int, int]], needed: int,
+                     strategy: str) -> Optional[int]:
+        """Start slot for a moved recipe that still leaves a free run of needed slots, or None."""
+        best = None
+        for start, length in self.free_extents():
+            for offset in range(length - len(steps) + 1):
+                trial = self.copy()
+                trial.owners[start + offset:start + offset + len(steps)] = [schedule_name] * len(steps)
+                if not any(size >= needed for _, size in trial.free_extents()):
+                    continue
+                cost = len(self.writes(start + offset, steps))
+                order = length if strategy == 'best-fit' else start
+                key = (cost, order, start + offset)
+                if best is None or key < best:
+                    best = key
+        return best[2] if best else None
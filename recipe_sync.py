@@ -0,0 +1,322 @@
+import json
+import os
+import platform
+import re
+import uuid
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from constants import SYNC_HUB_FILE_SUFFIX
+import schedule_versions
+
+# content_hash is None for a deleted schedule (tombstone); parent_hash is the
+# content the change was made on top of, None for a new schedule
+SyncChange = namedtuple('SyncChange', ['change_id', 'name', 'content_hash', 'parent_hash', 'payload', 'origin'])
+SyncResult = namedtuple('SyncResult', ['sent', 'received', 'conflicts'])
+
+
+def create_tables(cursor):
+    """Create the change log, sync cursors and conflict tables."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_changes
+        (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            change_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            content_hash TEXT,
+            parent_hash TEXT,
+            payload TEXT,
+            origin TEXT NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_schedule_changes_name
+        ON schedule_changes (name, seq)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state
+        (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_conflicts
+        (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            change_id TEXT UNIQUE NOT NULL,
+            local_hash TEXT,
+            remote_hash TEXT,
+            payload TEXT,
+            origin TEXT NOT NULL,
+            resolved INTEGER NOT NULL DEFAULT 0,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def get_state(cursor, key: str, default=None) -> Optional[str]:
+    cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+
+def set_state(cursor, key: str, value):
+    cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def station_id(cursor) -> str:
+    """This database's station id, created on first use; readable and safe as a file name."""
+    station = get_state(cursor, 'station_id')
+    if station is None:
+        host = re.sub(r'[^\w.-]', '_', platform.node()) or 'station'
+        station = f"{host}-{uuid.uuid4().hex[:8]}"
+        set_state(cursor, 'station_id', station)
+    return station
+
+
+def head_hash(cursor, name: str) -> Optional[str]:
+    """Content hash of the newest logged change of a schedule, None if deleted or never logged."""
+    cursor.execute("SELECT content_hash FROM schedule_changes WHERE name = ? ORDER BY seq DESC LIMIT 1", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _append(cursor, change: SyncChange):
+    cursor.execute("""
+        INSERT INTO schedule_changes (change_id, name, content_hash, parent_hash, payload, origin)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, change)
+
+
+def _new_change(cursor, name: str, segments: Optional[Tuple], parent_hash: Optional[str]) -> SyncChange:
+    station = station_id(cursor)
+    if segments is None:
+        digest, payload = None, None
+    else:
+        digest = schedule_versions.content_hash(segments)
+        payload = json.dumps(segments, separators=(',', ':'), ensure_ascii=False)
+    change = SyncChange(f"{station}:{uuid.uuid4().hex}", name, digest, parent_hash, payload, station)
+    _append(cursor, change)
+    return change
+
+
+def record_change(cursor, name: str, entries: Optional[Sequence[Sequence]]) -> Optional[SyncChange]:
+    """Log a local save (entries) or delete (None) unless it leaves the schedule as it was."""
+    segments = None if entries is None else schedule_versions.canonical_segments(entries)
+    parent = head_hash(cursor, name)
+    if segments is not None and parent is not None and schedule_versions.content_hash(segments) == parent:
+        return None
+    if segments is None and parent is None:
+        return None
+    return _new_change(cursor, name, segments, parent)
+
+
+def _stored_entries(cursor, name: str) -> Optional[List[Tuple]]:
+    cursor.execute("""
+        SELECT e.cycle_type, e.start_temp, e.end_temp, e.duration, e.notes,
+               e.shape, e.rate, e.tolerance, e.repeat_count, e.repeat_span
+        FROM schedule_entries e JOIN schedules s ON s.id = e.schedule_id
+        WHERE s.name = ? ORDER BY e.position
+    """, (name,))
+    entries = cursor.fetchall()
+    if entries:
+        return entries
+    cursor.execute("SELECT 1 FROM schedules WHERE name = ?", (name,))
+    return [] if cursor.fetchone() else None
+
+
+def prepare(cursor) -> str:
+    """Create the sync tables and log schedules saved before syncing was used.
+
+    Returns:
+        str: the station id
+    """
+    create_tables(cursor)
+    station = station_id(cursor)
+    cursor.execute("""
+        SELECT name FROM schedules
+        WHERE name NOT IN (SELECT name FROM schedule_changes)
+    """)
+    for (name,) in cursor.fetchall():
+        record_change(cursor, name, _stored_entries(cursor, name))
+    return station
+
+
+def changes_since(cursor, seq: int, exclude_origin: Optional[str] = None,
+                  only_origin: Optional[str] = None) -> Tuple[List[SyncChange], int]:
+    """Logged changes after a position in the log, oldest first.
+
+    Returns:
+        (changes, position of the last change read) so the caller can resume there
+    """
+    cursor.execute("""
+        SELECT seq, change_id, name, content_hash, parent_hash, payload, origin
+        FROM schedule_changes WHERE seq > ? ORDER BY seq
+    """, (seq,))
+    changes = []
+    for row in cursor.fetchall():
+        seq = row[0]
+        change = SyncChange(*row[1:])
+        if change.origin != exclude_origin and (only_origin is None or change.origin == only_origin):
+            changes.append(change)
+    return changes, seq
+
+
+def _seen(cursor, change_id: str) -> bool:
+    cursor.execute("""
+        SELECT 1 FROM schedule_changes WHERE change_id = ?
+        UNION ALL SELECT 1 FROM sync_conflicts WHERE change_id = ?
+    """, (change_id, change_id))
+    return cursor.fetchone() is not None
+
+
+def _has_child(cursor, name: str, content_hash: str) -> bool:
+    cursor.execute("SELECT 1 FROM schedule_changes WHERE name = ? AND parent_hash = ? LIMIT 1",
+                   (name, content_hash))
+    return cursor.fetchone() is not None
+
+
+def _apply(cursor, change: SyncChange, store: Callable, remove: Callable):
+    if change.content_hash is None:
+        remove(cursor, change.name)
+    else:
+        store(cursor, change.name, [tuple(segment) for segment in json.loads(change.payload)])
+    _append(cursor, change)
+
+
+def receive(cursor, changes: Iterable, cursors: Dict[str, object],
+            store: Callable, remove: Callable) -> Tuple[int, int]:
+    """Apply changes from another station and advance the given sync cursors.
+
+    A change is applied when it was made on top of the local content of its
+    schedule. Changes from several stations can arrive in any order, so
+    changes that do not apply yet are retried after the others. Whatever
+    still does not apply was made concurrently with a local edit and is
+    stored in sync_conflicts; the local schedule is left as it is. Changes
+    that a logged change was already made on top of are superseded and only
+    remembered, so they are not reported again; so are changes followed by
+    an accepted later change of the same schedule from the same station.
+
+    Returns:
+        (changes applied, conflicts found)
+    """
+    pending = list(enumerate(SyncChange(*change) for change in changes))
+    # Position of the newest accepted change per station and schedule
+    accepted: Dict[Tuple[str, str], int] = {}
+    applied = conflicts = 0
+    progress = True
+    while pending and progress:
+        progress = False
+        blocked = []
+        for index, change in pending:
+            if not _seen(cursor, change.change_id):
+                local = head_hash(cursor, change.name)
+                if change.content_hash == local:
+                    _append(cursor, change)  # Same content reached independently
+                elif change.parent_hash == local:
+                    _apply(cursor, change, store, remove)
+                    applied += 1
+                else:
+                    blocked.append((index, change))
+                    continue
+            key = (change.origin, change.name)
+            accepted[key] = max(accepted.get(key, index), index)
+            progress = True
+        pending = blocked
+
+    for index, change in pending:
+        # Already built on here, e.g. after the stations settled the conflict themselves
+        superseded = (accepted.get((change.origin, change.name), -1) > index
+                      or change.content_hash is not None and _has_child(cursor, change.name, change.content_hash))
+        cursor.execute("""
+            INSERT OR IGNORE INTO sync_conflicts
+            (name, change_id, local_hash, remote_hash, payload, origin, resolved)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (change.name, change.change_id, head_hash(cursor, change.name), change.content_hash,
+              change.payload, change.origin, int(superseded)))
+        conflicts += cursor.rowcount > 0 and not superseded
+    for key, value in cursors.items():
+        set_state(cursor, key, value)
+    return applied, conflicts
+
+
+def conflicts(cursor) -> List[Dict]:
+    cursor.execute("""
+        SELECT id, name, origin, local_hash, remote_hash, created_date
+        FROM sync_conflicts WHERE resolved = 0 ORDER BY id
+    """)
+    return [{
+        'Id': row[0],
+        'Name': row[1],
+        'Origin': row[2],
+        'LocalDeleted': row[3] is None,
+        'RemoteDeleted': row[4] is None,
+        'CreatedDate': row[5]
+    } for row in cursor.fetchall()]
+
+
+def resolve(cursor, name: str, keep_remote: bool, store: Callable, remove: Callable) -> bool:
+    """Settle the conflicts of a schedule, keeping the newest remote version or the local one.
+
+    Either way a new local change is logged on top of both sides, so the
+    other stations take it as a normal update on their next sync.
+    """
+    cursor.execute("""
+        SELECT remote_hash, payload FROM sync_conflicts
+        WHERE name = ? AND resolved = 0 ORDER BY id DESC LIMIT 1
+    """, (name,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    remote_hash, payload = row
+    local = head_hash(cursor, name)
+    if keep_remote:
+        segments = None if payload is None else tuple(tuple(segment) for segment in json.loads(payload))
+        if segments is None:
+            remove(cursor, name)
+        else:
+            store(cursor, name, list(segments))
+        _new_change(cursor, name, segments, local)
+    else:
+        entries = _stored_entries(cursor, name) if local is not None else None
+        segments = None if entries is None else schedule_versions.canonical_segments(entries)
+        _new_change(cursor, name, segments, remote_hash)
+    # Kept, so copies of the same changes arriving later are recognised
+    cursor.execute("UPDATE sync_conflicts SET resolved = 1 WHERE name = ?", (name,))
+    return True
+
+
+def hub_file(hub_dir: str, station: str) -> str:
+    return os.path.join(os.path.abspath(hub_dir), station + SYNC_HUB_FILE_SUFFIX)
+
+
+def hub_feeds(hub_dir: str, station: str) -> List[str]:
+    """The other stations' feeds in a hub directory."""
+    own = hub_file(hub_dir, station)
+    feeds = [os.path.join(os.path.abspath(hub_dir), name) for name in sorted(os.listdir(hub_dir))
+             if name.endswith(SYNC_HUB_FILE_SUFFIX)]
+    return [feed for feed in feeds if feed != own]
+
+
+def append_hub(path: str, changes: Sequence[SyncChange]):
+    """Append changes to a station's feed in the hub, one JSON object per line."""
+    with open(path, 'a', encoding='utf-8') as f:
+        for change in changes:
+            f.write(json.dumps(change._asdict(), separators=(',', ':'), ensure_ascii=False) + '\n')
+
+
+def read_hub(path: str, offset: int) -> Tuple[List[SyncChange], int]:
+    """Changes appended to a feed after a byte offset, up to the last complete line.
+
+    Returns:
+        (changes, offset to resume from)
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1  # A line still being written is read next time
+    changes = [SyncChange(**json.loads(line)) for line in data[:end].splitlines() if line.strip()]
+    return changes, offset + end
@@ -0,0 +1,179 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QLabel, QComboBox, QSlider)
+from PyQt5.QtCore import Qt, QTimer
+import numpy as np
+import pyqtgraph as pg
+import logging
+
+from styles import get_dialog_style, get_button_style, get_combo_style, get_plot_theme
+from database import DatabaseManager
+from schedule_profile import ScheduleProfile
+from runs import RunReader
+from constants import REPLAY_TICK_MS, REPLAY_SPEEDS, REPLAY_WINDOW_MINUTES
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayWindow(QDialog):
+    """Plays back or scrubs through a recorded run with its schedule and alarms."""
+
+    def __init__(self, parent=None, run=None):
+        super().__init__(parent)
+        self.run = run
+        self.reader = RunReader(run['SampleFile']) if run and run['SampleFile'] else None
+        self.position = 0.0  # seconds into the run
+        self.speed = REPLAY_SPEEDS[0]
+        self.window_seconds = REPLAY_WINDOW_MINUTES * 60
+
+        self.profile = None
+        data = None
+        if run and run.get('ScheduleVersionId'):
+            # Overlay the exact schedule revision the run was made with
+            data = DatabaseManager.load_schedule_version(run['ScheduleVersionId'])
+        elif run:
+            data = DatabaseManager.load_schedule(run['ScheduleName'])
+        if data:
+            self.profile = ScheduleProfile(data)
+
+        self.load_alarms()
+        self.setup_ui()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.advance)
+        self.update_view()
+
+    def load_alarms(self):
+        """Load raised alarms once, sorted by time, for in-window lookups."""
+        events = DatabaseManager.load_alarm_events(run_id=self.run['Id']) if self.run else []
+        raised = [event for event in events if event['State'] == 'raised']
+        self.alarm_times = np.array([event['ElapsedSeconds'] for event in raised], dtype=float)
+        self.alarm_messages = [event['Message'] for event in raised]
+        self.alarm_temps = np.full(len(raised), np.nan)
+        if self.reader:
+            for i, elapsed in enumerate(self.alarm_times):
+                sample = self.reader.sample_at(elapsed)
+                if sample is not None:
+                    self.alarm_temps[i] = sample['setpoint']
+
+    def setup_ui(self):
+        """Set up the user interface."""
+        title = f"Replay - {self.run['ScheduleName']} ({self.run['StartedAt']})" if self.run else "Replay"
+        self.setWindowTitle(title)
+        self.setStyleSheet(get_dialog_style())
+        self.resize(900, 550)
+
+        layout = QVBoxLayout()
+        theme = get_plot_theme()
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground(theme['background'])
+        self.plot_widget.setLabel('left', text='Temperature', units='°C')
+        self.plot_widget.setLabel('bottom', text='Time (min)')
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.5)
+
+        self.schedule_curve = self.plot_widget.plot(pen=pg.mkPen(theme['grid'], width=1, style=Qt.DotLine))
+        self.setpoint_curve = self.plot_widget.plot(pen=pg.mkPen('g', width=2))
+        self.measured_curve = self.plot_widget.plot(pen=pg.mkPen(theme['curve'], width=2))
+        self.alarm_scatter = pg.ScatterPlotItem(symbol='t', size=12, brush=pg.mkBrush(theme['current_time']))
+        self.plot_widget.addItem(self.alarm_scatter)
+        self.cursor_line = pg.InfiniteLine(angle=90, pen=pg.mkPen(theme['current_time'], width=2, style=Qt.DashLine))
+        self.plot_widget.addItem(self.cursor_line)
+
+        if self.profile:
+            self.schedule_curve.setData(*self.profile.breakpoints())
+
+        layout.addWidget(self.plot_widget)
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, int(self.reader.duration) if self.reader else 0)
+        self.slider.valueChanged.connect(self.on_slider_moved)
+        layout.addWidget(self.slider)
+
+        controls = QHBoxLayout()
+        self.play_button = QPushButton("Play")
+        self.play_button.setStyleSheet(get_button_style())
+        self.play_button.clicked.connect(self.toggle_playback)
+
+        self.speed_combo = QComboBox()
+        self.speed_combo.setStyleSheet(get_combo_style())
+        self.speed_combo.addItems([f"{speed}x" for speed in REPLAY_SPEEDS])
+        self.speed_combo.currentIndexChanged.connect(self.on_speed_changed)
+
+        self.position_label = QLabel()
+        self.alarm_label = QLabel()
+
+        close_button = QPushButton("Close")
+        close_button.setStyleSheet(get_button_style())
+        close_button.clicked.connect(self.accept)
+
+        controls.addWidget(self.play_button)
+        controls.addWidget(self.speed_combo)
+        controls.addWidget(self.position_label)
+        controls.addStretch()
+        controls.addWidget(self.alarm_label)
+        controls.addWidget(close_button)
+        layout.addLayout(controls)
+
+        self.setLayout(layout)
+
+    def toggle_playback(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.play_button.setText("Play")
+        else:
+            if self.reader and self.position >= self.reader.duration:
+                self.position = 0.0
+            self.timer.start(REPLAY_TICK_MS)
+            self.play_button.setText("Pause")
+
+    def on_speed_changed(self, index):
+        self.speed = REPLAY_SPEEDS[index]
+
+    def on_slider_moved(self, value):
+        self.seek(float(value))
+
+    def advance(self):
+        """Move the playback position by one timer tick at the current speed."""
+        duration = self.reader.duration if self.reader else 0.0
+        self.position = min(self.position + self.speed * REPLAY_TICK_MS / 1000, duration)
+        if self.position >= duration:
+            self.toggle_playback()
+        self.slider.blockSignals(True)
+        self.slider.setValue(int(self.position))
+        self.slider.blockSignals(False)
+        self.update_view()
+
+    def seek(self, elapsed_seconds: float):
+        """Jump to any point of the run."""
+        self.position = max(0.0, elapsed_seconds)
+        self.update_view()
+
+    def update_view(self):
+        """Redraw the window around the current position, reading only that window."""
+        start = self.position - self.window_seconds / 2
+        end = self.position + self.window_seconds / 2
+        self.cursor_line.setValue(self.position / 60)
+        self.plot_widget.setXRange(start / 60, end / 60, padding=0)
+
+        hours, remainder = divmod(int(self.position), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        self.position_label.setText(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+
+        if not self.reader or not len(self.reader):
+            return
+
+        samples = self.reader.window(start, end)
+        x_data = samples['elapsed'] / 60
+        self.setpoint_curve.setData(x_data, samples['setpoint'])
+        self.measured_curve.setData(x_data, samples['measured'], connect='finite')
+
+        first, last = np.searchsorted(self.alarm_times, [start, end])
+        self.alarm_scatter.setData(self.alarm_times[first:last] / 60, self.alarm_temps[first:last])
+
+        current = int(np.searchsorted(self.alarm_times, self.position, side='right'))
+        recent = self.alarm_messages[max(0, current - 1):current]
+        self.alarm_label.setText(f"Last alarm: {recent[0]}" if recent else "")
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
@@ -0,0 +1,125 @@
+import logging
+import warnings
+from collections import namedtuple
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from constants import COMPARE_STEP_SECONDS, COMPARE_CHUNK_SECONDS, COMPARE_PERCENTILES
+from database import DatabaseManager
+from runs import RunReader
+from schedule_profile import ScheduleProfile
+from setpoint_export import setpoints_on_grid
+
+logger = logging.getLogger(__name__)
+
+RunStats = namedtuple('RunStats', ['run_id', 'furnace_id', 'started_at', 'rms', 'max_abs', 'samples'])
+ComparisonResult = namedtuple('ComparisonResult', ['time', 'schedule', 'envelope', 'percentiles', 'stats'])
+
+
+def schedule_on_grid(profile: ScheduleProfile, time_seconds: np.ndarray) -> np.ndarray:
+    """Vectorized schedule temperature at each grid time, holding the end points outside the schedule."""
+    return setpoints_on_grid(profile, np.clip(time_seconds / 60, 0.0, profile.total_minutes))
+
+
+def compare_runs(runs: Sequence[Dict], profile: ScheduleProfile,
+                 step_seconds: float = COMPARE_STEP_SECONDS,
+                 chunk_seconds: float = COMPARE_CHUNK_SECONDS,
+                 percentiles: Sequence[float] = COMPARE_PERCENTILES) -> ComparisonResult:
+    """Align runs on cycle start, resample them to a common time base and compare.
+
+    Each run's deviation is measured against the setpoint it recorded, so
+    Hold waits and runs made with an older version of the schedule are
+    compared with what the controller actually asked for. The profile only
+    supplies the nominal schedule drawn under the envelope.
+
+    The time base is walked in chunks so memory is bounded by
+    len(runs) * chunk_seconds / step_seconds, whatever the run length.
+
+    Args:
+        runs: Run records from DatabaseManager.fetch_runs
+        profile: Schedule to overlay on the envelope
+    Returns:
+        ComparisonResult with the grid (seconds), schedule on the grid,
+        envelope (one row per percentile) and per-run deviation stats
+    """
+    readers = [RunReader(run['SampleFile']) if run['SampleFile'] else None for run in runs]
+    # Runs that held past the nominal end are compared to their last sample
+    longest = max((reader.duration for reader in readers if reader is not None), default=0.0)
+    time = np.arange(0.0, max(profile.total_minutes * 60, longest) + step_seconds, step_seconds)
+    schedule = schedule_on_grid(profile, time)
+    envelope = np.full((len(percentiles), len(time)), np.nan, dtype=np.float32)
+
+    sum_sq = np.zeros(len(runs))
+    max_abs = np.zeros(len(runs))
+    counts = np.zeros(len(runs), dtype=np.int64)
+
+    chunk = max(1, int(chunk_seconds / step_seconds))
+    resampled = np.empty((len(runs), chunk), dtype=np.float32)
+    recorded = np.empty((len(runs), chunk), dtype=np.float32)
+
+    for first in range(0, len(time), chunk):
+        grid = time[first:first + chunk]
+        block = resampled[:, :len(grid)]
+        block.fill(np.nan)
+        setpoints = recorded[:, :len(grid)]
+        setpoints.fill(np.nan)
+
+        for i, reader in enumerate(readers):
+            if reader is None or not len(reader):
+                continue
+            # One sample either side so the chunk edges interpolate correctly
+            start = max(0, reader.index_at(grid[0]) - 1)
+            end = min(len(reader), reader.index_at(grid[-1]) + 1)
+            samples = reader.samples[start:end]
+            if len(samples) < 2:
+                continue
+            block[i] = np.interp(grid, samples['elapsed'], samples['measured'], left=np.nan, right=np.nan)
+            setpoints[i] = np.interp(grid, samples['elapsed'], samples['setpoint'], left=np.nan, right=np.nan)
+
+        deviation = block - setpoints
+        valid = ~np.isnan(deviation)
+        filled = np.where(valid, deviation, 0.0)
+        sum_sq += np.einsum('ij,ij->i', filled, filled)
+        max_abs = np.maximum(max_abs, np.abs(filled).max(axis=1))
+        counts += valid.sum(axis=1)
+
+        with warnings.catch_warnings():
+            # Columns where no run has data are expected and stay NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            envelope[:, first:first + len(grid)] = np.nanpercentile(block, percentiles, axis=0)
+
+    rms = np.sqrt(np.divide(sum_sq, counts, out=np.full(len(runs), np.nan), where=counts > 0))
+    stats = [RunStats(run['Id'], run['FurnaceId'], run['StartedAt'], float(rms[i]),
+                      float(max_abs[i]) if counts[i] else float('nan'), int(counts[i]))
+             for i, run in enumerate(runs)]
+    return ComparisonResult(time, schedule, envelope, tuple(percentiles), stats)
+
+
+def compare_schedule_runs(schedule_name: str, **kwargs) -> ComparisonResult:
+    """Compare every recorded run of a schedule, overlaid on its current version."""
+    data = DatabaseManager.load_schedule(schedule_name)
+    if not data:
+        raise ValueError(f"No schedule found with name: {schedule_name}")
+    runs = [run for run in DatabaseManager.fetch_runs(schedule_name) if run['SampleFile']]
+    return compare_runs(runs, ScheduleProfile(data), **kwargs)
+
+
+def furnace_drift(stats: List[RunStats]) -> Dict[str, float]:
+    """Trend of RMS deviation per furnace in °C per run, oldest run first.
+
+    A clearly positive slope means the furnace tracks the recipe worse over time.
+    """
+    by_furnace: Dict[str, List[RunStats]] = {}
+    for stat in stats:
+        if stat.samples:
+            by_furnace.setdefault(stat.furnace_id, []).append(stat)
+
+    drift = {}
+    for furnace_id, furnace_stats in by_furnace.items():
+        furnace_stats.sort(key=lambda stat: stat.run_id)
+        if len(furnace_stats) < 2:
+            continue
+        rms = np.array([stat.rms for stat in furnace_stats])
+        drift[furnace_id] = float(np.polyfit(np.arange(len(rms)), rms, 1)[0])
+    return drift
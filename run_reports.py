@@ -0,0 +1,336 @@
+import argparse
+import html
+import logging
+import multiprocessing
+import os
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QSizeF, QUrl
+from PyQt5.QtGui import QImage, QPainter, QPageSize, QPdfWriter, QTextDocument, QColor
+
+from constants import (REPORT_FORMATS, REPORT_PAGE_WIDTH, REPORT_PNG_SCALE, REPORT_PLOT_SIZE,
+                       REPORT_MAX_TABLE_ROWS, REPLAY_MAX_POINTS, ALARM_DEVIATION_LIMIT)
+from database import DatabaseManager
+from furnace_commands import furnace_commands
+from plot_rendering import configure_rendering, offscreen_application, render_profile_image
+from runs import RunReader, decimate
+from schedule_profile import ScheduleProfile
+from segment import seconds_to_time
+
+logger = logging.getLogger(__name__)
+
+# A run report when run_id is set, otherwise a report of the schedule alone
+ReportJob = namedtuple('ReportJob', ['run_id', 'schedule_name'])
+ReportResult = namedtuple('ReportResult', ['job', 'path', 'error'])
+
+_A4_RATIO = 297 / 210
+
+
+def run_jobs(schedule_name: Optional[str] = None, since: Optional[str] = None) -> List[ReportJob]:
+    """Report jobs for recorded runs, optionally of one schedule or started on or after a date."""
+    return [ReportJob(run['Id'], run['ScheduleName']) for run in DatabaseManager.fetch_runs(schedule_name)
+            if since is None or (run['StartedAt'] or '') >= since]
+
+
+def deviation_summary(samples: np.ndarray, limit: float = ALARM_DEVIATION_LIMIT) -> Dict:
+    """Measured minus recorded setpoint over a run's samples.
+
+    The recorded setpoint already accounts for guaranteed soaks that waited,
+    so this is the deviation the controller actually saw.
+    """
+    elapsed = np.asarray(samples['elapsed'], dtype=float)
+    deviation = np.asarray(samples['measured'], dtype=float) - np.asarray(samples['setpoint'], dtype=float)
+    valid = np.isfinite(deviation)
+    # Each sample stands for the time until the next one
+    durations = np.diff(elapsed, append=elapsed[-1]) if len(elapsed) else elapsed
+    if not valid.any():
+        return {'Samples': len(samples), 'Measured': 0}
+    values = deviation[valid]
+    return {
+        'Samples': len(samples),
+        'Measured': int(valid.sum()),
+        'Mean': float(values.mean()),
+        'Rms': float(np.sqrt(np.mean(values * values))),
+        'MaxAbove': float(values.max()),
+        'MaxBelow': float(values.min()),
+        'SecondsBeyondLimit': float(durations[valid][np.abs(values) > limit].sum()),
+        'Limit': limit,
+    }
+
+
+def _table(headers: Sequence[str], rows: Sequence[Sequence], total: Optional[int] = None) -> str:
+    cells = ''.join(f'<th>{html.escape(str(header))}</th>' for header in headers)
+    lines = [f'<table border="1" cellspacing="0" cellpadding="3" width="100%"><tr>{cells}</tr>']
+    for row in rows[:REPORT_MAX_TABLE_ROWS]:
+        lines.append('<tr>' + ''.join(f'<td>{html.escape(_cell(value))}</td>' for value in row) + '</tr>')
+    lines.append('</table>')
+    total = len(rows) if total is None else total
+    if total > REPORT_MAX_TABLE_ROWS:
+        lines.append(f'<p><i>{total - REPORT_MAX_TABLE_ROWS} more rows not shown</i></p>')
+    return '\n'.join(lines)
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:.1f}'
+    return str(value)
+
+
+def _segment_rows(segments) -> List[Tuple]:
+    return [(i + 1, segment.cycle_type, segment.start_temp, segment.end_temp, segment.cycle_time,
+             segment.shape if segment.cycle_type == 'Ramp' else '', segment.rate, segment.tolerance,
+             f"{segment.repeat_count} x {segment.repeat_span}" if segment.repeat_count else '', segment.notes)
+            for i, segment in enumerate(segments)]
+
+
+def build_report(job: ReportJob) -> Tuple[str, str, QImage]:
+    """The title, HTML body and profile plot of a report.
+
+    Raises:
+        ValueError: if the run or schedule does not exist
+    """
+    run = samples = None
+    alarms = []
+    if job.run_id is not None:
+        run = DatabaseManager.load_run(job.run_id)
+        if run is None:
+            raise ValueError(f"No run with id {job.run_id}")
+        # The version the run was made with, which may differ from today's schedule
+        segments = (DatabaseManager.load_schedule_version(run['ScheduleVersionId'])
+                    if run['ScheduleVersionId'] else None) or DatabaseManager.load_schedule(run['ScheduleName'])
+        if run['SampleFile'] and os.path.exists(run['SampleFile']):
+            samples = RunReader(run['SampleFile']).samples
+        alarms = DatabaseManager.load_alarm_events(run_id=job.run_id)
+        title = f"Run {job.run_id}: {run['ScheduleName']}"
+    else:
+        segments = DatabaseManager.load_schedule(job.schedule_name)
+        title = f"Schedule: {job.schedule_name}"
+    if not segments:
+        raise ValueError(f"No schedule found for {title}")
+    profile = ScheduleProfile(segments)
+
+    parts = [f'<h2>{html.escape(title)}</h2>']
+    details = [('Schedule', run['ScheduleName'] if run else job.schedule_name),
+               ('Total time', seconds_to_time(int(round(profile.total_minutes * 60))))]
+    if run:
+        details = [('Furnace', run['FurnaceId']), ('Started', run['StartedAt']),
+                   ('Ended', run['EndedAt'] or 'not finished'),
+                   ('Schedule version', run['ScheduleVersionId'])] + details
+    parts.append(_table(('Item', 'Value'), details))
+    parts.append(f'<p><img src="plot" width="{REPORT_PAGE_WIDTH - 20}"></p>')
+
+    measured = None
+    if run is not None:
+        parts.append('<h3>Deviations</h3>')
+        if samples is not None and len(samples):
+            summary = deviation_summary(samples)
+            measured = decimate(samples, REPLAY_MAX_POINTS)
+            if summary['Measured']:
+                parts.append(_table(('Measure', 'Value'), [
+                    ('Samples measured', f"{summary['Measured']} of {summary['Samples']}"),
+                    ('Mean deviation (°C)', summary['Mean']),
+                    ('RMS deviation (°C)', summary['Rms']),
+                    ('Highest deviation (°C)', summary['MaxAbove']),
+                    ('Lowest deviation (°C)', summary['MaxBelow']),
+                    (f"Time beyond ±{summary['Limit']:g} °C", seconds_to_time(int(summary['SecondsBeyondLimit']))),
+                ]))
+            else:
+                parts.append('<p>No measured temperatures were recorded.</p>')
+        else:
+            parts.append('<p>No samples were recorded.</p>')
+        parts.append('<h3>Alarms</h3>')
+        if alarms:
+            parts.append(_table(('Time', 'Rule', 'State', 'Message'), [
+                (seconds_to_time(int(event['ElapsedSeconds'])), event['Rule'], event['State'], event['Message'])
+                for event in alarms]))
+        else:
+            parts.append('<p>No alarms.</p>')
+
+    parts.append('<h3>Segments</h3>')
+    parts.append(_table(('#', 'Type', 'Start (°C)', 'End (°C)', 'Time', 'Shape', 'Rate (°C/min)',
+                         'Tolerance (°C)', 'Repeat', 'Notes'), _segment_rows(segments)))
+    parts.append('<h3>Furnace Commands</h3>')
+    commands = furnace_commands(profile.expanded_cycles())
+    parts.append(_table(('Temperature Commands', 'Time Commands'), commands))
+
+    if measured is not None:
+        # The setpoint the run recorded, as in the replay window, so Hold waits line up
+        minutes = measured['elapsed'] / 60
+        image = render_profile_image(minutes, measured['setpoint'], measured=[(minutes, measured['measured'])],
+                                     size=REPORT_PLOT_SIZE)
+    else:
+        image = render_profile_image(*profile.breakpoints(), size=REPORT_PLOT_SIZE)
+    return title, '\n'.join(parts), image
+
+
+def write_report(path: str, title: str, body: str, image: QImage, fmt: str):
+    """Lay out a report and write it as a PDF (A4 pages) or a single PNG."""
+    document = QTextDocument()
+    document.setDocumentMargin(10)
+    document.addResource(QTextDocument.ImageResource, QUrl('plot'), image)
+    document.setHtml(f'<html><body>{body}</body></html>')
+    document.setTextWidth(REPORT_PAGE_WIDTH)
+    if fmt == 'pdf':
+        writer = QPdfWriter(path)
+        writer.setPageSize(QPageSize(QPageSize.A4))
+        writer.setTitle(title)
+        writer.setCreator('SmartFurnace')
+        # Laid out on pages of the same width as PNGs, then scaled to A4
+        document.setPageSize(QSizeF(REPORT_PAGE_WIDTH, REPORT_PAGE_WIDTH * _A4_RATIO))
+        document.print_(writer)
+    elif fmt == 'png':
+        size = document.size()
+        page = QImage(int(size.width() * REPORT_PNG_SCALE), int(size.height() * REPORT_PNG_SCALE),
+                      QImage.Format_RGB32)
+        page.fill(QColor('white'))
+        painter = QPainter(page)
+        painter.scale(REPORT_PNG_SCALE, REPORT_PNG_SCALE)
+        document.drawContents(painter)
+        painter.end()
+        if not page.save(path, 'PNG'):
+            raise OSError(f"Could not write {path}")
+    else:
+        raise ValueError(f"Unknown report format: {fmt!r}")
+
+
+def report_file_name(job: ReportJob, fmt: str) -> str:
+    name = re.sub(r'[^\w.-]+', '_', job.schedule_name or '').strip('_') or 'schedule'
+    if job.run_id is not None:
+        return f"run_{job.run_id}_{name}.{fmt}"
+    return f"schedule_{name}.{fmt}"
+
+
+def render_report(job: ReportJob, output_dir: str, fmt: str = 'pdf') -> ReportResult:
+    """Build and write one report; errors are returned rather than raised, so a batch carries on."""
+    try:
+        offscreen_application()
+        title, body, image = build_report(job)
+        path = os.path.join(output_dir, report_file_name(job, fmt))
+        write_report(path, title, body, image, fmt)
+        return ReportResult(job, path, None)
+    except Exception as e:
+        logger.error("Error rendering report for %s: %s", job, e, exc_info=True)
+        return ReportResult(job, None, str(e))
+
+
+def _init_worker():
+    offscreen_application()
+    configure_rendering('quality')
+
+
+class ReportBatch:
+    """Reports rendered in a pool of worker processes, one per core by default.
+
+    Workers are spawned rather than forked, since a forked copy of a running
+    Qt application is not safe to use. Call collect() from a GUI timer, or
+    wait() to block until every report is done.
+    """
+
+    def __init__(self, jobs: Sequence[ReportJob], output_dir: str, fmt: str = 'pdf',
+                 workers: Optional[int] = None):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt!r}")
+        os.makedirs(output_dir, exist_ok=True)
+        self.total = len(jobs)
+        self.results: List[ReportResult] = []
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_worker)
+        self._pending = [self._pool.submit(render_report, job, output_dir, fmt) for job in jobs]
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def collect(self) -> List[ReportResult]:
+        """Results finished since the last call, without blocking."""
+        finished = [future for future in self._pending if future.done()]
+        return self._take(finished)
+
+    def wait(self, progress: Optional[Callable[[int, int], None]] = None) -> List[ReportResult]:
+        """Block until all reports are done; progress(done, total) is called after each one."""
+        for future in as_completed(list(self._pending)):
+            self._take([future])
+            if progress:
+                progress(len(self.results), self.total)
+        return self.results
+
+    def _take(self, finished) -> List[ReportResult]:
+        results = []
+        for future in finished:
+            self._pending.remove(future)
+            if future.cancelled():
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:  # The worker process itself died
+                logger.error("Report worker failed: %s", e)
+        self.results.extend(results)
+        return results
+
+    def close(self, cancel: bool = False):
+        """Shut the pool down, dropping reports not yet started if cancel is set."""
+        if cancel:
+            for future in self._pending:
+                future.cancel()
+        self._pool.shutdown(wait=not cancel, cancel_futures=cancel)
+
+
+def generate_reports(jobs: Sequence[ReportJob], output_dir: str, fmt: str = 'pdf',
+                     workers: Optional[int] = None,
+                     progress: Optional[Callable[[int, int], None]] = None) -> List[ReportResult]:
+    """Render reports for many runs or schedules across all cores."""
+    batch = ReportBatch(jobs, output_dir, fmt, workers)
+    try:
+        return batch.wait(progress)
+    finally:
+        batch.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render run and schedule reports in parallel.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--run', type=int, action='append', default=[], help="run id; may be repeated")
+    parser.add_argument('--runs-of', metavar='SCHEDULE', action='append', default=[],
+                        help="every run of a schedule; may be repeated")
+    parser.add_argument('--all-runs', action='store_true', help="every recorded run")
+    parser.add_argument('--since', help="only runs started on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--schedule', action='append', default=[], help="a schedule without run data")
+    parser.add_argument('--format', choices=REPORT_FORMATS, default=REPORT_FORMATS[0])
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.all_runs:
+        jobs += run_jobs(since=args.since)
+    for schedule_name in args.runs_of:
+        jobs += run_jobs(schedule_name, args.since)
+    for run_id in args.run:
+        run = DatabaseManager.load_run(run_id)
+        jobs.append(ReportJob(run_id, run['ScheduleName'] if run else None))
+    jobs += [ReportJob(None, schedule_name) for schedule_name in args.schedule]
+    jobs = list(dict.fromkeys(jobs))
+    if not jobs:
+        parser.error("nothing to report; give --run, --runs-of, --all-runs or --schedule")
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end='', file=sys.stderr, flush=True)
+
+    results = generate_reports(jobs, args.output_dir, args.format, args.workers, progress)
+    print(file=sys.stderr)
+    failed = [result for result in results if result.error]
+    for result in failed:
+        print(f"{result.job}: {result.error}", file=sys.stderr)
+    print(f"Wrote {len(results) - len(failed)} of {len(jobs)} reports to {args.output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
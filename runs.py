@@ -0,0 +1,146 @@
+import logging
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+
+from database import DatabaseManager
+from constants import RUN_FLUSH_SAMPLES, REPLAY_MAX_POINTS
+
+logger = logging.getLogger(__name__)
+
+# One fixed-size little-endian record per sample so files can be memory-mapped
+SAMPLE_DTYPE = np.dtype([('elapsed', '<f8'), ('setpoint', '<f4'), ('measured', '<f4')])
+_SAMPLE_STRUCT = struct.Struct('<dff')
+
+
+def get_runs_dir() -> str:
+    """Directory holding recorded run sample files."""
+    runs_dir = os.path.join(DatabaseManager.APP_DATA, 'runs')
+    os.makedirs(runs_dir, exist_ok=True)
+    return runs_dir
+
+
+class RunRecorder:
+    """Appends samples of a running cycle to a binary run file."""
+
+    def __init__(self, schedule_name: str, furnace_id: str = 'default'):
+        self.schedule_name = schedule_name
+        self.furnace_id = furnace_id
+        self.run_id = DatabaseManager.create_run(schedule_name, furnace_id)
+        self.sample_file = None
+        self._file = None
+        self._pending = bytearray()
+        self._pending_count = 0
+        if self.run_id is not None:
+            self.sample_file = os.path.join(get_runs_dir(), f"run_{self.run_id}.bin")
+            self._file = open(self.sample_file, 'ab')
+            DatabaseManager.set_run_sample_file(self.run_id, self.sample_file)
+
+    @property
+    def pending(self) -> int:
+        """Samples buffered but not yet written."""
+        return self._pending_count
+
+    def record(self, elapsed_seconds: float, setpoint: float, measured: float = float('nan')):
+        """Buffer one sample; samples are written in blocks of RUN_FLUSH_SAMPLES."""
+        if self._file is None:
+            return
+        self._pending += _SAMPLE_STRUCT.pack(elapsed_seconds, setpoint, measured)
+        self._pending_count += 1
+        if self._pending_count >= RUN_FLUSH_SAMPLES:
+            self.flush()
+
+    def flush(self):
+        if self._file is None or not self._pending:
+            return
+        try:
+            self._file.write(self._pending)
+            self._file.flush()
+        except OSError as e:
+            logger.error("Error writing run samples: %s", e)
+        self._pending = bytearray()
+        self._pending_count = 0
+
+    def finish(self):
+        """Flush remaining samples and mark the run as ended."""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        DatabaseManager.finish_run(self.run_id)
+
+
+class RunReader:
+    """Read-only, memory-mapped view of a recorded run.
+
+    Only the pages touched by a window query are read from disk, so long runs
+    never have to be loaded into memory as a whole.
+    """
+
+    def __init__(self, sample_file: str):
+        self.sample_file = sample_file
+        size = os.path.getsize(sample_file) if os.path.exists(sample_file) else 0
+        count = size // SAMPLE_DTYPE.itemsize
+        if count:
+            self.samples = np.memmap(sample_file, dtype=SAMPLE_DTYPE, mode='r', shape=(count,))
+        else:
+            self.samples = np.zeros(0, dtype=SAMPLE_DTYPE)
+
+    @classmethod
+    def for_run(cls, run_id: int) -> Optional['RunReader']:
+        run = DatabaseManager.load_run(run_id)
+        if not run or not run['SampleFile']:
+            return None
+        return cls(run['SampleFile'])
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        """Elapsed seconds of the last sample."""
+        return float(self.samples['elapsed'][-1]) if len(self.samples) else 0.0
+
+    def index_at(self, elapsed_seconds: float) -> int:
+        """Index of the first sample at or after the given time (binary search)."""
+        return int(np.searchsorted(self.samples['elapsed'], elapsed_seconds, side='left'))
+
+    def sample_at(self, elapsed_seconds: float):
+        """The last sample at or before the given time, or None."""
+        index = int(np.searchsorted(self.samples['elapsed'], elapsed_seconds, side='right')) - 1
+        return self.samples[index] if index >= 0 else None
+
+    def window(self, start_seconds: float, end_seconds: float,
+               max_points: int = REPLAY_MAX_POINTS) -> np.ndarray:
+        """Samples between two times, decimated to at most max_points."""
+        start = self.index_at(start_seconds)
+        end = self.index_at(end_seconds)
+        return decimate(self.samples[start:end], max_points)
+
+
+def decimate(samples: np.ndarray, max_points: int) -> np.ndarray:
+    """Reduce samples to about max_points, keeping the min and max measured value of each bin."""
+    count = len(samples)
+    if count <= max_points:
+        return np.array(samples)
+
+    bins = max(1, max_points // 2 - 1)  # room for the partial last bin
+    bin_size = count // bins
+    usable = bins * bin_size
+    measured = samples['measured'][:usable].reshape(bins, bin_size)
+    missing = np.isnan(measured)
+    offsets = np.arange(bins) * bin_size
+    low = offsets + np.argmin(np.where(missing, np.inf, measured), axis=1)
+    high = offsets + np.argmax(np.where(missing, -np.inf, measured), axis=1)
+    extremes = [low, high]
+    if usable < count:
+        # The partial last bin holds the newest samples
+        tail = samples['measured'][usable:]
+        tail_missing = np.isnan(tail)
+        extremes.append([usable + np.argmin(np.where(tail_missing, np.inf, tail)),
+                         usable + np.argmax(np.where(tail_missing, -np.inf, tail))])
+    indices = np.unique(np.concatenate(extremes))
+    return np.array(samples[indices])
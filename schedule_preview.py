@@ -0,0 +1,135 @@
+from PyQt5.QtCore import QTimer
+import numpy as np
+import pyqtgraph as pg
+import logging
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from styles import get_plot_theme
+from constants import SCHEDULE_PREVIEW_DEBOUNCE_MS, SCHEDULE_PREVIEW_HEIGHT
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+logger = logging.getLogger(__name__)
+
+
+def row_geometry(entry: Optional[Dict]) -> Tuple[float, np.ndarray, np.ndarray]:
+    """(duration, vertex times from the row's start, vertex temperatures) of one editor row.
+
+    Rows that cannot be drawn yet, e.g. while a number is half typed, take
+    no time and draw as a gap.
+    """
+    try:
+        profile = ScheduleProfile([Segment.from_entry(entry)])
+        x_data, y_data = profile.breakpoints()
+        return profile.total_minutes, np.asarray(x_data, dtype=np.float64), np.asarray(y_data, dtype=np.float64)
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return 0.0, np.zeros(2), np.full(2, np.nan)
+
+
+class SchedulePreview(pg.PlotWidget):
+    """Live plot of the schedule being edited.
+
+    Edits are collected per row and applied after a short pause in typing.
+    When only row contents change, just the vertices of those rows are
+    recomputed and later vertices are shifted by the change in duration;
+    inserted or deleted rows and repeat blocks rebuild the whole curve.
+    """
+
+    def __init__(self, read_row: Callable[[int], Optional[Dict]], row_count: Callable[[], int], parent=None):
+        super().__init__(parent)
+        self.read_row = read_row
+        self.row_count = row_count
+
+        theme = get_plot_theme()
+        self.setBackground(theme['background'])
+        self.setLabel('left', text='Temperature', units='°C')
+        self.setLabel('bottom', text='Time (min)')
+        self.showGrid(x=True, y=True, alpha=0.5)
+        self.setMinimumHeight(SCHEDULE_PREVIEW_HEIGHT)
+        self.curve = self.plot([], [], pen=pg.mkPen('g', width=2), connect='finite')
+
+        # Vertex arrays plus, per row, its first vertex, start time and duration
+        self._x = np.zeros(0)
+        self._y = np.zeros(0)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._starts = np.zeros(0)
+        self._durations = np.zeros(0)
+        self._incremental = False
+
+        self._dirty_rows: Set[int] = set()
+        self._rebuild = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(SCHEDULE_PREVIEW_DEBOUNCE_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def row_changed(self, row: int):
+        """Note an edit in one row; the plot updates once typing pauses."""
+        if row >= 0:
+            self._dirty_rows.add(row)
+            self._timer.start()
+
+    def rows_changed(self):
+        """Note rows inserted, deleted or reloaded; the next refresh rebuilds the curve."""
+        self._rebuild = True
+        self._timer.start()
+
+    def refresh(self):
+        """Apply pending edits now."""
+        self._timer.stop()
+        try:
+            if self._rebuild or not self._incremental or not self._update_rows(sorted(self._dirty_rows)):
+                self._build()
+        except Exception as e:
+            logger.error("Error updating schedule preview: %s", e, exc_info=True)
+        self._rebuild = False
+        self._dirty_rows.clear()
+        self.curve.setData(self._x, self._y, connect='finite')
+
+    def _build(self):
+        entries = [self.read_row(row) for row in range(self.row_count())]
+        self._incremental = not any(entry and entry.get('CycleType') == 'Repeat' for entry in entries)
+        if not self._incremental:
+            # Repeat blocks copy earlier rows, so draw the expanded profile as a whole
+            try:
+                x_data, y_data = ScheduleProfile([Segment.from_entry(entry) for entry in entries]).breakpoints()
+            except (TypeError, ValueError, KeyError, AttributeError):
+                x_data, y_data = [], []
+            self._x = np.asarray(x_data, dtype=np.float64)
+            self._y = np.asarray(y_data, dtype=np.float64)
+            return
+
+        geometry = [row_geometry(entry) for entry in entries]
+        self._durations = np.array([duration for duration, _, _ in geometry], dtype=np.float64)
+        self._starts = np.concatenate(([0.0], np.cumsum(self._durations)[:-1])) if geometry else np.zeros(0)
+        counts = [len(x_rel) for _, x_rel, _ in geometry]
+        self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        if geometry:
+            self._x = np.concatenate([start + x_rel for start, (_, x_rel, _) in zip(self._starts, geometry)])
+            self._y = np.concatenate([y for _, _, y in geometry])
+        else:
+            self._x = np.zeros(0)
+            self._y = np.zeros(0)
+
+    def _update_rows(self, rows) -> bool:
+        """Recompute only the given rows; False if the change needs a rebuild."""
+        if len(self._durations) != self.row_count():
+            return False
+        for row in rows:
+            if row >= len(self._durations):
+                return False
+            entry = self.read_row(row)
+            if entry and entry.get('CycleType') == 'Repeat':
+                return False
+            duration, x_rel, y = row_geometry(entry)
+            first, last = self._offsets[row], self._offsets[row + 1]
+            if len(x_rel) != last - first:
+                return False  # e.g. a ramp switched between linear and curved
+            self._x[first:last] = self._starts[row] + x_rel
+            self._y[first:last] = y
+            shift = duration - self._durations[row]
+            if shift:
+                self._x[last:] += shift
+                self._starts[row + 1:] += shift
+                self._durations[row] = duration
+        return True
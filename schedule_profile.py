@@ -0,0 +1,191 @@
+import bisect
+import math
+from typing import List, Optional, Tuple
+
+from constants import (PROFILE_SHAPES, PROFILE_EXP_SHAPE_K, PROFILE_HOLD_TOLERANCE,
+                       PROFILE_MAX_SEGMENTS, PROFILE_CURVE_POINTS)
+from segment import Segment
+
+
+def shape_progress(shape: int, progress: float) -> Tuple[float, float]:
+    """Fraction of the temperature change done at a fraction of the duration, and its derivative."""
+    if shape == 1:
+        # Exponential approach, normalised to reach the end temperature exactly
+        scale = 1.0 - math.exp(-PROFILE_EXP_SHAPE_K)
+        decay = math.exp(-PROFILE_EXP_SHAPE_K * progress)
+        return (1.0 - decay) / scale, PROFILE_EXP_SHAPE_K * decay / scale
+    if shape == 2:
+        # Smoothstep: zero slope at both ends
+        return progress * progress * (3.0 - 2.0 * progress), 6.0 * progress * (1.0 - progress)
+    return progress, 1.0
+
+
+class ScheduleProfile:
+    """Ramp/soak breakpoints precomputed once so setpoint lookups are O(log n).
+
+    Rate-based ramps are converted to durations and Repeat rows are expanded
+    into copies of the rows they repeat when the profile is built, so a lookup
+    is a bisect plus a closed-form evaluation of the segment's shape. Times are
+    in minutes from the start of the cycle.
+    """
+
+    __slots__ = ('starts', 'durations', 'start_temps', 'end_temps', 'shapes', 'tolerances',
+                 'cycle_types', 'total_minutes')
+
+    def __init__(self, schedule: List[Segment]):
+        self.starts = []
+        self.durations = []
+        self.start_temps = []
+        self.end_temps = []
+        self.shapes = []
+        self.tolerances = []  # band of a guaranteed soak, None for other segments
+        self.cycle_types = []
+
+        # Range of expanded segments produced by each row, so a Repeat can copy whole rows
+        row_ranges = []
+        for row, cycle in enumerate(schedule):
+            first = len(self.durations)
+            if cycle.cycle_type == 'Repeat':
+                self._expand_repeat(row, cycle, row_ranges)
+            else:
+                self._add_segment(cycle)
+            row_ranges.append((first, len(self.durations)))
+
+        current_time = 0.0
+        for duration in self.durations:
+            self.starts.append(current_time)
+            current_time += duration
+        self.total_minutes = current_time
+
+    def _add_segment(self, cycle: Segment):
+        start_temp = cycle.start_temp
+        end_temp = cycle.end_temp
+        if start_temp is None or end_temp is None:
+            raise ValueError(f"{cycle.cycle_type} needs start and end temperatures")
+        if cycle.shape not in PROFILE_SHAPES:
+            raise ValueError(f"Unknown ramp shape: {cycle.shape}")
+        if cycle.rate:
+            if cycle.rate < 0:
+                raise ValueError("Ramp rate must be positive")
+            duration = abs(end_temp - start_temp) / cycle.rate
+        else:
+            duration = cycle.minutes
+        if cycle.cycle_type == 'Hold':
+            tolerance = cycle.tolerance if cycle.tolerance is not None else PROFILE_HOLD_TOLERANCE
+        else:
+            tolerance = None
+
+        self.durations.append(duration)
+        self.start_temps.append(start_temp)
+        self.end_temps.append(end_temp)
+        self.shapes.append(PROFILE_SHAPES.index(cycle.shape))
+        self.tolerances.append(tolerance)
+        self.cycle_types.append(cycle.cycle_type)
+
+    def _expand_repeat(self, row: int, cycle: Segment, row_ranges: List[Tuple[int, int]]):
+        count = cycle.repeat_count or 0
+        span = cycle.repeat_span or 0
+        if count < 0 or not 1 <= span <= row:
+            raise ValueError(f"Row {row + 1}: Repeat must cover 1 to {row} previous rows")
+        first, last = row_ranges[row - span][0], row_ranges[row - 1][1]
+        if len(self.durations) + count * (last - first) > PROFILE_MAX_SEGMENTS:
+            raise ValueError(f"Schedule expands to more than {PROFILE_MAX_SEGMENTS} segments")
+        for column in (self.durations, self.start_temps, self.end_temps, self.shapes,
+                       self.tolerances, self.cycle_types):
+            column.extend(column[first:last] * count)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def expanded_cycles(self) -> List[Segment]:
+        """One Ramp/Soak/Hold segment per expanded segment, rounded to whole seconds."""
+        return [Segment(cycle_type, start_temp, end_temp, round(duration * 60), shape=PROFILE_SHAPES[shape])
+                for cycle_type, start_temp, end_temp, duration, shape in zip(self.cycle_types, self.start_temps,
+                                                                            self.end_temps, self.durations,
+                                                                            self.shapes)]
+
+    def breakpoints(self) -> Tuple[List[float], List[float]]:
+        """Vertices of the profile as (minutes, temperatures), for plotting or np.interp.
+
+        Linear segments contribute their two end points; curved ramps are
+        sampled at PROFILE_CURVE_POINTS points.
+        """
+        x_data = []
+        y_data = []
+        for start, duration, start_temp, end_temp, shape in zip(self.starts, self.durations,
+                                                                self.start_temps, self.end_temps,
+                                                                self.shapes):
+            if shape and duration > 0 and start_temp != end_temp:
+                for i in range(PROFILE_CURVE_POINTS + 1):
+                    progress = i / PROFILE_CURVE_POINTS
+                    x_data.append(start + duration * progress)
+                    y_data.append(start_temp + (end_temp - start_temp) * shape_progress(shape, progress)[0])
+            else:
+                x_data.extend([start, start + duration])
+                y_data.extend([start_temp, end_temp])
+        return x_data, y_data
+
+    def segment_index(self, minutes: float) -> int:
+        """Index of the segment active at the given time, clamped to the schedule."""
+        index = bisect.bisect_right(self.starts, minutes) - 1
+        if index < 0:
+            return 0
+        return min(index, len(self.starts) - 1)
+
+    def temperature_at(self, minutes: float) -> Optional[float]:
+        """Ideal temperature at the given time, or None outside the schedule."""
+        if not self.starts or minutes < 0 or minutes > self.total_minutes:
+            return None
+        return self.setpoint_at(minutes)[0]
+
+    def setpoint_at(self, minutes: float) -> Tuple[float, float]:
+        """Return (temperature, slope in °C/min), holding the end points outside the schedule."""
+        if not self.starts:
+            return 0.0, 0.0
+        if minutes <= 0:
+            return self.start_temps[0], 0.0
+        if minutes >= self.total_minutes:
+            return self.end_temps[-1], 0.0
+
+        index = self.segment_index(minutes)
+        duration = self.durations[index]
+        start_temp = self.start_temps[index]
+        if duration <= 0:
+            return self.end_temps[index], 0.0
+        change = self.end_temps[index] - start_temp
+        fraction, derivative = shape_progress(self.shapes[index], (minutes - self.starts[index]) / duration)
+        return start_temp + change * fraction, change * derivative / duration
+
+
+class HoldTracker:
+    """Maps cycle time to profile time, pausing during guaranteed soaks.
+
+    While the measured temperature is outside a Hold segment's tolerance
+    band, profile time stands still, so the soak only counts time spent at
+    temperature. Each update is O(1) apart from the segment bisect.
+    """
+
+    def __init__(self, profile: ScheduleProfile):
+        self.profile = profile
+        self.held_minutes = 0.0
+        self._last_elapsed: Optional[float] = None
+
+    def reset(self):
+        self.held_minutes = 0.0
+        self._last_elapsed = None
+
+    def profile_minutes(self, elapsed_minutes: float) -> float:
+        """Profile time at a point in the cycle, without updating the hold."""
+        return max(0.0, elapsed_minutes - self.held_minutes)
+
+    def update(self, elapsed_minutes: float, measurement: Optional[float]) -> float:
+        """Account for the time since the last update and return the current profile time."""
+        if self._last_elapsed is not None and measurement is not None and self.profile.starts:
+            minutes = self.profile_minutes(self._last_elapsed)
+            if minutes < self.profile.total_minutes:
+                index = self.profile.segment_index(minutes)
+                tolerance = self.profile.tolerances[index]
+                if tolerance is not None and abs(measurement - self.profile.end_temps[index]) > tolerance:
+                    self.held_minutes += max(0.0, elapsed_minutes - self._last_elapsed)
+        self._last_elapsed = elapsed_minutes
+        return self.profile_minutes(elapsed_minutes)
@@ -0,0 +1,79 @@
+from PyQt5.QtWidgets import QUndoCommand
+import time
+from typing import Dict
+
+from constants import SCHEDULE_UNDO_MERGE_SECONDS
+
+CELL_EDIT_ID = 1
+
+
+class CellEditCommand(QUndoCommand):
+    """One cell going from old to new text.
+
+    Pushed after the widget already shows the new text, so the first redo
+    does nothing. Keystrokes in the same cell within
+    SCHEDULE_UNDO_MERGE_SECONDS of each other merge into one command, and a
+    cell typed back to its original text drops out of the stack.
+    """
+
+    def __init__(self, editor, row: int, column: int, old: str, new: str):
+        super().__init__(f"Edit row {row + 1}")
+        self.editor = editor
+        self.row = row
+        self.column = column
+        self.old = old
+        self.new = new
+        self.time = time.monotonic()
+        self._pending_redo = False
+
+    def id(self) -> int:
+        return CELL_EDIT_ID
+
+    def mergeWith(self, other) -> bool:
+        if (other.row, other.column) != (self.row, self.column) \
+                or other.time - self.time > SCHEDULE_UNDO_MERGE_SECONDS:
+            return False
+        self.new = other.new
+        self.time = other.time
+        self.setObsolete(self.new == self.old)
+        return True
+
+    def redo(self):
+        if self._pending_redo:
+            self.editor.apply_cell(self.row, self.column, self.new)
+        self._pending_redo = True
+
+    def undo(self):
+        self.editor.apply_cell(self.row, self.column, self.old)
+
+
+class InsertRowCommand(QUndoCommand):
+    """A row inserted at a position with the given non-empty cell values."""
+
+    def __init__(self, editor, row: int, values: Dict[int, str]):
+        super().__init__(f"Add row {row + 1}")
+        self.editor = editor
+        self.row = row
+        self.values = values
+
+    def redo(self):
+        self.editor.insert_row(self.row, self.values)
+
+    def undo(self):
+        self.editor.remove_row(self.row)
+
+
+class DeleteRowCommand(QUndoCommand):
+    """A row removed; keeps only its non-empty cell values to put it back."""
+
+    def __init__(self, editor, row: int):
+        super().__init__(f"Delete row {row + 1}")
+        self.editor = editor
+        self.row = row
+        self.values = editor.row_values(row)
+
+    def redo(self):
+        self.editor.remove_row(self.row)
+
+    def undo(self):
+        self.editor.insert_row(self.row, self.values)
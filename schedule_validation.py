@@ -0,0 +1,217 @@
+import logging
+from collections import namedtuple
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from constants import (TIME_PATTERN, MIN_TEMP, MAX_TEMP, PROFILE_SHAPES, PROFILE_MAX_SEGMENTS,
+                       VALIDATION_MAX_RAMP_RATE, VALIDATION_CONTINUITY_TOLERANCE)
+from segment import CYCLE_TYPES, SEGMENT_OPTION_KEYS, SEGMENT_OPTION_DEFAULTS, pad_entry
+
+logger = logging.getLogger(__name__)
+
+# row is 0-based within its schedule; column is an entry key such as 'StartTemp'
+ValidationIssue = namedtuple('ValidationIssue', ['row', 'column', 'message'])
+
+ENTRY_KEYS = ('CycleType', 'StartTemp', 'EndTemp', 'CycleTime', 'Notes') + SEGMENT_OPTION_KEYS
+RAMP, SOAK, HOLD, REPEAT = (CYCLE_TYPES.index(name) for name in ('Ramp', 'Soak', 'Hold', 'Repeat'))
+
+
+def format_issue(issue: ValidationIssue) -> str:
+    return f"Row {issue.row + 1}, {issue.column}: {issue.message}"
+
+
+def _to_float(value) -> float:
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _floats(values: Sequence) -> np.ndarray:
+    try:
+        # Fast path for numbers and NULLs straight from the database
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _duration_minutes(text) -> float:
+    match = TIME_PATTERN.match(text) if isinstance(text, str) else None
+    if not match:
+        return np.nan
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 60 + int(minutes) + int(seconds) / 60
+
+
+def _codes(values: Sequence, names: Sequence[str]) -> np.ndarray:
+    lookup = {name: code for code, name in enumerate(names)}
+    return np.array([lookup.get(value, -1) for value in values], dtype=np.int8)
+
+
+def _columns(entries: Sequence[Sequence]) -> Dict[str, np.ndarray]:
+    """Parse entry tuples into one array per field; unparseable values become NaN or -1."""
+    rows = [pad_entry(entry) for entry in entries]
+    fields = list(zip(*rows)) if rows else [()] * len(ENTRY_KEYS)
+    # Recipes reuse a handful of durations, so each distinct string is parsed once
+    durations = {text: _duration_minutes(text) for text in set(fields[3])}
+    shapes = [SEGMENT_OPTION_DEFAULTS[0] if value in (None, '') else value for value in fields[5]]
+    return {
+        'type': _codes(fields[0], CYCLE_TYPES),
+        'start': _floats(fields[1]),
+        'end': _floats(fields[2]),
+        'minutes': np.array([durations[text] for text in fields[3]], dtype=np.float64),
+        'shape': _codes(shapes, PROFILE_SHAPES),
+        'rate_given': np.array([value not in (None, '') for value in fields[6]], dtype=bool),
+        'rate': _floats(fields[6]),
+        'tolerance_given': np.array([value not in (None, '') for value in fields[7]], dtype=bool),
+        'tolerance': _floats(fields[7]),
+        'count': _floats(fields[8]),
+        'span': _floats(fields[9]),
+    }
+
+
+def _check(columns: Dict[str, np.ndarray], row: np.ndarray) -> List[tuple]:
+    """Run every rule over all rows at once.
+
+    row holds each entry's position within its own schedule, so several
+    schedules can be checked in one pass without rules crossing between them.
+
+    Returns:
+        (index, column, message) for every failure, ordered by index
+    """
+    kind = columns['type']
+    start, end, minutes = columns['start'], columns['end'], columns['minutes']
+    rate, rate_given = columns['rate'], columns['rate_given']
+    count, span = columns['count'], columns['span']
+    index = np.arange(len(kind))
+    is_repeat = kind == REPEAT
+    is_segment = (kind >= 0) & ~is_repeat
+    is_ramp = kind == RAMP
+    uses_rate = is_ramp & rate_given
+
+    # Repeat rows end where the row before them ends, so carry the last real end forward
+    last_segment = np.maximum.accumulate(np.where(is_repeat & (row > 0), 0, index)) if len(index) else index
+    effective_end = end[last_segment]
+    previous_end = np.roll(effective_end, 1)
+
+    valid_span = is_repeat & (span >= 1) & (span <= row) & (span == np.floor(span))
+    block_first = index - np.where(valid_span, span, 0).astype(np.int64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ramp_rate = np.where(uses_rate, rate, np.abs(end - start) / minutes)
+
+    rules = [
+        (kind < 0, 'CycleType', f"Cycle type must be one of {', '.join(CYCLE_TYPES)}"),
+        (is_segment & np.isnan(start), 'StartTemp', "Start temperature must be a number"),
+        (is_segment & ((start < MIN_TEMP) | (start > MAX_TEMP)), 'StartTemp',
+         f"Start temperature must be between {MIN_TEMP} and {MAX_TEMP}"),
+        (is_segment & np.isnan(end), 'EndTemp', "End temperature must be a number"),
+        (is_segment & ((end < MIN_TEMP) | (end > MAX_TEMP)), 'EndTemp',
+         f"End temperature must be between {MIN_TEMP} and {MAX_TEMP}"),
+        (is_segment & ~uses_rate & np.isnan(minutes), 'CycleTime', "Time must be in format HH:MM:SS"),
+        (is_segment & ~uses_rate & (minutes == 0), 'CycleTime', "Duration cannot be zero; Optimize removes zero-length segments"),
+        (uses_rate & ~(rate > 0), 'Rate', "Rate must be a positive number"),
+        (is_ramp & (columns['shape'] < 0), 'Shape', f"Shape must be one of {', '.join(PROFILE_SHAPES)}"),
+        (((kind == SOAK) | (kind == HOLD)) & (start != end), 'EndTemp',
+         "Soak must end at its start temperature"),
+        ((kind == HOLD) & columns['tolerance_given'] & ~(columns['tolerance'] > 0), 'Tolerance',
+         "Tolerance must be a positive number"),
+        (is_ramp & np.isfinite(ramp_rate) & (ramp_rate > VALIDATION_MAX_RAMP_RATE), None,
+         lambda i: f"Ramp rate {ramp_rate[i]:.1f} °C/min exceeds {VALIDATION_MAX_RAMP_RATE:g} °C/min"),
+        (is_segment & (row > 0) & (np.abs(start - previous_end) > VALIDATION_CONTINUITY_TOLERANCE), 'StartTemp',
+         lambda i: f"Start temperature {start[i]:g} does not match the previous end {previous_end[i]:g}"),
+        (is_repeat & ~((count >= 1) & (count == np.floor(count))), 'RepeatCount',
+         "Repeat count must be a whole number of at least 1"),
+        (is_repeat & ~valid_span, 'RepeatSpan',
+         lambda i: f"Rows to repeat must be between 1 and {row[i]}" if row[i] else "Nothing above to repeat"),
+        (valid_span & (np.abs(start[block_first] - effective_end) > VALIDATION_CONTINUITY_TOLERANCE), 'RepeatSpan',
+         lambda i: f"Repeated rows start at {start[block_first[i]]:g} but end at {effective_end[i]:g}"),
+    ]
+
+    issues = []
+    for mask, column, message in rules:
+        for i in np.flatnonzero(mask):
+            name = column or ('Rate' if uses_rate[i] else 'CycleTime')
+            issues.append((int(i), name, message(i) if callable(message) else message))
+    issues.sort(key=lambda issue: (issue[0], ENTRY_KEYS.index(issue[1])))
+    return issues
+
+
+def _expanded_size(kind: np.ndarray, count: np.ndarray, span: np.ndarray) -> int:
+    """Number of segments after repeat blocks are expanded, as ScheduleProfile builds them."""
+    sizes = []
+    for row in range(len(kind)):
+        if kind[row] == REPEAT:
+            sizes.append(int(count[row]) * sum(sizes[row - int(span[row]):row]))
+        else:
+            sizes.append(1)
+    return sum(sizes)
+
+
+def validate_entries(entries: Sequence[Sequence]) -> List[ValidationIssue]:
+    """Check one schedule given as (CycleType, StartTemp, EndTemp, Duration, Notes[, options]) tuples.
+
+    Returns:
+        Every problem found, ordered by row and column; empty if the schedule is valid
+    """
+    columns = _columns(entries)
+    issues = [ValidationIssue(*issue) for issue in _check(columns, np.arange(len(entries)))]
+    if not issues and (columns['type'] == REPEAT).any():
+        if _expanded_size(columns['type'], columns['count'], columns['span']) > PROFILE_MAX_SEGMENTS:
+            last = int(np.flatnonzero(columns['type'] == REPEAT)[-1])
+            issues.append(ValidationIssue(last, 'RepeatCount',
+                                          f"Schedule expands to more than {PROFILE_MAX_SEGMENTS} segments"))
+    return issues
+
+
+def validate_schedule(schedule: Sequence[Dict]) -> List[ValidationIssue]:
+    """Check one schedule given as entry dicts, as the schedule editor collects them."""
+    return validate_entries([tuple(cycle.get(key) for key in ENTRY_KEYS) for cycle in schedule])
+
+
+def validate_database(cursor) -> Dict[str, List[ValidationIssue]]:
+    """Check every stored schedule in one query and one pass.
+
+    Returns:
+        Issues by schedule name, for schedules that have any
+    """
+    cursor.execute("""
+        SELECT s.name, e.cycle_type, e.start_temp, e.end_temp, e.duration, e.notes,
+               e.shape, e.rate, e.tolerance, e.repeat_count, e.repeat_span
+        FROM schedule_entries e JOIN schedules s ON s.id = e.schedule_id
+        ORDER BY s.id, e.position
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return {}
+
+    names = [row[0] for row in rows]
+    columns = _columns([row[1:] for row in rows])
+    # Position of each row within its schedule
+    first = np.ones(len(names), dtype=bool)
+    first[1:] = [a != b for a, b in zip(names[1:], names[:-1])]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(names)), 0))
+    row = np.arange(len(names)) - group_start
+
+    results: Dict[str, List[ValidationIssue]] = {}
+    for index, column, message in _check(columns, row):
+        results.setdefault(names[index], []).append(ValidationIssue(int(row[index]), column, message))
+
+    # Only schedules with repeat blocks and no other issues can still be too large
+    starts = np.flatnonzero(first)
+    stops = np.append(starts[1:], len(names))
+    has_repeat = np.add.reduceat((columns['type'] == REPEAT).astype(np.int64), starts) > 0
+    for start, stop in zip(starts[has_repeat], stops[has_repeat]):
+        if names[start] in results:
+            continue
+        schedule = slice(start, stop)
+        if _expanded_size(columns['type'][schedule], columns['count'][schedule],
+                          columns['span'][schedule]) > PROFILE_MAX_SEGMENTS:
+            results[names[start]] = [ValidationIssue(int(stop - start - 1), 'RepeatCount',
+                                                     f"Schedule expands to more than {PROFILE_MAX_SEGMENTS} segments")]
+
+    logger.info("Validated %d entries in %d schedules: %d with issues", len(rows), len(starts), len(results))
+    return results
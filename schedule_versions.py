@@ -0,0 +1,176 @@
+import difflib
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+from typing import List, Optional, Sequence, Tuple
+
+from constants import SCHEDULE_VERSION_SNAPSHOT_INTERVAL, SCHEDULE_VERSION_CACHE_SIZE
+from segment import SEGMENT_OPTION_DEFAULTS
+
+SegmentChange = namedtuple('SegmentChange', ['tag', 'old_start', 'old_end', 'new_start', 'new_end',
+                                             'old_segments', 'new_segments'])
+
+# Reconstructed versions are immutable, so they can be cached by database and version id
+_version_cache: 'OrderedDict[Tuple[str, int], Tuple]' = OrderedDict()
+
+
+def _normalize_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _canonical_options(options: Sequence) -> Tuple:
+    """Optional segment fields with trailing defaults trimmed, so plain segments hash as before."""
+    options = [default if value in (None, '') else value
+               for value, default in zip(options, SEGMENT_OPTION_DEFAULTS)]
+    while options and options[-1] == SEGMENT_OPTION_DEFAULTS[len(options) - 1]:
+        options.pop()
+    return tuple(value if value is None or isinstance(value, str) else _normalize_number(value)
+                 for value in options)
+
+
+def canonical_segments(entries: Sequence[Sequence]) -> Tuple[Tuple, ...]:
+    """Normalise (CycleType, StartTemp, EndTemp, Duration, Notes[, options]) tuples for hashing and diffing."""
+    return tuple(
+        (str(entry[0]), _normalize_number(entry[1]), _normalize_number(entry[2]),
+         str(entry[3]), str(entry[4] or '')) + _canonical_options(entry[5:])
+        for entry in entries
+    )
+
+
+def content_hash(segments: Tuple[Tuple, ...]) -> str:
+    """SHA-256 of the canonical segment list."""
+    payload = json.dumps(segments, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_delta(old: Tuple[Tuple, ...], new: Tuple[Tuple, ...]) -> List:
+    """Edit operations turning old into new, as [tag, start, end, segments] lists."""
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            ops.append([tag, i1, i2, [list(segment) for segment in new[j1:j2]]])
+    return ops
+
+
+def apply_delta(base: Tuple[Tuple, ...], ops: List) -> Tuple[Tuple, ...]:
+    """Apply operations from make_delta to the base segment list."""
+    result = []
+    position = 0
+    for _tag, start, end, segments in ops:
+        result.extend(base[position:start])
+        result.extend(tuple(segment) for segment in segments)
+        position = end
+    result.extend(base[position:])
+    return tuple(result)
+
+
+def diff_segments(old: Tuple[Tuple, ...], new: Tuple[Tuple, ...]) -> List[SegmentChange]:
+    """Segment-level differences between two segment lists."""
+    if old == new:
+        return []
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            changes.append(SegmentChange(tag, i1, i2, j1, j2, old[i1:i2], new[j1:j2]))
+    return changes
+
+
+def latest_version(cursor, schedule_id: int) -> Optional[Tuple[int, int, str]]:
+    """(id, version, content_hash) of the newest version of a schedule."""
+    cursor.execute("""
+        SELECT id, version, content_hash FROM schedule_versions
+        WHERE schedule_id = ? ORDER BY version DESC LIMIT 1
+    """, (schedule_id,))
+    return cursor.fetchone()
+
+
+def _database_of(cursor) -> str:
+    # Ids are only unique within one file, and sync writes to other stations' databases
+    return cursor.connection.execute("PRAGMA database_list").fetchone()[2]
+
+
+def load_segments(cursor, version_id: int) -> Optional[Tuple[Tuple, ...]]:
+    """Reconstruct the segments of a version from its nearest snapshot and deltas."""
+    database = _database_of(cursor)
+    if (database, version_id) in _version_cache:
+        _version_cache.move_to_end((database, version_id))
+        return _version_cache[(database, version_id)]
+
+    chain = []
+    current = version_id
+    segments = None
+    while current is not None:
+        if (database, current) in _version_cache:
+            segments = _version_cache[(database, current)]
+            break
+        cursor.execute("SELECT base_version_id, payload FROM schedule_versions WHERE id = ?", (current,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        base_version_id, payload = row
+        if base_version_id is None:
+            segments = tuple(tuple(segment) for segment in json.loads(payload))
+            break
+        chain.append(json.loads(payload))
+        current = base_version_id
+
+    for ops in reversed(chain):
+        segments = apply_delta(segments, ops)
+
+    _cache_segments((database, version_id), segments)
+    return segments
+
+
+def _cache_segments(key: Tuple[str, int], segments: Tuple[Tuple, ...]):
+    _version_cache[key] = segments
+    if len(_version_cache) > SCHEDULE_VERSION_CACHE_SIZE:
+        _version_cache.popitem(last=False)
+
+
+def record_version(cursor, schedule_id: int, entries: Sequence[Sequence]) -> int:
+    """Store the entries as a new immutable version unless they match the latest one.
+
+    Identical revisions are deduplicated: saving unchanged content reuses the
+    latest version, and reverting to an older revision stores an empty delta
+    against it. Other edits are stored as a delta against the previous version,
+    with a full snapshot every SCHEDULE_VERSION_SNAPSHOT_INTERVAL versions so
+    reconstruction stays short.
+
+    Returns:
+        int: id of the version matching the entries
+    """
+    segments = canonical_segments(entries)
+    digest = content_hash(segments)
+    latest = latest_version(cursor, schedule_id)
+    if latest and latest[2] == digest:
+        return latest[0]
+
+    version = latest[1] + 1 if latest else 1
+    cursor.execute("""
+        SELECT id FROM schedule_versions WHERE schedule_id = ? AND content_hash = ?
+        ORDER BY version DESC LIMIT 1
+    """, (schedule_id, digest))
+    identical = cursor.fetchone()
+
+    if identical:
+        base_version_id, payload = identical[0], '[]'
+    elif latest and version % SCHEDULE_VERSION_SNAPSHOT_INTERVAL != 0:
+        base_version_id = latest[0]
+        ops = make_delta(load_segments(cursor, latest[0]), segments)
+        payload = json.dumps(ops, separators=(',', ':'), ensure_ascii=False)
+        snapshot = json.dumps(segments, separators=(',', ':'), ensure_ascii=False)
+        if len(payload) >= len(snapshot):
+            base_version_id, payload = None, snapshot
+    else:
+        base_version_id = None
+        payload = json.dumps(segments, separators=(',', ':'), ensure_ascii=False)
+
+    cursor.execute("""
+        INSERT INTO schedule_versions
+        (schedule_id, version, content_hash, base_version_id, payload, segment_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (schedule_id, version, digest, base_version_id, payload, len(segments)))
+    return cursor.lastrowid
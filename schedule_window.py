@@ -1,10 +1,11 @@
 from PyQt5.QtWidgets import (
     QDialog, QTableWidget, QTableWidgetItem, QVBoxLayout, 
     QHBoxLayout, QPushButton, QInputDialog, QMessageBox,
-    QComboBox, QLineEdit, QHeaderView, QWidget
+    QComboBox, QLineEdit, QHeaderView, QWidget, QUndoStack
 )
-from PyQt5.QtGui import QPalette, QIntValidator
-from PyQt5.QtCore import Qt, QObject
+from PyQt5.QtGui import QPalette, QIntValidator, QKeySequence
+from PyQt5.QtCore import Qt, QObject, QPersistentModelIndex
+from contextlib import contextmanager
 from typing import List, Dict, Optional, Tuple
 
 from styles import (
@@ -12,33 +13,41 @@ from styles import (
     get_table_style, get_combo_style
 )
 from database import DatabaseManager
+from segment import CYCLE_TYPES, Segment, segment_options
+from schedule_validation import format_issue, validate_schedule
+from schedule_preview import SchedulePreview
+from schedule_undo import CellEditCommand, DeleteRowCommand, InsertRowCommand
+from profile_optimizer import optimize_segments, format_optimization
 from constants import (
-    TIME_PATTERN, TEMP_PATTERN, DEFAULT_TIME, 
-    MIN_TEMP, MAX_TEMP, ERROR_MESSAGES, 
+    DEFAULT_TIME, ERROR_MESSAGES, 
     SUCCESS_MESSAGES, validate_time_format, 
-    validate_temperature, DEFAULT_TEMP
+    DEFAULT_TEMP, PROFILE_SHAPES, VALIDATION_MAX_REPORTED_ISSUES,
+    SCHEDULE_UNDO_LIMIT, PROFILE_SIMPLIFY_TOLERANCE
 )
-import re
 import logging
 
 logger = logging.getLogger(__name__)
 
-# More flexible time pattern that allows single digits
-TIME_PATTERN = re.compile(r'^(\d{1,2}):([0-5]?\d):([0-5]?\d)$')
+# Table column of each entry field, for pointing at validation issues
+ENTRY_COLUMNS = {'CycleType': 1, 'StartTemp': 2, 'EndTemp': 3, 'CycleTime': 4, 'Shape': 5, 'Rate': 6,
+                 'Tolerance': 7, 'RepeatCount': 8, 'RepeatSpan': 9, 'Notes': 10}
+EDITABLE_COLUMNS = range(1, 11)  # between the add and delete buttons
 
 class schedule_window(QDialog):
     def __init__(self, parent=None, existing_schedule=None):
         super().__init__(parent)
-        logger.debug(f"Initializing schedule_window - Mode: {'Edit' if existing_schedule else 'Add'}")
+        logger.debug("Initializing schedule_window - Mode: %s", 'Edit' if existing_schedule else 'Add')
         
         # Initialize class attributes
         self.test_mode = False
         self.existing_schedule = existing_schedule
         self.schedule_data = None
+        # Cell changes become undo steps only while recording
+        self.recording = False
         
         # Set window title based on mode
         title = "Edit Schedule" if existing_schedule else "Add Schedule"
-        logger.debug(f"Setting window title to: {title}")
+        logger.debug("Setting window title to: %s", title)
         self.setWindowTitle(title)
         
         # Setup main UI (table, etc)
@@ -50,17 +59,34 @@ class schedule_window(QDialog):
         
         # Initialize with empty row or load existing data
         if existing_schedule:
-            logger.debug(f"Loading existing schedule: {existing_schedule}")
+            logger.debug("Loading existing schedule: %s", existing_schedule)
             self.load_schedule(existing_schedule)
         else:
             logger.debug("Adding empty row for new schedule")
             self.add_row(-1)  # Add first row at position -1 (will become row 0)
+        self.recording = True
 
     def setup_buttons(self):
         """Create button layout based on whether we're editing or adding"""
-        logger.debug(f"Setting up buttons for mode: {'Edit' if self.existing_schedule else 'Add'}")
+        logger.debug("Setting up buttons for mode: %s", 'Edit' if self.existing_schedule else 'Add')
         button_layout = QHBoxLayout()
         
+        undo_btn = QPushButton("Undo")
+        redo_btn = QPushButton("Redo")
+        undo_btn.clicked.connect(self.undo_stack.undo)
+        redo_btn.clicked.connect(self.undo_stack.redo)
+        undo_btn.setEnabled(False)
+        redo_btn.setEnabled(False)
+        self.undo_stack.canUndoChanged.connect(undo_btn.setEnabled)
+        self.undo_stack.canRedoChanged.connect(redo_btn.setEnabled)
+        button_layout.addWidget(undo_btn)
+        button_layout.addWidget(redo_btn)
+        
+        optimize_btn = QPushButton("Optimize...")
+        optimize_btn.clicked.connect(self.optimize_profile)
+        button_layout.addWidget(optimize_btn)
+        button_layout.addStretch()
+        
         if self.existing_schedule:
             logger.debug("Creating Edit mode buttons (Update + Save As)")
             update_btn = QPushButton("Update")
@@ -96,11 +122,23 @@ class schedule_window(QDialog):
         palette.setColor(QPalette.Text, Qt.white)
         self.setPalette(palette)
         
-        self.resize(800, 400)  # Set initial window size
+        self.resize(1000, 650)  # Set initial window size
         
         layout = QVBoxLayout()
         layout.setSpacing(10)  # Add spacing between elements
         
+        # Undo history of cell and row edits, bounded for long sessions
+        self.undo_stack = QUndoStack(self)
+        self.undo_stack.setUndoLimit(SCHEDULE_UNDO_LIMIT)
+        for action, keys in ((self.undo_stack.createUndoAction(self), QKeySequence.Undo),
+                             (self.undo_stack.createRedoAction(self), QKeySequence.Redo)):
+            action.setShortcut(keys)
+            self.addAction(action)
+        
+        # Live preview of the schedule, fed from the table as it is edited
+        self.preview = SchedulePreview(self.row_entry, lambda: self.table.rowCount())
+        layout.addWidget(self.preview)
+        
         # Set up table
         self.table = QTableWidget()
         self.setup_table()
@@ -112,51 +150,70 @@ class schedule_window(QDialog):
     def setup_table(self):
         """Set up the table widget."""
         self.table = QTableWidget()
-        self.table.setColumnCount(7)  # Add, Type, Start, End, Time, Notes, Delete
-        self.table.setHorizontalHeaderLabels(["Add", "Type", "Start Temp", "End Temp", "Time", "Notes", "Delete"])
+        self.table.setColumnCount(12)  # Add, Type, Start, End, Time, Shape, Rate, Tolerance, Repeat, Rows, Notes, Delete
+        self.table.setHorizontalHeaderLabels(["Add", "Type", "Start Temp", "End Temp", "Time", "Shape",
+                                              "Rate °C/min", "Tolerance", "Repeat", "Rows", "Notes", "Delete"])
         
         # Set column widths
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Fixed)  # Add button
-        self.table.horizontalHeader().setSectionResizeMode(6, QHeaderView.Fixed)  # Delete button
+        self.table.horizontalHeader().setSectionResizeMode(11, QHeaderView.Fixed)  # Delete button
         self.table.setColumnWidth(0, 30)  # Add button width
-        self.table.setColumnWidth(6, 30)  # Delete button width
-        
-        # Add initial row only for new schedules
-        if not self.existing_schedule:
-            self.add_row(0)  # Add first row at index 0
+        self.table.setColumnWidth(11, 30)  # Delete button width
+        # The first row of a new schedule is added by __init__
 
     def add_row(self, position):
         """Add a row after the specified position."""
-        logger.debug(f"Adding row after position {position}")
-        self.table.insertRow(position + 1)
         current_row = position + 1
+        values = {4: DEFAULT_TIME}  # Default time
+        
+        # If there's a previous row, set start temp to previous end temp
+        if current_row > 0:
+            prev_end_temp = self.table.cellWidget(current_row - 1, 3)  # End temp column
+            if prev_end_temp and prev_end_temp.text():
+                values[2] = prev_end_temp.text()
+        
+        if not self.recording:
+            self.insert_row(current_row, values)
+            self.update_start_temperatures(current_row + 1)
+            return
+        
+        # One undo step for the row and the start temperatures it changes
+        self.undo_stack.beginMacro(f"Add row {current_row + 1}")
+        self.undo_stack.push(InsertRowCommand(self, current_row, values))
+        self.update_start_temperatures(current_row + 1)
+        self.undo_stack.endMacro()
+
+    def insert_row(self, current_row, values: Dict[int, str]):
+        """Insert a row of cell widgets at current_row with the given cell values."""
+        self.table.insertRow(current_row)
         
         # Create widgets for the new row
         add_btn = QPushButton("+")
-        add_btn.clicked.connect(lambda: self.add_row(current_row))
+        # The buttons look up their row when clicked; rows above may have changed since
+        add_btn.clicked.connect(lambda: self.add_row(self.row_of(add_btn)))
         
         cycle_type = QComboBox()
-        cycle_type.addItems(["", "Ramp", "Soak"])
+        cycle_type.addItems(["", *CYCLE_TYPES])
         cycle_type.setStyleSheet(get_combo_style())
-        cycle_type.currentTextChanged.connect(lambda: self.on_cycle_type_changed(current_row))
         
         start_temp = QLineEdit()
         end_temp = QLineEdit()
         cycle_time = QLineEdit()
+        shape = QComboBox()
+        shape.addItems(PROFILE_SHAPES)
+        shape.setStyleSheet(get_combo_style())
+        rate = QLineEdit()
+        rate.setPlaceholderText("use time")
+        tolerance = QLineEdit()
+        repeat_count = QLineEdit()
+        repeat_count.setValidator(QIntValidator(1, 9999))
+        repeat_span = QLineEdit()
+        repeat_span.setValidator(QIntValidator(1, 9999))
         notes = QLineEdit()
         
-        # Set default time
-        cycle_time.setText("00:00:00")
-        
-        # If there's a previous row, set start temp to previous end temp
-        if current_row > 0:
-            prev_end_temp = self.table.cellWidget(current_row - 1, 3)  # End temp column
-            if prev_end_temp and prev_end_temp.text():
-                start_temp.setText(prev_end_temp.text())
-        
         # Create delete button
         delete_btn = QPushButton("-")
-        delete_btn.clicked.connect(lambda: self.delete_row(current_row))
+        delete_btn.clicked.connect(lambda: self.delete_row(self.row_of(delete_btn)))
         
         # Add widgets to the row
         self.table.setCellWidget(current_row, 0, add_btn)      # Add button first
@@ -164,23 +221,74 @@ class schedule_window(QDialog):
         self.table.setCellWidget(current_row, 2, start_temp)   # Start temp
         self.table.setCellWidget(current_row, 3, end_temp)     # End temp
         self.table.setCellWidget(current_row, 4, cycle_time)   # Time
-        self.table.setCellWidget(current_row, 5, notes)        # Notes
-        self.table.setCellWidget(current_row, 6, delete_btn)   # Delete button last
+        self.table.setCellWidget(current_row, 5, shape)        # Ramp shape
+        self.table.setCellWidget(current_row, 6, rate)         # Ramp rate
+        self.table.setCellWidget(current_row, 7, tolerance)    # Guaranteed soak band
+        self.table.setCellWidget(current_row, 8, repeat_count) # Repeat count
+        self.table.setCellWidget(current_row, 9, repeat_span)  # Rows repeated
+        self.table.setCellWidget(current_row, 10, notes)       # Notes
+        self.table.setCellWidget(current_row, 11, delete_btn)  # Delete button last
         
-        # Update subsequent rows' start temperatures
-        self.update_start_temperatures(current_row + 1)
+        # Persistent indexes follow the row when rows are inserted or removed above it
+        for column in range(self.table.columnCount()):
+            widget = self.table.cellWidget(current_row, column)
+            widget.cell_index = QPersistentModelIndex(self.table.model().index(current_row, column))
+            if column in EDITABLE_COLUMNS:
+                widget.last_value = self.get_cell_value(current_row, column)
+        for widget in (start_temp, end_temp, cycle_time, rate, tolerance, repeat_count, repeat_span, notes):
+            widget.textChanged.connect(self.on_cell_edited)
+        for widget in (cycle_type, shape):
+            widget.currentTextChanged.connect(self.on_cell_edited)
         
-        logger.debug(f"Row added at index {current_row}")
+        with self.not_recording():
+            for column, value in values.items():
+                self.set_cell_value(current_row, column, value)
+        self.update_option_fields(current_row)
+        self.preview.rows_changed()
 
     def delete_row(self, row):
         """Delete a row from the table."""
         if self.table.rowCount() > 1:  # Prevent deleting the last row
-            self.table.removeRow(row)
+            if not self.recording:
+                self.remove_row(row)
+                self.update_start_temperatures(row)
+                return
+            self.undo_stack.beginMacro(f"Delete row {row + 1}")
+            self.undo_stack.push(DeleteRowCommand(self, row))
             # Update start temperatures for remaining rows
             self.update_start_temperatures(row)
+            self.undo_stack.endMacro()
         else:
             QMessageBox.warning(self, "Warning", "Cannot delete the last row")
 
+    def remove_row(self, row):
+        self.table.removeRow(row)
+        self.preview.rows_changed()
+
+    def row_values(self, row) -> Dict[int, str]:
+        """Non-empty cell values of a row, enough to recreate it."""
+        values = {}
+        for column in EDITABLE_COLUMNS:
+            value = self.get_cell_value(row, column)
+            if value:
+                values[column] = value
+        return values
+
+    def apply_cell(self, row, column, value):
+        """Set a cell from an undo or redo without recording it again."""
+        with self.not_recording():
+            self.set_cell_value(row, column, value)
+
+    @contextmanager
+    def not_recording(self):
+        """Make programmatic changes that are not undo steps of their own."""
+        recording = self.recording
+        self.recording = False
+        try:
+            yield
+        finally:
+            self.recording = recording
+
     def update_start_temperatures(self, start_row=0):
         """Update start temperatures based on previous row's end temperature."""
         for row in range(start_row, self.table.rowCount()):
@@ -190,11 +298,56 @@ class schedule_window(QDialog):
                 if prev_end_temp and prev_end_temp.text() and current_start_temp:
                     current_start_temp.setText(prev_end_temp.text())
 
+    def row_of(self, widget) -> int:
+        """Current row of a cell widget, or -1 if it is not in the table yet."""
+        index = getattr(widget, 'cell_index', None)
+        return index.row() if index is not None and index.isValid() else -1
+
+    def on_cell_edited(self):
+        """Record a cell change for undo and queue a preview update for its row."""
+        widget = self.sender()
+        row = self.row_of(widget)
+        if row < 0:
+            return  # Not placed in the table yet
+        column = widget.cell_index.column()
+        old, new = widget.last_value, self.get_cell_value(row, column)
+        widget.last_value = new
+        if column == 1:
+            self.update_option_fields(row)
+        self.preview.row_changed(row)
+        if not self.recording or new == old:
+            return
+        
+        if column == 1:
+            # The type change and the cells it fills in undo together
+            self.undo_stack.beginMacro(f"Change row {row + 1} to {new or 'no type'}")
+            self.undo_stack.push(CellEditCommand(self, row, column, old, new))
+            self.on_cycle_type_changed(row)
+            self.undo_stack.endMacro()
+        else:
+            self.undo_stack.push(CellEditCommand(self, row, column, old, new))
+
+    def row_entry(self, row) -> Dict:
+        """A row's current values as an entry dict, as far as they parse."""
+        cycle_type = self.table.cellWidget(row, 1).currentText()
+        return {
+            'CycleType': cycle_type,
+            'StartTemp': self.parse_number(self.table.cellWidget(row, 2).text(), float),
+            'EndTemp': self.parse_number(self.table.cellWidget(row, 3).text(), float),
+            'CycleTime': self.table.cellWidget(row, 4).text(),
+            'Notes': self.table.cellWidget(row, 10).text(),
+            **self.collect_option_values(row, cycle_type)
+        }
+
     def load_data(self):
         """Load existing schedule data into the table."""
         try:
             data = DatabaseManager.load_schedule(self.existing_schedule)
             if data:
+                # Loading is not an undo step
+                self.recording = False
+                self.undo_stack.clear()
+                
                 # Clear existing rows
                 self.table.setRowCount(0)
                 
@@ -206,41 +359,131 @@ class schedule_window(QDialog):
                     last_row = current_row
                     
                     # Set the values
-                    self.table.cellWidget(current_row, 1).setCurrentText(entry['CycleType'])
-                    self.table.cellWidget(current_row, 2).setText(str(entry['StartTemp']))
-                    self.table.cellWidget(current_row, 3).setText(str(entry['EndTemp']))
-                    self.table.cellWidget(current_row, 4).setText(entry['CycleTime'])
-                    self.table.cellWidget(current_row, 5).setText(entry.get('Notes', ''))
+                    self.set_segment_values(current_row, entry)
                 
+                self.recording = True
                 return True
             return False
         except Exception as e:
-            logger.error(f"Error loading data: {e}", exc_info=True)
+            logger.error("Error loading data: %s", e, exc_info=True)
             raise
 
     def on_cycle_type_changed(self, row):
         """Handle cycle type changes."""
         try:
             cycle_type = self.table.cellWidget(row, 1).currentText()  # Column 1 is cycle type
-            logger.debug(f"Cycle type changed in row {row} to: {cycle_type}")
+            logger.debug("Cycle type changed in row %s to: %s", row, cycle_type)
             
-            if cycle_type == "Soak":
+            if cycle_type in ["Soak", "Hold"]:
                 # Get start temp value
                 start_temp_widget = self.table.cellWidget(row, 2)  # Column 2 is start temp
                 if start_temp_widget and start_temp_widget.text():
                     # Set end temp to match start temp
                     end_temp_widget = self.table.cellWidget(row, 3)  # Column 3 is end temp
                     end_temp_widget.setText(start_temp_widget.text())
-                    logger.debug(f"Set end temp to match start temp: {start_temp_widget.text()}")
+                    logger.debug("Set end temp to match start temp: %s", start_temp_widget.text())
+            
+            elif cycle_type == "Repeat":
+                # A repeat block takes no time of its own and ends where its last row ends
+                start_temp_widget = self.table.cellWidget(row, 2)
+                self.table.cellWidget(row, 3).setText(start_temp_widget.text())
+                self.table.cellWidget(row, 4).setText("00:00:00")
             
             # Set default time if needed
             cycle_time = self.table.cellWidget(row, 4)  # Column 4 is time
-            if cycle_type in ["Ramp", "Soak"] and (not cycle_time.text() or cycle_time.text() == ""):
+            if cycle_type in CYCLE_TYPES and (not cycle_time.text() or cycle_time.text() == ""):
                 cycle_time.setText("00:00:00")
-                logger.debug(f"Set initial time for row {row}")
+                logger.debug("Set initial time for row %s", row)
             
         except Exception as e:
-            logger.error(f"Error in on_cycle_type_changed: {e}", exc_info=True)
+            logger.error("Error in on_cycle_type_changed: %s", e, exc_info=True)
+
+    def update_option_fields(self, row):
+        """Enable only the optional fields that apply to the row's cycle type."""
+        cycle_type = self.table.cellWidget(row, 1).currentText()
+        self.table.cellWidget(row, 5).setEnabled(cycle_type == "Ramp")     # Shape
+        self.table.cellWidget(row, 6).setEnabled(cycle_type == "Ramp")     # Rate
+        self.table.cellWidget(row, 7).setEnabled(cycle_type == "Hold")     # Tolerance
+        self.table.cellWidget(row, 8).setEnabled(cycle_type == "Repeat")   # Repeat count
+        self.table.cellWidget(row, 9).setEnabled(cycle_type == "Repeat")   # Rows repeated
+
+    def set_segment_values(self, row, segment: Segment):
+        """Fill the widgets of a row from a stored segment."""
+        def text(value):
+            return '' if value is None else f"{value:g}"
+
+        self.table.cellWidget(row, 1).setCurrentText(segment.cycle_type)
+        self.table.cellWidget(row, 2).setText(text(segment.start_temp))
+        self.table.cellWidget(row, 3).setText(text(segment.end_temp))
+        self.table.cellWidget(row, 4).setText(segment.cycle_time)
+        self.table.cellWidget(row, 5).setCurrentText(segment.shape)
+        self.table.cellWidget(row, 6).setText(text(segment.rate))
+        self.table.cellWidget(row, 7).setText(text(segment.tolerance))
+        self.table.cellWidget(row, 8).setText(text(segment.repeat_count))
+        self.table.cellWidget(row, 9).setText(text(segment.repeat_span))
+        self.table.cellWidget(row, 10).setText(segment.notes)
+
+    @staticmethod
+    def segment_values(segment: Segment) -> Dict[int, str]:
+        """Non-empty cell values of a row showing a segment, as row_values gives them."""
+        def text(value):
+            return '' if value is None else f"{value:g}"
+
+        values = {1: segment.cycle_type, 2: text(segment.start_temp), 3: text(segment.end_temp),
+                  4: segment.cycle_time, 5: segment.shape, 6: text(segment.rate), 7: text(segment.tolerance),
+                  8: text(segment.repeat_count), 9: text(segment.repeat_span), 10: segment.notes}
+        return {column: value for column, value in values.items() if value}
+
+    def optimize_profile(self):
+        """Merge and simplify the table's segments within an error the user picks, as one undo step."""
+        try:
+            segments = [Segment.from_entry(self.row_entry(row)) for row in range(self.table.rowCount())]
+            max_error, ok = QInputDialog.getDouble(self, "Optimize Profile", "Largest setpoint change (°C):",
+                                                   PROFILE_SIMPLIFY_TOLERANCE, 0, 100, 2)
+            if not ok:
+                return
+            result = optimize_segments(segments, max_error)
+        except (ValueError, TypeError, KeyError) as e:
+            QMessageBox.warning(self, "Optimize Profile", f"Fix the schedule before optimizing it: {e}")
+            return
+        report = format_optimization(result)
+        if result.rows_after >= result.rows_before and result.slots_after >= result.slots_before:
+            QMessageBox.information(self, "Optimize Profile", f"Nothing to merge.\n\n{report}")
+            return
+        if QMessageBox.question(self, "Optimize Profile", f"{report}\n\nReplace the rows?") != QMessageBox.Yes:
+            return
+
+        old_rows = self.table.rowCount()
+        self.undo_stack.beginMacro("Optimize profile")
+        for segment in result.segments:
+            self.undo_stack.push(InsertRowCommand(self, self.table.rowCount(), self.segment_values(segment)))
+        for _ in range(old_rows):
+            self.undo_stack.push(DeleteRowCommand(self, 0))
+        self.undo_stack.endMacro()
+
+    @staticmethod
+    def parse_number(text: str, convert):
+        """Convert a cell's text, leaving unparseable text for the validator to report."""
+        text = text.strip()
+        if not text:
+            return None
+        try:
+            return convert(text)
+        except ValueError:
+            return text
+
+    def collect_option_values(self, row, cycle_type: str) -> Dict:
+        """Optional fields of a row as entry dict keys."""
+        def number(column, convert):
+            return self.parse_number(self.table.cellWidget(row, column).text(), convert)
+
+        return {
+            'Shape': self.table.cellWidget(row, 5).currentText() if cycle_type == "Ramp" else 'linear',
+            'Rate': number(6, float) if cycle_type == "Ramp" else None,
+            'Tolerance': number(7, float) if cycle_type == "Hold" else None,
+            'RepeatCount': number(8, int) if cycle_type == "Repeat" else None,
+            'RepeatSpan': number(9, int) if cycle_type == "Repeat" else None
+        }
 
     def update_schedule(self):
         """Update the existing schedule."""
@@ -254,12 +497,11 @@ class schedule_window(QDialog):
                         entry['StartTemp'],
                         entry['EndTemp'],
                         entry['CycleTime'],
-                        entry.get('Notes', '')
+                        entry.get('Notes', ''),
+                        *segment_options(entry)
                     ) for entry in entries
                 ]
                 
-                logger.debug(f"Formatted entries for database: {formatted_entries}")
-                
                 if DatabaseManager.save_schedule(self.existing_schedule, formatted_entries):
                     QMessageBox.information(self, "Success", SUCCESS_MESSAGES['update_success'])
                     if hasattr(self.parent(), 'update_schedule_menu'):
@@ -268,104 +510,32 @@ class schedule_window(QDialog):
                 else:
                     QMessageBox.critical(self, "Error", ERROR_MESSAGES['save_failed'])
         except Exception as e:
-            logger.error(f"Error updating schedule: {e}", exc_info=True)
+            logger.error("Error updating schedule: %s", e, exc_info=True)
             QMessageBox.critical(self, "Error", f"Failed to update schedule: {str(e)}")
 
     def validate_time_format(self, time_str: str) -> bool:
         """Validate time format and values."""
-        try:
-            logger.debug(f"Validating time format: '{time_str}'")
-            
-            if not time_str:
-                logger.debug("Empty time string")
-                return False
-            
-            # Check pattern match
-            match = TIME_PATTERN.match(time_str)
-            if not match:
-                logger.debug(f"Time string '{time_str}' doesn't match pattern")
-                return False
-            
-            # Get the matched groups
-            hours, minutes, seconds = match.groups()
-            logger.debug(f"Matched groups - H:{hours} M:{minutes} S:{seconds}")
-            
-            # Convert to integers
-            hours = int(hours)
-            minutes = int(minutes)
-            seconds = int(seconds)
-            logger.debug(f"Converted values - H:{hours} M:{minutes} S:{seconds}")
-            
-            # Check ranges
-            if not (0 <= hours <= 99 and 0 <= minutes <= 59 and 0 <= seconds <= 59):
-                logger.debug(f"Time values out of range - H:{hours} M:{minutes} S:{seconds}")
-                return False
-            
-            logger.debug("Time format validation successful")
-            return True
-        except Exception as e:
-            logger.debug(f"Time validation error: {str(e)}")
-            return False
+        return bool(time_str) and validate_time_format(time_str)
 
     def validate_and_collect_entries(self, show_warnings: bool = True) -> Optional[List[Dict]]:
-        """Validate and collect all entries from the table."""
-        entries = []
-        for row in range(self.table.rowCount()):
-            try:
-                # Get widgets from correct columns (shifted right by 1 due to add button)
-                cycle_type = self.table.cellWidget(row, 1)  # Was 0, now 1
-                start_temp = self.table.cellWidget(row, 2)  # Was 1, now 2
-                end_temp = self.table.cellWidget(row, 3)    # Was 2, now 3
-                cycle_time = self.table.cellWidget(row, 4)  # Was 3, now 4
-                notes = self.table.cellWidget(row, 5)       # Was 4, now 5
-                
-                # Validate cycle type
-                if not cycle_type.currentText():
-                    if show_warnings:
-                        QMessageBox.warning(self, "Validation Error", f"Row {row + 1}: Cycle type is required")
-                    return None
-                    
-                # Validate temperatures
-                try:
-                    start_temp_val = float(start_temp.text())
-                    end_temp_val = float(end_temp.text())
-                except ValueError:
-                    if show_warnings:
-                        QMessageBox.warning(self, "Validation Error", 
-                                          f"Row {row + 1}: Start and End temperatures must be numbers")
-                    return None
-                    
-                # Validate time format and non-zero duration
-                time_text = cycle_time.text()
-                if not self.validate_time_format(time_text):
-                    if show_warnings:
-                        QMessageBox.warning(self, "Validation Error", 
-                                          f"Row {row + 1}: Time must be in format HH:MM:SS")
-                    return None
-                
-                # Check for zero duration
-                if time_text == "00:00:00":
-                    if show_warnings:
-                        QMessageBox.warning(self, "Validation Error", 
-                                          f"Row {row + 1}: Duration cannot be zero")
-                    return None
-                    
-                # Collect entry
-                entry = {
-                    'CycleType': cycle_type.currentText(),
-                    'StartTemp': start_temp_val,
-                    'EndTemp': end_temp_val,
-                    'CycleTime': time_text,
-                    'Notes': notes.text()
-                }
-                entries.append(entry)
-                
-            except Exception as e:
-                logger.error(f"Row {row}: Error - {str(e)}")
-                if show_warnings:
-                    QMessageBox.warning(self, "Error", f"Error processing row {row + 1}: {str(e)}")
-                return None
-                
+        """Validate and collect all entries from the table.
+
+        All rows are checked in one pass by schedule_validation; the warning
+        lists every problem found and the first offending cell gets focus.
+        """
+        entries = [self.row_entry(row) for row in range(self.table.rowCount())]
+
+        issues = validate_schedule(entries)
+        if issues:
+            logger.debug("Schedule has %d validation issues", len(issues))
+            if show_warnings:
+                first = issues[0]
+                self.table.cellWidget(first.row, ENTRY_COLUMNS[first.column]).setFocus()
+                lines = [format_issue(issue) for issue in issues[:VALIDATION_MAX_REPORTED_ISSUES]]
+                if len(issues) > VALIDATION_MAX_REPORTED_ISSUES:
+                    lines.append(f"...and {len(issues) - VALIDATION_MAX_REPORTED_ISSUES} more")
+                QMessageBox.warning(self, "Validation Error", "\n".join(lines))
+            return None
         return entries
 
     def save_as_schedule(self):
@@ -380,7 +550,8 @@ class schedule_window(QDialog):
                         entry['StartTemp'],
                         entry['EndTemp'],
                         entry['CycleTime'],
-                        entry.get('Notes', '')
+                        entry.get('Notes', ''),
+                        *segment_options(entry)
                     ) for entry in entries]
                     
                     if DatabaseManager.save_schedule(name, formatted_entries):
@@ -391,7 +562,7 @@ class schedule_window(QDialog):
                     else:
                         QMessageBox.critical(self, "Error", ERROR_MESSAGES['save_failed'])
         except Exception as e:
-            print(f"Error saving schedule: {str(e)}")  # Debug print
+            logger.error("Error saving schedule: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to save schedule: {str(e)}")
 
     def save_schedule(self):
@@ -407,7 +578,8 @@ class schedule_window(QDialog):
                         entry['StartTemp'],
                         entry['EndTemp'],
                         entry['CycleTime'],
-                        entry.get('Notes', '')
+                        entry.get('Notes', ''),
+                        *segment_options(entry)
                     ) for entry in entries]
                     
                     if DatabaseManager.save_schedule(name, formatted_entries):
@@ -418,21 +590,28 @@ class schedule_window(QDialog):
                     else:
                         QMessageBox.critical(self, "Error", ERROR_MESSAGES['save_failed'])
         except Exception as e:
-            logger.error(f"Error saving schedule: {e}")
+            logger.error("Error saving schedule: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to save schedule: {str(e)}")
 
     def get_cell_value(self, row, col):
         """Get cell value (works in both test and normal mode)."""
         if self.test_mode:
             return self.test_cells.get((row, col), '')
-        return self.table.cellWidget(row, col).text()
+        widget = self.table.cellWidget(row, col)
+        if isinstance(widget, QComboBox):
+            return widget.currentText()
+        return widget.text()
 
     def set_cell_value(self, row, col, value):
         """Set cell value (works in both test and normal mode)."""
         if self.test_mode:
             self.test_cells[(row, col)] = str(value)
+            return
+        widget = self.table.cellWidget(row, col)
+        if isinstance(widget, QComboBox):
+            widget.setCurrentText(str(value))
         else:
-            self.table.cellWidget(row, col).setText(str(value))
+            widget.setText(str(value))
 
     def auto_populate_first_row(self, cycle_type: str):
         """Auto-populate the first row when cycle type is selected."""
@@ -458,47 +637,40 @@ class schedule_window(QDialog):
                         if not cycle_time.text().strip():
                             cycle_time.setText(DEFAULT_TIME)
         except Exception as e:
-            logger.error(f"Error in auto_populate_first_row: {e}")
+            logger.error("Error in auto_populate_first_row: %s", e)
 
     def load_schedule(self, schedule_name):
         """Load an existing schedule into the table."""
-        logger.debug(f"Loading schedule: {schedule_name}")
+        logger.debug("Loading schedule: %s", schedule_name)
         try:
             # Load data from database
             data = DatabaseManager.load_schedule(schedule_name)
-            logger.debug(f"Loaded data from database: {data}")
             
             if not data:
-                logger.warning(f"No data found for schedule: {schedule_name}")
+                logger.warning("No data found for schedule: %s", schedule_name)
                 return False
             
+            # Loading is not an undo step
+            self.recording = False
+            self.undo_stack.clear()
+            
             # Clear existing rows
             self.table.setRowCount(0)
             
             # Add rows for each cycle
             last_row = -1  # Start with -1 so first add_row will be at position 0
             for row_data in data:
-                logger.debug(f"Processing row: {row_data}")
                 self.add_row(last_row)  # Pass the position
                 current_row = last_row + 1
                 last_row = current_row
                 
                 # Set data in the new row
-                cycle_type = self.table.cellWidget(current_row, 1)
-                start_temp = self.table.cellWidget(current_row, 2)
-                end_temp = self.table.cellWidget(current_row, 3)
-                cycle_time = self.table.cellWidget(current_row, 4)
-                notes = self.table.cellWidget(current_row, 5)
-                
-                cycle_type.setCurrentText(row_data['CycleType'])
-                start_temp.setText(str(row_data['StartTemp']))
-                end_temp.setText(str(row_data['EndTemp']))
-                cycle_time.setText(row_data['CycleTime'])
-                notes.setText(row_data.get('Notes', ''))
+                self.set_segment_values(current_row, row_data)
                 
+            self.recording = True
             return True
         except Exception as e:
-            logger.error(f"Error loading schedule: {e}", exc_info=True)
+            logger.error("Error loading schedule: %s", e, exc_info=True)
             raise
 
     def exec_(self):
@@ -0,0 +1,110 @@
+import sys
+from typing import Dict, Optional, Sequence, Tuple
+
+CYCLE_TYPES = ('Ramp', 'Soak', 'Hold', 'Repeat')
+
+# Optional per-segment fields stored after (CycleType, StartTemp, EndTemp, Duration, Notes):
+# Shape of a ramp, Rate in °C/min (overrides the duration), Tolerance of a guaranteed
+# soak in °C, and RepeatCount/RepeatSpan of a Repeat row
+SEGMENT_OPTION_KEYS = ('Shape', 'Rate', 'Tolerance', 'RepeatCount', 'RepeatSpan')
+SEGMENT_OPTION_DEFAULTS = ('linear', None, None, None, None)
+
+
+def time_to_seconds(time_str: str) -> int:
+    """Convert HH:MM:SS to seconds."""
+    h, m, s = map(int, time_str.split(':'))
+    return h * 3600 + m * 60 + s
+
+
+def seconds_to_time(seconds: int) -> str:
+    """Convert seconds to HH:MM:SS."""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def time_to_minutes(time_str: str) -> float:
+    """Convert HH:MM:SS to minutes."""
+    return time_to_seconds(time_str) / 60
+
+
+def minutes_to_time(minutes: float) -> str:
+    """Convert minutes to HH:MM:SS, rounding to the nearest second."""
+    return seconds_to_time(int(round(minutes * 60)))
+
+
+def segment_options(cycle: Dict) -> Tuple:
+    """The optional fields of a schedule entry dict, with defaults for missing ones."""
+    return tuple(default if cycle.get(key) in (None, '') else cycle[key]
+                 for key, default in zip(SEGMENT_OPTION_KEYS, SEGMENT_OPTION_DEFAULTS))
+
+
+def pad_entry(entry: Sequence) -> Tuple:
+    """Extend a (CycleType, StartTemp, EndTemp, Duration, Notes) tuple with default options."""
+    entry = tuple(entry)
+    return entry + SEGMENT_OPTION_DEFAULTS[len(entry) - 5:]
+
+
+def _optional(value, convert):
+    return None if value is None or value == '' else convert(value)
+
+
+class Segment:
+    """One row of a stored schedule.
+
+    This is the form schedules take from the database to the profile and
+    the furnace commands. Cycle types and shapes are interned, so every
+    'Ramp' in memory is the same string object. Durations are whole
+    seconds and temperatures are floats; Repeat rows may have no
+    temperatures.
+    """
+
+    __slots__ = ('cycle_type', 'start_temp', 'end_temp', 'seconds', 'notes',
+                 'shape', 'rate', 'tolerance', 'repeat_count', 'repeat_span')
+
+    def __init__(self, cycle_type: str, start_temp, end_temp, seconds: int, notes: str = '',
+                 shape: Optional[str] = None, rate=None, tolerance=None, repeat_count=None, repeat_span=None):
+        self.cycle_type = sys.intern(cycle_type)
+        self.start_temp = _optional(start_temp, float)
+        self.end_temp = _optional(end_temp, float)
+        self.seconds = int(seconds)
+        self.notes = notes or ''
+        self.shape = sys.intern(shape or SEGMENT_OPTION_DEFAULTS[0])
+        self.rate = _optional(rate, float)
+        self.tolerance = _optional(tolerance, float)
+        self.repeat_count = _optional(repeat_count, int)
+        self.repeat_span = _optional(repeat_span, int)
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'Segment':
+        """From a stored (CycleType, StartTemp, EndTemp, Duration, Notes[, options]) tuple."""
+        cycle_type, start_temp, end_temp, duration, notes, *options = pad_entry(row)
+        return cls(cycle_type, start_temp, end_temp, time_to_seconds(duration), notes, *options)
+
+    @classmethod
+    def from_entry(cls, entry: Dict) -> 'Segment':
+        """From an entry dict as the schedule editor collects it.
+
+        Raises:
+            ValueError: if a field does not parse
+        """
+        return cls(entry['CycleType'], entry['StartTemp'], entry['EndTemp'],
+                   time_to_seconds(entry['CycleTime']), entry.get('Notes'), *segment_options(entry))
+
+    @property
+    def minutes(self) -> float:
+        return self.seconds / 60
+
+    @property
+    def cycle_time(self) -> str:
+        """Duration as HH:MM:SS."""
+        return seconds_to_time(self.seconds)
+
+    def as_row(self) -> Tuple:
+        """The tuple DatabaseManager.save_schedule stores."""
+        return (self.cycle_type, self.start_temp, self.end_temp, self.cycle_time, self.notes,
+                self.shape, self.rate, self.tolerance, self.repeat_count, self.repeat_span)
+
+    def __eq__(self, other):
+        return isinstance(other, Segment) and self.as_row() == other.as_row()
+
+    def __repr__(self):
+        return f"Segment{self.as_row()!r}"
@@ -1,5 +1,8 @@
 from enum import Enum
 from PyQt5.QtCore import QSettings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Theme(Enum):
     LIGHT_INDUSTRIAL = {
@@ -50,7 +53,7 @@ class ThemeManager:
     def initialize(cls):
         # Load saved theme or use default
         saved_theme = cls._settings.value('theme', 'Light Industrial')
-        print(f"Loading saved theme: {saved_theme}")
+        logger.debug("Loading saved theme: %s", saved_theme)
         
         # Reset settings if we detect old theme format
         needs_reset = False
@@ -65,7 +68,7 @@ class ThemeManager:
                 break
         
         if needs_reset:
-            print("Updating theme format...")
+            logger.info("Updating theme format...")
             cls._settings.setValue('theme', 'Light Industrial')
             saved_theme = 'Light Industrial'
         
@@ -73,12 +76,12 @@ class ThemeManager:
         for theme in Theme:
             if theme.value['name'] == saved_theme:
                 cls._current_theme = theme.value
-                print(f"Theme found and set: {theme.value['name']}")
+                logger.debug("Theme found and set: %s", theme.value['name'])
                 break
                 
         if cls._current_theme is None:
             cls._current_theme = Theme.LIGHT_INDUSTRIAL.value
-            print("Using default theme")
+            logger.debug("Using default theme")
 
     @classmethod
     def get_current_theme(cls):
@@ -91,7 +94,7 @@ class ThemeManager:
         cls._current_theme = theme.value
         cls._settings.setValue('theme', theme.value['name'])
         cls._settings.sync()
-        print(f"Theme saved: {theme.value['name']}")
+        logger.info("Theme saved: %s", theme.value['name'])
 
 def get_theme_dependent_styles():
     theme = ThemeManager.get_current_theme()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """DatabaseManager on a fresh database in a temporary directory."""
+    from database import DatabaseManager
+    monkeypatch.setattr(DatabaseManager, 'APP_DATA', str(tmp_path))
+    monkeypatch.setattr(DatabaseManager, 'DB_NAME', str(tmp_path / 'SmartFurnace.db'))
+    DatabaseManager.initialize_database()
+    yield DatabaseManager
+    if DatabaseManager._writer is not None:
+        DatabaseManager._writer.close()
+        DatabaseManager._writer = None
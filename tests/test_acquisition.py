@@ -0,0 +1,97 @@
+import struct
+
+import numpy as np
+import pytest
+
+from acquisition import (Acquisition, Calibration, ChannelFilter, ModbusDriver, ModbusTcpDriver,
+                         ReplayDriver, SampleRing, SimulatedDriver, crc16, driver_from_spec)
+from cycle_clock import ManualClock
+
+
+def test_crc16_matches_the_modbus_reference():
+    # Read one input register from unit 1; sent on the wire as 31 CA
+    assert crc16(bytes.fromhex('010400000001')) == 0xCA31
+
+
+def test_modbus_decode_scales_and_flags_broken_thermocouples():
+    driver = ModbusDriver(channels=3)
+    pdu = bytes([4, 6]) + struct.pack('>hhh', 6005, -32768, -150)
+    values = driver.decode(pdu)
+    assert values[0] == pytest.approx(600.5) and np.isnan(values[1]) and values[2] == pytest.approx(-15.0)
+    with pytest.raises(ValueError):
+        driver.decode(bytes([0x84, 2]))
+    with pytest.raises(ValueError):
+        driver.decode(bytes([4, 2, 0, 1]))
+
+
+def test_calibration_is_per_channel(tmp_path):
+    path = tmp_path / 'calibration.json'
+    path.write_text('{"gain": [1.0, 2.0], "offset": [0.5, -1.0]}')
+    calibration = Calibration.load(str(path), 2)
+    np.testing.assert_allclose(calibration.apply(np.array([[10.0, 10.0]])), [[10.5, 19.0]])
+    with pytest.raises(ValueError):
+        Calibration(3, gain=[1.0, 1.0])
+
+
+def test_filter_rejects_spikes_and_bridges_gaps():
+    channel_filter = ChannelFilter(1, window=5, outlier_limit=10.0)
+    readings = np.array([[100.0], [101.0], [600.0], [np.nan], [102.0]])
+    filtered = channel_filter.process(readings)
+    assert np.isfinite(filtered).all()
+    assert filtered.max() < 103.0
+
+    # Blocks continue where the previous one stopped
+    whole = ChannelFilter(1, window=5, outlier_limit=10.0).process(readings)
+    parts = ChannelFilter(1, window=5, outlier_limit=10.0)
+    np.testing.assert_allclose(np.concatenate([parts.process(readings[:2]), parts.process(readings[2:])]), whole)
+
+
+def test_sample_ring_wraps_and_finds_samples_by_time():
+    ring = SampleRing(4, 1)
+    assert ring.latest() is None
+    ring.extend(np.arange(6.0), np.arange(6.0)[:, np.newaxis] * 10)
+    seq, times, _ = ring.since(0)
+    assert seq == 6 and list(times) == [2.0, 3.0, 4.0, 5.0]
+    assert list(ring.since(5)[1]) == [5.0]
+    assert ring.at(3.5)[0] == 3.0
+    assert ring.at(1.0) is None  # already overwritten
+    assert ring.latest()[1][0] == 50.0
+
+
+def test_acquisition_reports_the_control_channels_until_stale():
+    clock = ManualClock()
+    driver = ReplayDriver(np.array([[100.0, 110.0, np.nan]]))
+    acquisition = Acquisition(driver, rate_hz=10, clock=clock, control_channels=[0, 1, 2],
+                              channel_filter=ChannelFilter(3, window=1))
+    assert acquisition.temperature() is None
+    acquisition.poll()
+    assert acquisition.temperature() == pytest.approx(105.0)
+    clock.advance(5.0)
+    assert acquisition.temperature() is None
+    assert acquisition.reads == 1
+
+
+def test_acquisition_survives_a_failing_driver():
+    class Broken(ReplayDriver):
+        def read(self):
+            raise OSError("unplugged")
+
+    acquisition = Acquisition(Broken(np.zeros((1, 2))), clock=ManualClock())
+    assert np.isnan(acquisition.poll()).all()
+    assert acquisition.errors == 1
+
+
+def test_simulated_driver_follows_its_source():
+    driver = SimulatedDriver(lambda: 500.0, channels=2, tau=1e-9, noise=0.0, spike_probability=0.0, seed=1)
+    driver.read()
+    values = driver.read()
+    np.testing.assert_allclose(values, 500.0 + driver.offsets)
+
+
+def test_driver_from_spec():
+    driver = driver_from_spec('modbus-tcp:10.0.0.5:1502?unit=3&channels=4&scale=1')
+    assert isinstance(driver, ModbusTcpDriver)
+    assert (driver.host, driver.port, driver.unit, driver.channels, driver.scale) == ('10.0.0.5', 1502, 3, 4, 1.0)
+    assert driver_from_spec('simulated:2').channels == 2
+    with pytest.raises(ValueError):
+        driver_from_spec('carrier-pigeon:home')
@@ -0,0 +1,67 @@
+from alarms import (ALARM_RAISED, ALARM_CLEARED, AlarmEngine, DeviationRule, RampRateRule,
+                    SensorStaleRule, SoakDeadlineRule, soak_deadline_rules)
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+
+def test_deviation_must_persist_before_raising():
+    rule = DeviationRule(limit=10, hold_seconds=30)
+    assert rule.evaluate(0, 100, 120) is None
+    assert rule.evaluate(29, 100, 120) is None
+    assert rule.evaluate(30, 100, 120) == (ALARM_RAISED, 20)
+    assert rule.evaluate(31, 100, 105) == (ALARM_CLEARED, 5)
+
+
+def test_ramp_rate_is_measured_over_a_window():
+    rule = RampRateRule(max_rate=5, window_seconds=60)
+    assert rule.evaluate(0, 0, 100) is None
+    assert rule.evaluate(30, 0, 200) is None  # inside the window
+    assert rule.evaluate(60, 0, 110) == (ALARM_RAISED, 10)
+
+
+def test_stale_sensor():
+    rule = SensorStaleRule(max_age_seconds=5)
+    rule.evaluate(0, 0, 20.0)
+    assert rule.evaluate(5, 0, None) is None
+    assert rule.evaluate(6, 0, float('nan')) == (ALARM_RAISED, 6)
+    assert rule.evaluate(7, 0, 20.0) == (ALARM_CLEARED, 0.0)
+
+
+def test_soak_deadline_latches_once_reached():
+    rule = SoakDeadlineRule(500, 600, tolerance=5)
+    assert rule.evaluate(300, 500, 497) is None
+    assert rule.evaluate(900, 500, 300) is None
+
+
+def test_soak_deadline_ignores_passing_the_target_before_the_soak():
+    profile = ScheduleProfile([Segment('Ramp', 20, 800, 3600), Segment('Soak', 800, 800, 3600),
+                               Segment('Ramp', 800, 200, 3600), Segment('Soak', 200, 200, 3600)])
+    rule = soak_deadline_rules(profile, grace_minutes=15, tolerance=5)[-1]
+    assert rule.start_seconds == 3 * 3600
+    # Heating through 200 °C about eleven minutes in
+    assert rule.evaluate(660, 200, 201) is None
+    assert not rule.reached
+    # Stuck at 400 °C past the deadline of the 200 °C soak
+    assert rule.evaluate(11700, 200, 400) == (ALARM_RAISED, 400)
+
+
+def test_soak_deadlines_follow_profile_time():
+    profile = ScheduleProfile([Segment('Hold', 20, 500, 600, tolerance=5),
+                               Segment('Soak', 500, 500, 3600)])
+    engine = AlarmEngine(persist=False)
+    engine.set_rules('f1', soak_deadline_rules(profile, grace_minutes=10, tolerance=5))
+    # An hour into the cycle, but a Hold kept the profile at its start
+    assert engine.evaluate('f1', 3600, 500, 100, profile_seconds=0) == []
+    events = engine.evaluate('f1', 4800, 500, 100, profile_seconds=20 * 60)
+    assert [(event.kind, event.state, event.elapsed_seconds) for event in events] == [
+        ('soak_deadline', ALARM_RAISED, 4800)]
+
+
+def test_events_are_saved_in_the_background(database):
+    engine = AlarmEngine()
+    engine.set_rules('f1', [DeviationRule(limit=10, hold_seconds=0)], run_id=7)
+    engine.evaluate('f1', 0, 100, 150)
+    engine.flush()
+    saved = database.load_alarm_events(run_id=7)
+    assert [(event['Rule'], event['State']) for event in saved] == [(engine.rules['f1'][0].name, ALARM_RAISED)]
+    engine.close()
@@ -0,0 +1,55 @@
+import pytest
+
+from controller import PIDController, ControlLoop, SimulatedFurnace, relay_autotune
+from schedule_profile import ScheduleProfile
+from segment import Segment
+from thermal_model import ThermalModel
+
+
+def test_output_is_clamped():
+    controller = PIDController(10.0, 0.1)
+    assert controller.update(1000, 0) == controller.output_max
+    assert controller.update(-1000, 0) == controller.output_min
+
+
+def test_proportional_only_keeps_no_bias_after_saturation():
+    controller = PIDController(1.0)
+    for _ in range(100):
+        controller.update(1000, 0)
+    assert controller.integral == 0
+    assert controller.update(100, 50) == pytest.approx(50)
+
+
+def test_integral_does_not_wind_up_while_saturated():
+    controller = PIDController(1.0, 0.05)
+    for _ in range(10000):
+        controller.update(1000, 0)
+    # Back-calculation holds the integral near the limit instead of growing for every tick
+    assert controller.integral < 2 * controller.output_max
+    # Once the error reverses, the output leaves saturation within a few ticks
+    outputs = [controller.update(0, 1000) for _ in range(5)]
+    assert outputs[-1] == controller.output_min
+
+
+def test_bumpless_reset():
+    controller = PIDController(1.0, 0.1)
+    controller.reset(40.0)
+    assert controller.update(500, 500) == pytest.approx(40.0)
+
+
+def test_control_loop_holds_a_soak():
+    backend = SimulatedFurnace(ThermalModel(dead_time=5.0))
+    profile = ScheduleProfile([Segment('Soak', 200, 200, 4 * 3600)])
+    loop = ControlLoop(PIDController(5.0, 0.02, 20.0), backend, profile)
+    for second in range(3 * 3600):
+        loop.tick(second / 60)
+    assert backend.read_temperature() == pytest.approx(200, abs=2)
+
+
+def test_relay_autotune_finds_gains():
+    result = relay_autotune(SimulatedFurnace(ThermalModel(dead_time=30.0)), 300)
+    assert result is not None
+    assert result.ku > 0 and result.pu > 0
+    assert result.kp > 0 and result.ki > 0 and result.kd > 0
+    with pytest.raises(ValueError):
+        relay_autotune(SimulatedFurnace(), 300, rule='unknown')
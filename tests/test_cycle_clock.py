@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from cycle_clock import CycleClock, ManualClock, TickScheduler
+
+
+def test_elapsed_time_ignores_wall_clock_steps():
+    clock = ManualClock(datetime(2024, 3, 31, 1, 0))
+    cycle = CycleClock(clock)
+    cycle.start()
+    clock.advance(600)
+    clock.step_wall_clock(3600)  # DST change
+    assert cycle.elapsed_seconds() == 600
+    assert cycle.wall_time_at(1200) == datetime(2024, 3, 31, 1, 20)
+
+
+def test_resuming_counts_the_time_already_elapsed():
+    clock = ManualClock(datetime(2024, 1, 1, 12, 0))
+    cycle = CycleClock(clock)
+    cycle.start(datetime(2024, 1, 1, 11, 0))
+    assert cycle.elapsed_seconds() == 3600
+    cycle.stop()
+    assert not cycle.running and cycle.elapsed_seconds() == 0
+
+
+def test_ticks_stay_on_their_deadlines():
+    clock = ManualClock()
+    scheduler = TickScheduler(clock, interval_seconds=1.0, max_catch_up=5)
+    scheduler.reset(origin=0.0)
+    clock.advance(0.3)
+    assert scheduler.due() == []
+    assert scheduler.delay_ms() == 700
+    clock.advance(0.9)  # a late timer
+    assert scheduler.due() == [1.0]
+    assert scheduler.delay_ms() == 800  # the next tick is still at 2.0
+
+
+def test_missed_ticks_are_caught_up_up_to_a_limit():
+    clock = ManualClock()
+    scheduler = TickScheduler(clock, interval_seconds=1.0, max_catch_up=3)
+    scheduler.reset(origin=0.0)
+    clock.advance(3.5)
+    assert scheduler.due() == [1.0, 2.0, 3.0]
+    clock.advance(10)
+    assert scheduler.due() == [11.0, 12.0, 13.0]
+    assert scheduler.skipped == 7
+
+
+def test_reset_aligns_to_the_origin():
+    clock = ManualClock()
+    clock.advance(10.25)
+    scheduler = TickScheduler(clock, interval_seconds=0.5)
+    scheduler.reset(origin=0.0)
+    assert scheduler.next_deadline == pytest.approx(10.5)
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from db_access import WriteCoordinator, writer_address
+
+
+def insert(cursor, value):
+    cursor.execute("CREATE TABLE IF NOT EXISTS items (value TEXT)")
+    cursor.execute("INSERT INTO items VALUES (?)", (value,))
+    return value
+
+
+def values(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT value FROM items ORDER BY rowid")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def coordinators(tmp_path):
+    created = []
+
+    def make(name, address=None):
+        coordinator = WriteCoordinator(str(tmp_path / name), lambda _: insert, str(tmp_path))
+        if address is not None:
+            coordinator.address = address
+        created.append(coordinator)
+        return coordinator
+
+    yield make
+    for coordinator in reversed(created):
+        coordinator.close()
+
+
+def test_writes_go_through_one_writer(coordinators):
+    writer = coordinators('a.db')
+    client = coordinators('a.db')
+    assert writer.execute('insert', ('first',)) == 'first'
+    assert client.execute('insert', ('second',)) == 'second'
+    assert writer.is_writer and not client.is_writer
+    assert values(writer.path) == ['first', 'second']
+
+
+def test_colliding_ports_never_write_to_another_database(coordinators):
+    first = coordinators('a.db')
+    # Another database whose path happens to hash to the same port
+    second = coordinators('b.db', address=first.address)
+    first.execute('insert', ('a',))
+    second.execute('insert', ('b',))
+    assert values(first.path) == ['a']
+    assert values(second.path) == ['b']
+
+
+def test_writer_address_depends_on_the_path(tmp_path):
+    assert writer_address(str(tmp_path / 'a.db')) == writer_address(str(tmp_path / 'a.db'))
+    assert writer_address(str(tmp_path / 'a.db'))[0] == '127.0.0.1'
+
+
+def test_switching_databases_closes_the_previous_writer(database, tmp_path, monkeypatch):
+    assert database.save_schedule('First', [('Soak', 20, 20, '00:10:00', '')])
+    previous = database.get_writer()
+    monkeypatch.setattr(database, 'DB_NAME', str(tmp_path / 'other.db'))
+    database.initialize_database()
+    assert database.get_writer() is not previous
+    assert not previous.is_writer and previous._listener is None
+
+
+def test_a_closed_writer_hands_over_to_the_next_process(coordinators):
+    old = coordinators('a.db')
+    old.execute('insert', ('old',))
+    old.close()
+    new = coordinators('a.db')
+    assert new.execute('insert', ('new',)) == 'new'
+    assert new.is_writer
+    assert values(new.path) == ['old', 'new']
@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from eta import EtaEstimator, expected_waits, settle_minutes
+from schedule_profile import ScheduleProfile
+from segment import Segment
+from thermal_fit import LearnedModel
+
+SCHEDULE = [('Ramp', 20, 600, '01:00:00', ''), ('Hold', 600, 600, '00:30:00', '', None, None, 5),
+            ('Ramp', 600, 20, '01:00:00', '')]
+MODEL = LearnedModel(5.0, dead_steps=6, heat=0.01, cool=0.005)
+
+
+def profile():
+    return ScheduleProfile([Segment.from_row(row) for row in SCHEDULE])
+
+
+def test_settle_minutes():
+    assert settle_minutes(598, 600, 5) == 0.0
+    expected = (MODEL.dead_time + MODEL.tau_heat * math.log(100 / 5)) / 60
+    assert settle_minutes(500, 600, 5, MODEL) == pytest.approx(expected)
+    assert settle_minutes(500, 600, 5, rate=10.0) == pytest.approx(9.5)
+    assert settle_minutes(500, 600, 5, rate=-10.0) is None  # heading away
+    assert settle_minutes(500, 600, 5) is None
+
+
+def test_model_adds_lag_before_holds_and_settling_at_the_end():
+    waits, settle = expected_waits(profile(), MODEL)
+    assert waits[0] == 0 and waits[1] > 0 and waits[2] == 0
+    assert settle > 0
+    assert expected_waits(profile(), MODEL, holds_wait=False)[0] == [0.0, 0.0, 0.0]
+
+    estimator = EtaEstimator(profile(), MODEL)
+    assert estimator.initial_minutes() == pytest.approx(150 + waits[1] + settle)
+    assert EtaEstimator(profile()).initial_minutes() == 150
+
+
+def test_update_counts_down_with_profile_time():
+    estimator = EtaEstimator(profile())
+    assert estimator.update(30, 30, None) == 120
+    assert estimator.update(100, 100, None) == 50
+    assert estimator.update(200, 150, 20) == 0.0
+
+
+def test_held_soak_waits_on_the_measured_approach():
+    estimator = EtaEstimator(profile())
+    estimator.update(60, 60, 560)
+    remaining = estimator.update(61, 60, 570)  # 10 °C/min towards the hold
+    assert remaining == pytest.approx(90 + (30 - 5) / 10)
+
+    # Without thermocouples a hold is timed like a soak
+    assert EtaEstimator(profile(), holds_wait=False).update(61, 60, 570) == 90
+
+
+def test_reset_starts_over():
+    estimator = EtaEstimator(profile())
+    estimator.update(100, 100, None)
+    estimator.reset()
+    assert estimator.index == 0 and estimator.remaining == 150
+    assert estimator.update(10, 10, None) == 140
@@ -0,0 +1,65 @@
+import pytest
+
+import instrumentation
+from instrumentation import Histogram
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.set_enabled(True)
+    yield
+    instrumentation.set_enabled(False)
+
+
+def test_histogram_percentiles():
+    hist = Histogram('test', bounds=(1, 5, 10))
+    for value in (0.5, 0.5, 3, 8, 50):
+        hist.observe(value)
+    assert hist.counts == [2, 1, 1, 1]
+    assert hist.percentile(0.5) == 5
+    assert hist.percentile(1.0) == 50
+    assert hist.max == 50
+
+
+def test_disabled_timers_record_nothing():
+    with instrumentation.timer('test.disabled'):
+        pass
+    instrumentation.observe('test.disabled', 1.0)
+    assert 'test.disabled' not in instrumentation.snapshot()
+
+
+def test_timed_functions_and_prometheus_export(enabled, tmp_path):
+    @instrumentation.timed('test.call')
+    def call():
+        return 42
+
+    assert call() == 42
+    with instrumentation.timer('test.block'):
+        pass
+    instrumentation.register_gauge('test.depth', lambda: 3)
+
+    text = instrumentation.export_prometheus()
+    assert 'smartfurnace_test_call_ms_count 1' in text
+    assert 'smartfurnace_test_block_ms_bucket{le="+Inf"} 1' in text
+    assert 'smartfurnace_test_depth 3' in text
+
+    path = tmp_path / 'metrics.prom'
+    assert instrumentation.write_prometheus_file(str(path))
+    assert path.read_text() == instrumentation.export_prometheus()
+
+
+@pytest.mark.parametrize('collecting', [False, True])
+def test_hiding_the_overlay_restores_collection(qapp, collecting):
+    from perf_overlay import PerfOverlay
+
+    instrumentation.set_enabled(collecting)  # as SMARTFURNACE_METRICS would
+    overlay = PerfOverlay()
+    try:
+        overlay.set_visible(True)
+        assert instrumentation.is_enabled()
+        overlay.set_visible(True)
+        overlay.set_visible(False)
+        assert instrumentation.is_enabled() == collecting
+    finally:
+        overlay.deleteLater()
+        instrumentation.set_enabled(False)
@@ -0,0 +1,42 @@
+import numpy as np
+import pyqtgraph as pg
+
+from live_plot import LiveTraces, RingBuffer
+
+
+def test_ring_buffer_keeps_the_newest_values_in_order():
+    ring = RingBuffer(4)
+    ring.extend([1.0, 2.0])
+    assert len(ring) == 2 and list(ring.view()[0]) == [1.0, 2.0]
+    ring.extend(np.arange(3.0, 8.0))
+    assert len(ring) == 4 and list(ring.view()[0]) == [4.0, 5.0, 6.0, 7.0]
+    ring.extend(np.arange(10.0, 20.0))  # more than the capacity at once
+    assert list(ring.view()[0]) == [16.0, 17.0, 18.0, 19.0]
+    ring.clear()
+    assert len(ring) == 0 and ring.view().shape == (1, 0)
+
+
+def test_ring_buffer_view_is_not_a_copy():
+    ring = RingBuffer(3, channels=2)
+    ring.extend(np.array([[1.0, 10.0], [2.0, 20.0], [3.0, 30.0], [4.0, 40.0]]))
+    view = ring.view()
+    assert view.shape == (2, 3)
+    assert np.shares_memory(view, ring.data)
+    np.testing.assert_array_equal(view, [[2.0, 3.0, 4.0], [20.0, 30.0, 40.0]])
+    assert view[0].flags['C_CONTIGUOUS']
+
+
+def test_live_traces_draw_one_curve_per_channel(qtbot):
+    widget = pg.PlotWidget()
+    qtbot.addWidget(widget)
+    traces = LiveTraces(widget.getPlotItem(), channels=3, rate_hz=1.0, window_seconds=5)
+    assert len(traces.curves) == 3
+    traces.extend(np.arange(8.0), np.arange(24.0).reshape(8, 3))
+    traces.refresh(visible=False)
+    x_data, y_data = traces.curves[1].getData()
+    assert list(x_data) == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert list(y_data) == [10.0, 13.0, 16.0, 19.0, 22.0]
+    assert not traces.curves[0].isVisible()
+    traces.clear()
+    x_data, _ = traces.curves[0].getData()
+    assert x_data is None or len(x_data) == 0
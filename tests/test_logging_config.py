@@ -0,0 +1,44 @@
+import json
+import logging
+import sys
+
+import logging_config
+from logging_config import JsonFormatter, SizeTimeRotatingFileHandler, log_context, setup_logging, shutdown_logging
+
+
+def test_records_are_written_as_json_with_context(tmp_path):
+    setup_logging('INFO', str(tmp_path))
+    try:
+        logger = logging.getLogger('test.furnace')
+        with log_context('kiln-2', 17):
+            logger.info("Reached %d°C", 600)
+        logger.warning("No context")
+    finally:
+        shutdown_logging()
+    assert logging_config.log_queue_depth() == 0
+
+    entries = [json.loads(line) for line in (tmp_path / 'smartfurnace.log').read_text('utf-8').splitlines()]
+    ours = [entry for entry in entries if entry['logger'] == 'test.furnace']
+    assert ours[0]['message'] == "Reached 600°C"
+    assert (ours[0]['furnace_id'], ours[0]['run_id']) == ('kiln-2', 17)
+    assert 'furnace_id' not in ours[1]
+
+
+def test_exceptions_are_included():
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = logging.LogRecord('x', logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert 'ValueError: bad' in entry['exception']
+
+
+def test_rotates_on_size(tmp_path):
+    handler = SizeTimeRotatingFileHandler(str(tmp_path / 'a.log'), max_bytes=200, backup_count=2,
+                                          interval_seconds=3600)
+    handler.setFormatter(JsonFormatter())
+    for i in range(20):
+        handler.emit(logging.LogRecord('x', logging.INFO, __file__, 1, "message %d", (i,), None))
+    handler.close()
+    assert (tmp_path / 'a.log.1').exists() and (tmp_path / 'a.log.2').exists()
+    assert not (tmp_path / 'a.log.3').exists()
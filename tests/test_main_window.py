@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import Main
+from cycle_clock import ManualClock
+
+START = datetime(2026, 1, 1, 8, 0, 0)
+SCHEDULE = [('Ramp', 20, 100, '00:10:00', ''), ('Hold', 100, 100, '00:30:00', '', None, None, 5),
+            ('Ramp', 100, 20, '00:10:00', '')]
+
+
+class FixedAcquisition:
+    """Thermocouples stuck at one temperature."""
+
+    def __init__(self, temperature):
+        self.value = temperature
+
+    def temperature(self, at=None):
+        return self.value
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def window(database, qtbot, tmp_path, monkeypatch):
+    monkeypatch.setattr(Main.MainWindow, 'get_app_data_dir', lambda self: str(tmp_path))
+    monkeypatch.delenv('SMARTFURNACE_ACQUISITION', raising=False)
+    database.save_schedule('Held', SCHEDULE)
+    clock = ManualClock(START)
+    # The last cycle started an hour before the window opens
+    (tmp_path / 'start_cycle_time.txt').write_text((START - timedelta(hours=1)).isoformat())
+    main_window = Main.MainWindow(clock)
+    qtbot.addWidget(main_window)
+    main_window.clock = clock
+    yield main_window
+    main_window.timer.stop()
+    main_window.stop_run_recording()
+    main_window.alarm_engine.close()
+
+
+def run_for(window, seconds):
+    """Tick through the given cycle time the way the single-shot timer does."""
+    step = window.tick_scheduler.interval
+    for _ in range(int(seconds / step)):
+        window.clock.advance(step)
+        window.timer.stop()  # a single-shot timer is no longer active once it fires
+        window.on_tick()
+
+
+def test_opening_the_window_resumes_the_last_cycle(window):
+    assert window.cycle_running and window.start_button.text() == "Stop Cycle"
+    assert window.cycle_clock.elapsed_seconds() == 3600
+    run_for(window, 60)
+    assert window.shown_end_time is not None
+
+
+def test_first_start_takes_its_time_from_the_clock(database, qtbot, tmp_path, monkeypatch):
+    monkeypatch.setattr(Main.MainWindow, 'get_app_data_dir', lambda self: str(tmp_path))
+    monkeypatch.delenv('SMARTFURNACE_ACQUISITION', raising=False)
+    main_window = Main.MainWindow(ManualClock(START))
+    qtbot.addWidget(main_window)
+    try:
+        assert main_window.start_cycle_time == START
+        assert (tmp_path / 'start_cycle_time.txt').read_text() == START.isoformat()
+        assert main_window.cycle_clock.elapsed_seconds() == 0
+    finally:
+        main_window.timer.stop()
+        main_window.stop_run_recording()
+        main_window.alarm_engine.close()
+
+
+def test_end_time_moves_while_a_guaranteed_soak_waits(window):
+    window.acquisition = FixedAcquisition(50.0)  # never reaches the hold
+    window.update_eta()
+    window.on_start_button_clicked()  # stops the resumed cycle
+    window.on_start_button_clicked()
+    assert window.endTimeDisplay.text() == 'End: 08:50:00 AM'
+
+    run_for(window, 15 * 60)
+    held = window.endTimeDisplay.text()
+    assert held != 'End: 08:50:00 AM'
+    assert window.hold_tracker.profile_minutes(15) == pytest.approx(10, abs=0.1)
+
+    run_for(window, 5 * 60)
+    assert window.endTimeDisplay.text() != held
+    # Twenty minutes in and ten of them waiting: the planned end plus the wait
+    assert window.shown_end_time == START + timedelta(minutes=50 + 10)
+
+
+def test_stopping_the_cycle_stops_the_estimate(window):
+    run_for(window, 60)
+    window.on_start_button_clicked()
+    assert not window.cycle_running
+    assert window.endTimeDisplay.text() == 'End: --:--:--'
+    window.update_graph()
+    assert window.endTimeDisplay.text() == 'End: --:--:--'
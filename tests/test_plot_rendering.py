@@ -0,0 +1,50 @@
+import pyqtgraph as pg
+import pytest
+from PyQt5.QtGui import QImage
+
+import plot_rendering
+from plot_rendering import FrameLimiter, configure_rendering, opengl_available, render_profile_png
+
+
+@pytest.fixture
+def restore_rendering():
+    options = {key: pg.getConfigOption(key) for key in ('antialias', 'useOpenGL')}
+    mode = plot_rendering.rendering_mode()
+    yield
+    pg.setConfigOptions(**options)
+    plot_rendering._mode = mode
+
+
+def test_opengl_falls_back_to_fast_offscreen(qapp, restore_rendering, monkeypatch):
+    assert not opengl_available()
+    assert configure_rendering('OpenGL') == 'fast'
+    assert not pg.getConfigOption('useOpenGL') and not pg.getConfigOption('antialias')
+
+    monkeypatch.setenv('SMARTFURNACE_RENDER', 'sparkly')
+    assert configure_rendering() == 'quality'
+    assert pg.getConfigOption('antialias')
+
+
+def test_frame_limiter_draws_only_when_something_changed(qapp):
+    draws = []
+    new_data = [False]
+    limiter = FrameLimiter(lambda: draws.append(True), max_fps=1, has_new_data=lambda: new_data[0])
+    limiter.stop()
+    limiter.on_frame()
+    assert draws == []
+    limiter.request()
+    limiter.request()
+    limiter.on_frame()
+    limiter.on_frame()
+    assert len(draws) == 1
+    new_data[0] = True
+    limiter.on_frame()
+    assert limiter.frames == 2
+
+
+def test_render_profile_png(qapp, tmp_path):
+    path = str(tmp_path / 'profile.png')
+    assert render_profile_png(path, [0, 60, 90, 210], [20, 600, 600, 20],
+                              measured=[([0, 30, 60], [20, 300, 590])], size=(400, 200), title='Bisque') == path
+    image = QImage(path)
+    assert (image.width(), image.height()) == (400, 200)
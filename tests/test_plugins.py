@@ -0,0 +1,90 @@
+import sys
+
+import pytest
+
+import plugins
+from dialects import PvSvDialect
+from furnace_commands import furnace_commands
+from plugins import PluginRegistry, load_dialect
+from segment import Segment
+
+PLUGIN_MODULE = '''
+from dialects import ControllerDialect
+
+
+class TenthsDialect(ControllerDialect):
+    name = 'tenths'
+
+    def temperature_value(self, temperature):
+        return int(round(temperature * 10))
+
+    def time_value(self, seconds):
+        return seconds
+
+    def temperature_command(self, program, temperature):
+        return f"P{program}T{temperature}"
+
+    def time_command(self, program, time):
+        return f"P{program}S{time}"
+'''
+
+
+@pytest.fixture
+def installed_plugin(tmp_path, monkeypatch):
+    """A package on sys.path declaring a dialect entry point, as pip would install it."""
+    (tmp_path / 'tenths_dialect.py').write_text(PLUGIN_MODULE)
+    dist_info = tmp_path / 'tenths_dialect-1.0.dist-info'
+    dist_info.mkdir()
+    (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: tenths-dialect\nVersion: 1.0\n')
+    (dist_info / 'entry_points.txt').write_text(
+        '[smartfurnace.dialects]\ntenths = tenths_dialect:TenthsDialect\npv-sv = tenths_dialect:TenthsDialect\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    sys.modules.pop('tenths_dialect', None)
+
+
+def test_builtins_load_lazily_and_once():
+    registry = PluginRegistry('smartfurnace.tests-none', 'test plugin', {'dialect': 'dialects:PvSvDialect'})
+    assert registry.names() == ['dialect']
+    assert registry._loaded == {}
+    assert registry.load('dialect') is PvSvDialect
+    assert registry.load('dialect') is registry.load('dialect')
+
+
+def test_unknown_and_broken_plugins_raise_value_error():
+    registry = PluginRegistry('smartfurnace.tests-none', 'test plugin', {'broken': 'no_such_module:Thing'})
+    with pytest.raises(ValueError, match="Unknown test plugin: 'missing'.*broken"):
+        registry.load('missing')
+    with pytest.raises(ValueError, match="Could not load test plugin 'broken'"):
+        registry.load('broken')
+
+
+def test_registered_plugins_replace_builtins():
+    registry = PluginRegistry('smartfurnace.tests-none', 'test plugin', {'pv-sv': 'dialects:PvSvDialect'})
+    registry.register('pv-sv', dict)
+    assert registry.load('pv-sv') is dict
+
+
+def test_installed_entry_points_are_found(installed_plugin, monkeypatch):
+    registry = PluginRegistry(plugins.DIALECT_PLUGIN_GROUP, 'controller dialect', {'pv-sv': 'dialects:PvSvDialect'})
+    assert registry.names() == ['pv-sv', 'tenths']
+    assert 'tenths_dialect' not in sys.modules
+    dialect = registry.load('tenths')()
+    assert dialect.program_step(Segment('Ramp', 20.5, 600, 90)) == (205, 90)
+    # An installed plugin with a built-in name takes its place
+    assert registry.load('pv-sv').__name__ == 'TenthsDialect'
+
+    monkeypatch.setattr(plugins, 'dialects', registry)
+    monkeypatch.setenv('SMARTFURNACE_DIALECT', 'tenths')
+    assert furnace_commands([Segment('Ramp', 20, 600, 3600)]) == [('P0T200', 'P0S3600')]
+
+
+def test_default_dialect(monkeypatch):
+    monkeypatch.delenv('SMARTFURNACE_DIALECT', raising=False)
+    dialect = load_dialect()
+    assert isinstance(dialect, PvSvDialect)
+    assert dialect.program_step(Segment('Ramp', 20.7, 600, 61)) == (20, 2)  # minutes round up
+    assert dialect.temperature_command(3, 600) == 'PV=C3, SV=600'
+    assert dialect.time_command(3, 2) == 'PV=t3, SV=2'
+    with pytest.raises(ValueError):
+        load_dialect('no-such-dialect')
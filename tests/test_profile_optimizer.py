@@ -0,0 +1,89 @@
+import numpy as np
+
+from profile_optimizer import format_optimization, optimize_segments, simplify_vertices
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+
+def segments(*rows):
+    return [Segment.from_row(row) for row in rows]
+
+
+def test_simplify_vertices_keeps_corners_only():
+    times = np.arange(7.0)
+    temperatures = np.array([0.0, 10.0, 20.0, 30.0, 30.0, 30.0, 0.0])
+    assert list(simplify_vertices(times, temperatures, 1e-9)) == [0, 3, 5, 6]
+    noisy = np.array([0.0, 10.2, 19.9, 30.1, 40.0, 50.0, 60.0])
+    assert list(simplify_vertices(times, noisy, 0.5)) == [0, 6]
+    assert list(simplify_vertices(times[:2], temperatures[:2], 0.0)) == [0, 1]
+
+
+def test_collinear_ramps_and_equal_soaks_merge_exactly():
+    result = optimize_segments(segments(
+        ('Ramp', 20, 100, '00:10:00', 'a'), ('Ramp', 100, 180, '00:10:00', 'b'),
+        ('Soak', 180, 180, '00:30:00', ''), ('Soak', 180, 180, '00:15:00', 'c'),
+        ('Ramp', 180, 180, '00:00:00', ''), ('Ramp', 180, 20, '01:00:00', '')), max_error=0)
+    assert [(s.cycle_type, s.start_temp, s.end_temp, s.seconds, s.notes) for s in result.segments] == [
+        ('Ramp', 20, 180, 1200, 'a; b'), ('Soak', 180, 180, 2700, 'c'), ('Ramp', 180, 20, 3600, '')]
+    assert (result.rows_before, result.rows_after, result.slots_before, result.slots_after) == (6, 3, 6, 3)
+    assert result.max_error == 0.0
+
+
+def test_holds_curves_and_steps_are_kept():
+    rows = segments(('Ramp', 20, 100, '00:10:00', ''), ('Hold', 100, 100, '00:10:00', '', None, None, 5),
+                    ('Ramp', 100, 200, '00:10:00', '', 'exp'), ('Ramp', 250, 300, '00:10:00', ''),
+                    ('Ramp', 300, 350, '00:10:00', ''))
+    result = optimize_segments(rows)
+    assert [s.cycle_type for s in result.segments] == ['Ramp', 'Hold', 'Ramp', 'Ramp']
+    assert result.segments[1].tolerance == 5 and result.segments[2].shape == 'exp'
+    assert (result.segments[3].start_temp, result.segments[3].end_temp) == (250, 350)
+
+
+def test_zero_length_steps_keep_the_final_setpoint():
+    result = optimize_segments(segments(('Soak', 20, 20, '00:10:00', ''), ('Ramp', 20, 50, '00:00:00', '')))
+    assert [(s.cycle_type, s.start_temp, s.end_temp, s.seconds) for s in result.segments] == [
+        ('Soak', 20, 20, 600), ('Ramp', 20, 50, 0)]
+    assert result.max_error == 0.0
+
+    rows = segments(('Soak', 100, 100, '00:10:00', ''), ('Ramp', 100, 300, '00:00:00', ''),
+                    ('Ramp', 300, 500, '00:00:00', ''))
+    result = optimize_segments(rows)
+    assert [(s.start_temp, s.end_temp, s.seconds) for s in result.segments] == [(100, 100, 600), (300, 500, 0)]
+    assert ScheduleProfile(result.segments).temperature_at(10) == 500
+    assert result.max_error == 0.0
+
+    # A leading step sets the start temperature; a step the next row starts from goes
+    rows = segments(('Ramp', 400, 500, '00:00:00', ''), ('Soak', 500, 500, '00:00:00', ''),
+                    ('Ramp', 500, 100, '00:10:00', ''))
+    result = optimize_segments(rows)
+    assert [(s.start_temp, s.end_temp, s.seconds) for s in result.segments] == [(400, 500, 0), (500, 100, 600)]
+
+
+def test_noisy_profile_stays_within_the_tolerance():
+    rng = np.random.default_rng(3)
+    ends = 20 + np.arange(1, 61) * 10 + rng.uniform(-1, 1, 60)
+    starts = np.concatenate(([20.0], ends[:-1]))
+    rows = segments(*[('Ramp', float(a), float(b), '00:01:00', '') for a, b in zip(starts, ends)])
+    result = optimize_segments(rows, max_error=2.0)
+    assert result.rows_after < 10
+    assert result.max_error <= 2.0
+
+    original, optimized = ScheduleProfile(rows), ScheduleProfile(result.segments)
+    assert optimized.total_minutes == original.total_minutes
+    grid = np.linspace(0, original.total_minutes, 500)
+    difference = [abs(original.temperature_at(t) - optimized.temperature_at(t)) for t in grid]
+    assert max(difference) <= 2.0 + 1e-9
+
+
+def test_repeat_blocks_are_expanded():
+    rows = segments(('Ramp', 20, 100, '00:10:00', ''), ('Ramp', 100, 20, '00:10:00', ''),
+                    ('Repeat', None, None, '00:00:00', '', None, None, None, 3, 2))
+    result = optimize_segments(rows)
+    assert result.slots_before == result.slots_after == 8  # the block plus three repeats
+    assert all(s.cycle_type == 'Ramp' for s in result.segments)
+
+
+def test_format_optimization():
+    result = optimize_segments(segments(('Soak', 20, 20, '00:10:00', ''), ('Soak', 20, 20, '00:10:00', '')))
+    text = format_optimization(result, slot_count=1)
+    assert 'Rows: 2 → 1' in text and 'Now fits in the controller' in text
@@ -0,0 +1,80 @@
+import pytest
+
+from dialects import PvSvDialect
+from program_slots import ProgramMemory, ProgramSpaceError
+
+
+def steps(count, temperature=100):
+    return [(temperature + 10 * i, 30) for i in range(count)]
+
+
+def memory(slot_count=10):
+    return ProgramMemory(slot_count, dialect=PvSvDialect())
+
+
+def test_load_writes_only_what_changed():
+    slots = memory()
+    plan = slots.load('Bisque', steps(3))
+    assert plan.start == 0 and plan.moved == []
+    assert plan.commands[:2] == ['PV=C0, SV=100', 'PV=t0, SV=30']
+    assert len(plan.commands) == 6
+
+    # An edited recipe is rewritten in place, one changed value at a time
+    edited = steps(3)
+    edited[1] = (115, 30)
+    assert slots.load('Bisque', edited).commands == ['PV=C1, SV=115']
+    assert slots.recipes() == {'Bisque': (0, 3)}
+
+
+def test_freed_recipe_loads_back_without_writes():
+    slots = memory()
+    slots.load('Bisque', steps(3))
+    slots.load('Glaze', steps(2, 500))
+    slots.remove('Bisque')
+    slots.load('Glaze', steps(2, 600))
+    plan = slots.load('Bisque', steps(3))
+    assert (plan.start, plan.commands) == (0, [])
+
+
+def test_best_fit_and_first_fit():
+    best = memory()
+    best.owners = [None, None, None, 'X', None, None, 'Y', 'Y', 'Y', 'Y']
+    first = best.copy()
+    assert best.free_extents() == [(0, 3), (4, 2)]
+    assert best.load('New', steps(2), strategy='best-fit').start == 4
+    assert first.load('New', steps(2), strategy='first-fit').start == 0
+    with pytest.raises(ValueError):
+        memory().load('New', steps(1), strategy='worst-fit')
+
+
+def test_fragmented_memory_moves_the_cheapest_recipe():
+    slots = memory()
+    slots.owners = ['A', None, None, 'B', None, None, 'C', 'C', 'C', 'C']
+    slots.contents = [(1, 1), None, None, (2, 2), None, None, (3, 3), (3, 3), (3, 3), (3, 3)]
+    plan = slots.load('New', steps(4))
+    assert plan.moved == ['B']
+    assert slots.recipes()['New'][1] == 4
+    assert slots.free_slots == 0
+    # Only the moved recipe's values and the new recipe's are written
+    assert len(plan.commands) == 2 + 8
+
+
+def test_recipe_that_does_not_fit_leaves_memory_unchanged():
+    slots = memory(4)
+    slots.load('Bisque', steps(2))
+    with pytest.raises(ProgramSpaceError):
+        slots.load('Long', steps(3))
+    with pytest.raises(ProgramSpaceError):
+        slots.load('Bisque', steps(5))
+    assert slots.recipes() == {'Bisque': (0, 2)}
+
+
+def test_program_memory_round_trip(database):
+    slots = ProgramMemory(dialect=PvSvDialect())
+    slots.load('Bisque', steps(3))
+    slots.load('Glaze', steps(2, 500))
+    slots.remove('Bisque')
+    assert database.save_program_memory('kiln-1', slots)
+    loaded = database.load_program_memory('kiln-1', dialect=PvSvDialect())
+    assert loaded.owners == slots.owners and loaded.contents == slots.contents
+    assert database.load_program_memory('kiln-2').free_slots == loaded.slot_count
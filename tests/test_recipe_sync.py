@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+import recipe_sync
+from recipe_sync import SyncChange, SyncResult
+
+BISQUE = [('Ramp', 20, 600, '01:00:00', ''), ('Ramp', 600, 20, '02:00:00', '')]
+GLAZE = [('Ramp', 20, 1200, '04:00:00', ''), ('Soak', 1200, 1200, '00:20:00', '')]
+
+
+@pytest.fixture
+def stations(database, tmp_path, monkeypatch):
+    """Switch DatabaseManager between station databases by name."""
+    def use(name):
+        directory = tmp_path / name
+        directory.mkdir(exist_ok=True)
+        monkeypatch.setattr(database, 'APP_DATA', str(directory))
+        monkeypatch.setattr(database, 'DB_NAME', str(directory / 'SmartFurnace.db'))
+        database.initialize_database()
+        return database.DB_NAME
+    return use
+
+
+def contents(database):
+    return {name: [segment.as_row()[:4] for segment in database.load_schedule(name)]
+            for name in database.fetch_all_schedules()}
+
+
+def test_peer_sync_exchanges_saves_and_deletes(database, stations):
+    first = stations('a')
+    database.save_schedule('Bisque', BISQUE)
+    database.save_schedule('Old', GLAZE)
+    stations('b')
+    database.save_schedule('Glaze', GLAZE)
+
+    assert database.sync_recipes(first) == SyncResult(1, 2, 0)
+    synced = contents(database)
+    assert set(synced) == {'Bisque', 'Glaze', 'Old'}
+
+    database.delete_schedule('Old')
+    assert database.sync_recipes(first) == SyncResult(1, 0, 0)
+    assert database.sync_recipes(first) == SyncResult(0, 0, 0)
+    stations('a')
+    assert contents(database) == {name: synced[name] for name in ('Bisque', 'Glaze')}
+    assert database.fetch_sync_conflicts() == []
+
+
+def test_concurrent_edits_conflict_until_resolved(database, stations):
+    first = stations('a')
+    database.save_schedule('Bisque', BISQUE)
+    second = stations('b')
+    database.sync_recipes(first)
+
+    database.save_schedule('Bisque', BISQUE[:1])
+    stations('a')
+    database.save_schedule('Bisque', BISQUE + [('Soak', 20, 20, '00:10:00', '')])
+    local = contents(database)['Bisque']
+
+    result = database.sync_recipes(second)
+    assert result.conflicts == 2  # one found on each side
+    assert contents(database)['Bisque'] == local  # the local edit is kept until resolved
+    [conflict] = database.fetch_sync_conflicts()
+    assert conflict['Name'] == 'Bisque' and not conflict['RemoteDeleted']
+
+    assert database.resolve_sync_conflict('Bisque', keep_remote=True)
+    assert len(contents(database)['Bisque']) == 1
+    assert database.fetch_sync_conflicts() == []
+
+    database.sync_recipes(second)
+    stations('b')
+    assert len(contents(database)['Bisque']) == 1
+    assert database.resolve_sync_conflict('Bisque', keep_remote=False)
+    assert database.fetch_sync_conflicts() == []
+    assert database.sync_recipes(first).conflicts == 0
+
+
+def test_hub_sync_between_three_stations(database, stations, tmp_path):
+    hub = tmp_path / 'hub'
+    hub.mkdir()
+    for name, schedule in (('a', BISQUE), ('b', GLAZE), ('c', None)):
+        stations(name)
+        if schedule:
+            database.save_schedule(name.upper(), schedule)
+        database.sync_recipes(str(hub))
+    assert len(os.listdir(hub)) == 2  # c had nothing to publish
+
+    for name in ('a', 'b', 'c'):
+        stations(name)
+        database.sync_recipes(str(hub))
+        assert set(contents(database)) == {'A', 'B'}
+
+
+def test_record_change_skips_unchanged_saves(database):
+    with database.get_connection() as conn:
+        cursor = conn.cursor()
+        recipe_sync.prepare(cursor)
+        assert recipe_sync.record_change(cursor, 'Bisque', BISQUE) is not None
+        assert recipe_sync.record_change(cursor, 'Bisque', [row + ('linear',) for row in BISQUE]) is None
+        assert recipe_sync.record_change(cursor, 'Missing', None) is None
+        changes, position = recipe_sync.changes_since(cursor, 0)
+        assert [change.name for change in changes] == ['Bisque']
+        assert recipe_sync.changes_since(cursor, position) == ([], position)
+
+
+def test_read_hub_stops_at_a_partial_line(tmp_path):
+    path = tmp_path / 'station'
+    change = SyncChange('s:1', 'Bisque', 'abc', None, '[]', 's')
+    recipe_sync.append_hub(str(path), [change])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"change_id": "s:2"')
+    changes, offset = recipe_sync.read_hub(str(path), 0)
+    assert changes == [change]
+    assert recipe_sync.read_hub(str(path), offset) == ([], offset)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from run_compare import RunStats, compare_runs, furnace_drift, schedule_on_grid
+from runs import RunRecorder
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+
+def record_run(profile, offset):
+    recorder = RunRecorder('Glaze')
+    for second in range(0, int(profile.total_minutes * 60) + 1, 5):
+        setpoint = profile.temperature_at(second / 60)
+        recorder.record(float(second), setpoint, setpoint + offset)
+    recorder.finish()
+    return recorder.run_id
+
+
+def test_compare_runs_against_the_schedule(database):
+    profile = ScheduleProfile([Segment('Ramp', 20, 620, 3600), Segment('Soak', 620, 620, 1800)])
+    offsets = {record_run(profile, offset): offset for offset in (-2.0, 0.0, 3.0)}
+    runs = database.fetch_runs('Glaze')
+
+    result = compare_runs(runs, profile, step_seconds=10, chunk_seconds=600)
+    assert result.time[-1] == pytest.approx(profile.total_minutes * 60)
+    assert result.schedule[0] == pytest.approx(20)
+    for stat in result.stats:
+        assert stat.rms == pytest.approx(abs(offsets[stat.run_id]), abs=1e-3)
+        assert stat.max_abs == pytest.approx(abs(offsets[stat.run_id]), abs=1e-3)
+    # The middle percentile follows the median run
+    median = result.envelope[result.percentiles.index(50)]
+    assert np.nanmax(np.abs(median - result.schedule)) < 1e-3
+
+
+def test_compare_runs_uses_the_setpoint_each_run_recorded(database):
+    profile = ScheduleProfile([Segment('Ramp', 20, 620, 3600), Segment('Soak', 620, 620, 1800)])
+    # The run waited 20 minutes at the start, so it lags the nominal schedule
+    recorder = RunRecorder('Glaze')
+    for second in range(0, int(profile.total_minutes * 60) + 1201, 5):
+        setpoint = profile.temperature_at(max(0, second - 1200) / 60)
+        recorder.record(float(second), setpoint, setpoint + 1.0)
+    recorder.finish()
+
+    result = compare_runs(database.fetch_runs('Glaze'), profile, step_seconds=10, chunk_seconds=600)
+    assert result.time[-1] == pytest.approx(profile.total_minutes * 60 + 1200)
+    assert result.schedule[-1] == pytest.approx(620)
+    [stat] = result.stats
+    assert stat.rms == pytest.approx(1.0, abs=1e-3)
+    assert stat.max_abs == pytest.approx(1.0, abs=1e-3)
+
+
+def test_furnace_drift_is_the_rms_trend_per_furnace():
+    stats = [RunStats(run_id, 'f1', '', rms, rms, 100) for run_id, rms in enumerate([1.0, 2.0, 3.0])]
+    stats.append(RunStats(9, 'f2', '', 5.0, 5.0, 100))  # a single run has no trend
+    assert furnace_drift(stats) == pytest.approx({'f1': 1.0})
+
+
+def test_schedule_on_grid_follows_the_profile_at_steps():
+    profile = ScheduleProfile([Segment('Soak', 100, 100, 600), Segment('Soak', 200, 200, 600)])
+    time = np.array([-60.0, 0.0, 600.0, 1200.0, 1500.0])
+    assert schedule_on_grid(profile, time).tolist() == [100, 100, 200, 200, 200]
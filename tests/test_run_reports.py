@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage
+
+import run_reports
+from run_reports import ReportBatch, ReportJob, deviation_summary, render_report, report_file_name
+from runs import SAMPLE_DTYPE, RunRecorder
+
+BISQUE = [('Ramp', 20, 600, '01:00:00', ''), ('Soak', 600, 600, '00:30:00', 'hold')]
+
+
+def test_deviation_summary_weights_samples_by_time():
+    samples = np.zeros(4, dtype=SAMPLE_DTYPE)
+    samples['elapsed'] = [0, 10, 40, 50]
+    samples['setpoint'] = 100.0
+    samples['measured'] = [100.0, 130.0, np.nan, 90.0]
+    summary = deviation_summary(samples, limit=20.0)
+    assert (summary['Samples'], summary['Measured']) == (4, 3)
+    assert summary['Mean'] == pytest.approx(20 / 3)
+    assert summary['Rms'] == pytest.approx(np.sqrt(1000 / 3))
+    assert (summary['MaxAbove'], summary['MaxBelow']) == (30.0, -10.0)
+    assert summary['SecondsBeyondLimit'] == 30.0  # from 10 s until the next sample at 40 s
+
+    samples['measured'] = np.nan
+    assert deviation_summary(samples) == {'Samples': 4, 'Measured': 0}
+
+
+def test_long_tables_are_cut_short(monkeypatch):
+    monkeypatch.setattr(run_reports, 'REPORT_MAX_TABLE_ROWS', 2)
+    table = run_reports._table(('A', 'B'), [(1, 2.25), (3, None), (5, '<6>')])
+    assert table.count('<tr>') == 3
+    assert '2.2' in table and '1 more rows not shown' in table and '&lt;6&gt;' not in table
+
+
+def test_run_report_plots_the_recorded_setpoint(database, qapp, monkeypatch):
+    database.save_schedule('Bisque', BISQUE)
+    recorder = RunRecorder('Bisque')
+    # Held 10 minutes at the start before ramping
+    for second in range(0, 6000, 30):
+        recorder.record(float(second), 20 + max(0, second - 600) / 6, 25 + max(0, second - 600) / 6)
+    recorder.finish()
+
+    plotted = {}
+
+    def render(minutes, temperatures, measured=None, **kwargs):
+        plotted.update(minutes=minutes, temperatures=temperatures, measured=measured)
+        return QImage(10, 10, QImage.Format_RGB32)
+
+    monkeypatch.setattr(run_reports, 'render_profile_image', render)
+    run_reports.build_report(ReportJob(recorder.run_id, 'Bisque'))
+    assert plotted['minutes'][-1] == pytest.approx(5970 / 60)
+    assert plotted['temperatures'][plotted['minutes'] == 20].tolist() == [20 + 600 / 6]
+    [(minutes, temperatures)] = plotted['measured']
+    assert temperatures - plotted['temperatures'] == pytest.approx(5.0)
+
+
+def test_report_file_names():
+    assert report_file_name(ReportJob(7, 'Cone 6 / glaze'), 'pdf') == 'run_7_Cone_6_glaze.pdf'
+    assert report_file_name(ReportJob(None, None), 'png') == 'schedule_schedule.png'
+
+
+@pytest.mark.parametrize('fmt', ['pdf', 'png'])
+def test_run_report(database, qapp, tmp_path, fmt):
+    database.save_schedule('Bisque', BISQUE)
+    recorder = RunRecorder('Bisque')
+    for second in range(0, 5400, 30):
+        recorder.record(float(second), 20 + second / 6, 25 + second / 6)
+    recorder.finish()
+
+    title, body, image = run_reports.build_report(ReportJob(recorder.run_id, 'Bisque'))
+    assert title == f"Run {recorder.run_id}: Bisque"
+    assert 'RMS deviation' in body and 'No alarms.' in body
+    assert not image.isNull()
+
+    result = render_report(ReportJob(recorder.run_id, 'Bisque'), str(tmp_path), fmt)
+    assert result.error is None and os.path.getsize(result.path) > 0
+    if fmt == 'png':
+        assert not QImage(result.path).isNull()
+
+
+def test_missing_run_is_reported_not_raised(database, qapp, tmp_path):
+    result = render_report(ReportJob(999, 'Gone'), str(tmp_path))
+    assert result.path is None and 'No run with id 999' in result.error
+
+
+def test_batch_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        ReportBatch([], str(tmp_path), fmt='docx')
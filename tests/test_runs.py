@@ -0,0 +1,50 @@
+import numpy as np
+
+from runs import SAMPLE_DTYPE, RunReader, RunRecorder, decimate
+
+
+def make_samples(measured):
+    samples = np.zeros(len(measured), dtype=SAMPLE_DTYPE)
+    samples['elapsed'] = np.arange(len(measured))
+    samples['measured'] = measured
+    return samples
+
+
+def test_decimate_keeps_extremes_of_each_bin():
+    measured = np.zeros(1000)
+    measured[123] = 50
+    measured[700] = -50
+    reduced = decimate(make_samples(measured), 100)
+    assert len(reduced) <= 100
+    assert 50 in reduced['measured'] and -50 in reduced['measured']
+
+
+def test_decimate_keeps_the_newest_samples():
+    measured = np.zeros(1003)
+    measured[-1] = 99  # in the partial last bin
+    reduced = decimate(make_samples(measured), 100)
+    assert len(reduced) <= 100
+    assert reduced['measured'][-1] == 99
+    assert reduced['elapsed'][-1] == 1002
+
+
+def test_decimate_short_input_is_unchanged():
+    samples = make_samples(np.arange(10.0))
+    assert np.array_equal(decimate(samples, 100), samples)
+
+
+def test_record_and_read_back(database):
+    recorder = RunRecorder('Bisque')
+    for second in range(5000):
+        recorder.record(float(second), 100.0, 100.0 + second % 7)
+    recorder.finish()
+
+    run = database.load_run(recorder.run_id)
+    assert run['EndedAt']
+    reader = RunReader.for_run(recorder.run_id)
+    assert len(reader) == 5000
+    assert reader.duration == 4999
+    assert reader.sample_at(10.5)['elapsed'] == 10
+    window = reader.window(1000, 2000, max_points=50)
+    assert len(window) <= 50
+    assert window['elapsed'].min() >= 1000 and window['elapsed'].max() < 2000
@@ -0,0 +1,80 @@
+import numpy as np
+
+from schedule_preview import SchedulePreview
+from schedule_profile import ScheduleProfile
+from segment import Segment
+
+ROWS = [
+    {'CycleType': 'Ramp', 'StartTemp': '20', 'EndTemp': '600', 'CycleTime': '01:00:00'},
+    {'CycleType': 'Soak', 'StartTemp': '600', 'EndTemp': '600', 'CycleTime': '00:30:00'},
+    {'CycleType': 'Ramp', 'StartTemp': '600', 'EndTemp': '20', 'CycleTime': '02:00:00', 'Shape': 'exp'},
+]
+
+
+def make_preview(qtbot, rows):
+    preview = SchedulePreview(lambda row: rows[row], lambda: len(rows))
+    qtbot.addWidget(preview)
+    preview.rows_changed()
+    preview.refresh()
+    return preview
+
+
+def drawn(preview):
+    x_data, y_data = preview.curve.getData()
+    return np.asarray(x_data), np.asarray(y_data)
+
+
+def expected(rows):
+    return ScheduleProfile([Segment.from_entry(row) for row in rows]).breakpoints()
+
+
+def test_incremental_edit_matches_full_rebuild(qtbot):
+    rows = [dict(row) for row in ROWS]
+    preview = make_preview(qtbot, rows)
+    rows[1]['CycleTime'] = '01:15:00'
+    rows[0]['EndTemp'] = '650'
+    preview.row_changed(1)
+    preview.row_changed(0)
+    preview.refresh()
+
+    x_data, y_data = drawn(preview)
+    x_full, y_full = expected(rows)
+    np.testing.assert_allclose(x_data, x_full)
+    np.testing.assert_allclose(y_data, y_full)
+
+
+def test_half_typed_row_draws_as_a_gap(qtbot):
+    rows = [dict(row) for row in ROWS]
+    preview = make_preview(qtbot, rows)
+    rows[1]['CycleTime'] = '00:3'
+    preview.row_changed(1)
+    preview.refresh()
+
+    x_data, y_data = drawn(preview)
+    assert np.isnan(y_data).any()
+    assert x_data[-1] == 60 + 120  # the soak takes no time until it parses
+
+
+def test_edits_are_debounced(qtbot):
+    rows = [dict(row) for row in ROWS]
+    preview = make_preview(qtbot, rows)
+    calls = []
+    original = preview._build
+    preview._build = lambda: (calls.append(True), original())
+    for temp in ('6', '65', '650'):
+        rows[0]['EndTemp'] = temp
+        preview.row_changed(0)
+    assert drawn(preview)[1][1] == 600  # nothing applied while typing
+
+    qtbot.waitUntil(lambda: drawn(preview)[1][1] == 650)
+    assert calls == []  # one incremental update, no rebuild
+
+
+def test_repeat_rows_draw_the_expanded_profile(qtbot):
+    rows = [dict(row) for row in ROWS[:2]] + [
+        {'CycleType': 'Ramp', 'StartTemp': '600', 'EndTemp': '20', 'CycleTime': '01:00:00'},
+        {'CycleType': 'Repeat', 'StartTemp': '', 'EndTemp': '', 'CycleTime': '00:00:00',
+         'RepeatCount': '2', 'RepeatSpan': '3'}]
+    preview = make_preview(qtbot, rows)
+    x_data, _ = drawn(preview)
+    assert x_data[-1] == 3 * (60 + 30 + 60)
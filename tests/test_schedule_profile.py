@@ -0,0 +1,71 @@
+import pytest
+
+from constants import PROFILE_MAX_SEGMENTS
+from schedule_profile import HoldTracker, ScheduleProfile
+from segment import Segment
+
+
+def test_lookups_within_and_outside_the_schedule():
+    profile = ScheduleProfile([Segment('Ramp', 20, 620, 600), Segment('Soak', 620, 620, 1200)])
+    assert profile.total_minutes == 30
+    assert profile.temperature_at(5) == pytest.approx(320)
+    assert profile.setpoint_at(5) == pytest.approx((320, 60))
+    assert profile.setpoint_at(20) == (620, 0)
+    assert profile.temperature_at(-1) is None and profile.temperature_at(31) is None
+    assert profile.setpoint_at(31) == (620, 0.0)
+
+
+def test_the_later_segment_wins_at_a_step():
+    profile = ScheduleProfile([Segment('Soak', 100, 100, 600), Segment('Soak', 200, 200, 600)])
+    assert profile.setpoint_at(10)[0] == 200
+    assert profile.segment_index(10) == 1
+
+
+def test_rate_ramps_take_their_duration_from_the_rate():
+    profile = ScheduleProfile([Segment('Ramp', 20, 620, 0, rate=10)])
+    assert profile.total_minutes == pytest.approx(60)
+    with pytest.raises(ValueError):
+        ScheduleProfile([Segment('Ramp', 20, 620, 0, rate=-10)])
+
+
+@pytest.mark.parametrize('shape', ['exp', 'scurve'])
+def test_curved_ramps_reach_their_end_points(shape):
+    profile = ScheduleProfile([Segment('Ramp', 0, 100, 600, shape=shape)])
+    assert profile.setpoint_at(0)[0] == 0
+    assert profile.setpoint_at(9.999)[0] == pytest.approx(100, abs=0.1)
+    middle = profile.setpoint_at(5)[0]
+    assert middle > 50 if shape == 'exp' else middle == pytest.approx(50)
+    x, y = profile.breakpoints()
+    assert len(x) > 2 and y[0] == 0 and y[-1] == pytest.approx(100)
+
+
+def test_repeat_rows_expand_the_rows_before_them():
+    profile = ScheduleProfile([Segment('Ramp', 20, 100, 60), Segment('Ramp', 100, 200, 60),
+                               Segment('Ramp', 200, 100, 60), Segment('Repeat', None, None, 0,
+                                                                      repeat_count=3, repeat_span=2)])
+    assert len(profile) == 3 + 3 * 2
+    assert profile.start_temps[3:5] == [100, 200]
+    assert profile.total_minutes == pytest.approx(9)
+    assert [cycle.seconds for cycle in profile.expanded_cycles()] == [60] * 9
+    with pytest.raises(ValueError):
+        ScheduleProfile([Segment('Soak', 20, 20, 60), Segment('Repeat', None, None, 0,
+                                                              repeat_count=1, repeat_span=2)])
+    with pytest.raises(ValueError):
+        ScheduleProfile([Segment('Soak', 20, 20, 60), Segment('Repeat', None, None, 0,
+                                                              repeat_count=PROFILE_MAX_SEGMENTS, repeat_span=1)])
+
+
+def test_holds_stop_profile_time_until_the_furnace_is_in_band():
+    profile = ScheduleProfile([Segment('Hold', 20, 500, 600, tolerance=5), Segment('Soak', 500, 500, 600)])
+    tracker = HoldTracker(profile)
+    assert tracker.update(0, 20) == 0
+    assert tracker.update(4, 200) == 0  # out of band: the last 4 minutes are held
+    assert tracker.update(8, 497) == 4
+    assert tracker.held_minutes == 4
+    # Without a measurement nothing is held
+    assert tracker.update(12, None) == 8
+
+
+def test_holds_default_their_tolerance():
+    profile = ScheduleProfile([Segment('Hold', 20, 500, 600), Segment('Soak', 500, 500, 600)])
+    assert profile.tolerances[0] is not None and profile.tolerances[1] is None
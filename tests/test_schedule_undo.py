@@ -0,0 +1,79 @@
+import pytest
+from PyQt5.QtWidgets import QUndoStack
+
+import schedule_undo
+from schedule_undo import CellEditCommand, DeleteRowCommand, InsertRowCommand
+
+
+class FakeEditor:
+    """Rows of {column: text}, with the methods the commands call."""
+
+    def __init__(self, rows):
+        self.rows = [dict(row) for row in rows]
+
+    def apply_cell(self, row, column, value):
+        self.rows[row][column] = value
+
+    def insert_row(self, row, values):
+        self.rows.insert(row, dict(values))
+
+    def remove_row(self, row):
+        del self.rows[row]
+
+    def row_values(self, row):
+        return {column: text for column, text in self.rows[row].items() if text}
+
+
+@pytest.fixture
+def stack(qapp):
+    return QUndoStack()
+
+
+def type_text(stack, editor, row, column, texts):
+    """Type texts one at a time, as the editor pushes after each keystroke."""
+    for text in texts:
+        old = editor.rows[row].get(column, '')
+        editor.apply_cell(row, column, text)
+        stack.push(CellEditCommand(editor, row, column, old, text))
+
+
+def test_keystrokes_in_one_cell_merge(stack):
+    editor = FakeEditor([{1: '20'}])
+    type_text(stack, editor, 0, 1, ['2', '25', '250'])
+    assert stack.count() == 1
+    stack.undo()
+    assert editor.rows[0][1] == '20'
+    stack.redo()
+    assert editor.rows[0][1] == '250'
+
+
+def test_edits_in_other_cells_or_after_a_pause_do_not_merge(stack, monkeypatch):
+    editor = FakeEditor([{1: '20', 2: '600'}])
+    type_text(stack, editor, 0, 1, ['25'])
+    type_text(stack, editor, 0, 2, ['650'])
+    assert stack.count() == 2
+
+    clock = iter([0.0, 100.0])
+    monkeypatch.setattr(schedule_undo.time, 'monotonic', lambda: next(clock))
+    type_text(stack, editor, 0, 1, ['30', '35'])
+    assert stack.count() == 4
+
+
+def test_typing_back_to_the_original_drops_the_command(stack):
+    editor = FakeEditor([{1: '20'}])
+    type_text(stack, editor, 0, 1, ['2', '20'])
+    assert stack.count() == 0
+    assert editor.rows[0][1] == '20'
+
+
+def test_row_insert_and_delete_round_trip(stack):
+    editor = FakeEditor([{0: 'Ramp', 1: '20'}, {0: 'Soak', 1: '600'}])
+    stack.push(InsertRowCommand(editor, 1, {0: 'Hold'}))
+    assert [row.get(0) for row in editor.rows] == ['Ramp', 'Hold', 'Soak']
+    stack.push(DeleteRowCommand(editor, 0))
+    assert [row.get(0) for row in editor.rows] == ['Hold', 'Soak']
+
+    stack.undo()
+    assert editor.rows[0] == {0: 'Ramp', 1: '20'}
+    stack.undo()
+    assert [row.get(0) for row in editor.rows] == ['Ramp', 'Soak']
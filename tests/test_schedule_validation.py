@@ -0,0 +1,84 @@
+from constants import PROFILE_MAX_SEGMENTS, VALIDATION_MAX_RAMP_RATE
+from schedule_validation import ValidationIssue, format_issue, validate_entries, validate_schedule
+
+VALID = [('Ramp', 20, 600, '01:00:00', ''), ('Soak', 600, 600, '00:30:00', ''),
+         ('Hold', 600, 600, '00:10:00', '', None, None, 5), ('Ramp', 600, 20, '02:00:00', '', 'scurve')]
+
+
+def columns(issues):
+    return [(issue.row, issue.column) for issue in issues]
+
+
+def test_valid_schedule_has_no_issues():
+    assert validate_entries(VALID) == []
+    assert validate_entries([]) == []
+
+
+def test_each_rule_points_at_its_cell():
+    entries = [
+        ('Bake', 20, 100, '01:00:00', ''),
+        ('Ramp', 100, 1500, '01:00:00', ''),
+        ('Ramp', 20, 100, '1 hour', ''),
+        ('Ramp', 100, 200, '00:00:00', ''),
+        ('Ramp', 200, 300, '01:00:00', '', 'zigzag'),
+        ('Soak', 300, 310, '00:10:00', ''),
+        ('Hold', 310, 310, '00:10:00', '', None, None, 0),
+        ('Ramp', 310, 400, '', '', None, -1),
+    ]
+    assert columns(validate_entries(entries)) == [
+        (0, 'CycleType'), (1, 'EndTemp'), (2, 'StartTemp'), (2, 'CycleTime'), (3, 'CycleTime'),
+        (4, 'Shape'), (5, 'EndTemp'), (6, 'Tolerance'), (7, 'Rate')]
+
+
+def test_ramp_rate_limit_reports_the_field_that_sets_it():
+    too_fast = VALIDATION_MAX_RAMP_RATE * 2
+    by_time = [('Ramp', 20, 20 + too_fast, '00:01:00', '')]
+    by_rate = [('Ramp', 20, 600, '', '', None, too_fast)]
+    assert columns(validate_entries(by_time)) == [(0, 'CycleTime')]
+    assert columns(validate_entries(by_rate)) == [(0, 'Rate')]
+
+
+def test_continuity_allows_small_rounding():
+    entries = [('Ramp', 20, 600, '01:00:00', ''), ('Soak', 600.3, 600.3, '00:30:00', ''),
+               ('Ramp', 590, 20, '01:00:00', '')]
+    issues = validate_entries(entries)
+    assert columns(issues) == [(2, 'StartTemp')]
+    assert format_issue(issues[0]).startswith('Row 3, StartTemp: ')
+
+
+def test_repeat_rows():
+    block = [('Ramp', 20, 600, '01:00:00', ''), ('Ramp', 600, 20, '01:00:00', '')]
+    assert validate_entries(block + [('Repeat', None, None, '', '', None, None, None, 3, 2)]) == []
+    assert columns(validate_entries(block + [('Repeat', None, None, '', '', None, None, None, 0, 2)])) == [
+        (2, 'RepeatCount')]
+    assert columns(validate_entries(block + [('Repeat', None, None, '', '', None, None, None, 2, 3)])) == [
+        (2, 'RepeatSpan')]
+    # Repeating only the first ramp would jump from 600 back to 20
+    assert columns(validate_entries(block[:1] + [('Repeat', None, None, '', '', None, None, None, 2, 1)])) == [
+        (1, 'RepeatSpan')]
+    # The row after a repeat continues from the block's end
+    after = block + [('Repeat', None, None, '', '', None, None, None, 2, 2), ('Soak', 20, 20, '00:10:00', '')]
+    assert validate_entries(after) == []
+
+
+def test_repeat_expansion_limit():
+    entries = [('Soak', 20, 20, '00:01:00', ''),
+               ('Repeat', None, None, '', '', None, None, None, PROFILE_MAX_SEGMENTS + 1, 1)]
+    assert columns(validate_entries(entries)) == [(1, 'RepeatCount')]
+
+
+def test_dict_entries_match_tuple_entries():
+    keys = ('CycleType', 'StartTemp', 'EndTemp', 'CycleTime', 'Notes')
+    schedule = [dict(zip(keys, entry)) for entry in VALID[:2]]
+    schedule[1]['EndTemp'] = '610'
+    assert validate_schedule(schedule) == [
+        ValidationIssue(1, 'EndTemp', 'Soak must end at its start temperature')]
+
+
+def test_database_validation_groups_by_schedule(database):
+    database.save_schedule('Good', VALID)
+    database.save_schedule('Broken', [('Ramp', 20, 600, '01:00:00', ''), ('Soak', 500, 500, '00:10:00', '')])
+    database.save_schedule('Also good', VALID[:2])
+    results = database.validate_schedules()
+    assert list(results) == ['Broken']
+    assert columns(results['Broken']) == [(1, 'StartTemp')]
@@ -0,0 +1,53 @@
+from schedule_versions import apply_delta, canonical_segments, content_hash, diff_segments, make_delta
+
+BASE = [('Ramp', 20, 600, '01:00:00', ''), ('Soak', 600, 600, '00:30:00', 'hold'),
+        ('Ramp', 600, 20, '02:00:00', '')]
+
+
+def test_canonical_segments_ignore_number_formatting_and_default_options():
+    plain = canonical_segments(BASE)
+    assert canonical_segments([('Ramp', 20.0, '600', '01:00:00', None, 'linear')] + BASE[1:]) == plain
+    assert content_hash(plain) == content_hash(canonical_segments(BASE))
+    assert content_hash(canonical_segments(BASE[:2])) != content_hash(plain)
+
+
+def test_delta_round_trip():
+    old = canonical_segments(BASE)
+    new = canonical_segments([BASE[0], ('Soak', 600, 600, '00:45:00', 'hold'), BASE[2],
+                              ('Soak', 20, 20, '00:10:00', '')])
+    assert apply_delta(old, make_delta(old, new)) == new
+    assert apply_delta(old, make_delta(old, old)) == old
+
+
+def test_diff_segments():
+    old = canonical_segments(BASE)
+    new = canonical_segments([BASE[0], ('Soak', 600, 600, '00:45:00', 'hold'), BASE[2]])
+    changes = diff_segments(old, new)
+    assert [(change.tag, change.old_start, change.new_start) for change in changes] == [('replace', 1, 1)]
+    assert diff_segments(old, old) == []
+
+
+def test_saved_schedules_keep_every_version(database):
+    edited = [BASE[0], ('Soak', 600, 600, '00:45:00', 'hold'), BASE[2]]
+    assert database.save_schedule('Bisque', BASE)
+    assert database.save_schedule('Bisque', edited)
+    assert database.save_schedule('Bisque', edited)  # unchanged, no new version
+
+    versions = database.fetch_schedule_versions('Bisque')
+    assert [version['Version'] for version in versions] == [2, 1]
+    first = database.load_schedule_version(versions[1]['Id'])
+    assert [segment.seconds for segment in first] == [3600, 1800, 7200]
+    changes = database.diff_schedule_versions(versions[1]['Id'], versions[0]['Id'])
+    assert [change.tag for change in changes] == ['replace']
+
+
+def test_versions_rebuild_across_snapshots(database):
+    history = []
+    for minutes in range(1, 25):
+        entries = BASE[:1] + [('Soak', 600, 600, f'00:{minutes:02d}:00', '')]
+        database.save_schedule('Long', entries)
+        history.append([3600, minutes * 60])
+    versions = database.fetch_schedule_versions('Long')[::-1]
+    assert len(versions) == len(history)
+    for version, seconds in zip(versions, history):
+        assert [segment.seconds for segment in database.load_schedule_version(version['Id'])] == seconds
@@ -0,0 +1,44 @@
+from segment import (Segment, minutes_to_time, pad_entry, seconds_to_time, segment_options,
+                     time_to_seconds)
+
+
+def test_time_conversions():
+    assert time_to_seconds('01:02:03') == 3723
+    assert seconds_to_time(3723) == '01:02:03'
+    assert seconds_to_time(100 * 3600) == '100:00:00'
+    assert minutes_to_time(90.5) == '01:30:30'
+
+
+def test_pad_entry_and_options():
+    assert pad_entry(('Ramp', 20, 600, '01:00:00', '')) == ('Ramp', 20, 600, '01:00:00', '',
+                                                           'linear', None, None, None, None)
+    assert pad_entry(('Ramp', 20, 600, '01:00:00', '', 'exp'))[5:7] == ('exp', None)
+    assert segment_options({'Shape': '', 'Rate': '5'}) == ('linear', '5', None, None, None)
+
+
+def test_from_row_normalizes_fields():
+    segment = Segment.from_row(('Ramp', '20', 600, '01:30:00', None))
+    assert (segment.start_temp, segment.end_temp, segment.seconds, segment.minutes) == (20.0, 600.0, 5400, 90)
+    assert segment.notes == '' and segment.shape == 'linear' and segment.rate is None
+    assert segment.as_row() == ('Ramp', 20.0, 600.0, '01:30:00', '', 'linear', None, None, None, None)
+    assert Segment.from_row(segment.as_row()) == segment
+
+    repeat = Segment.from_row(('Repeat', None, '', '00:00:00', '', None, None, None, '3', 2))
+    assert (repeat.start_temp, repeat.end_temp, repeat.repeat_count, repeat.repeat_span) == (None, None, 3, 2)
+
+
+def test_cycle_types_are_interned():
+    first = Segment.from_row((''.join(['Ra', 'mp']), 20, 600, '01:00:00', ''))
+    second = Segment.from_entry({'CycleType': 'Ramp', 'StartTemp': '600', 'EndTemp': '700',
+                                 'CycleTime': '00:10:00', 'Shape': 'scurve'})
+    assert first.cycle_type is second.cycle_type
+    assert second.shape == 'scurve' and second.cycle_time == '00:10:00'
+
+
+def test_load_schedule_returns_segments(database):
+    rows = [('Ramp', 20, 600, '01:00:00', 'up', 'exp'), ('Hold', 600, 600, '00:30:00', '', None, None, 5)]
+    assert database.save_schedule('Glaze', rows)
+    loaded = database.load_schedule('Glaze')
+    assert loaded == [Segment.from_row(row) for row in rows]
+    assert loaded[1].tolerance == 5.0
+    assert database.load_schedule('Missing') is None
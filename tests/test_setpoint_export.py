@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from schedule_profile import ScheduleProfile
+from segment import Segment
+from setpoint_export import export_setpoints, grid_size, iter_setpoint_chunks, setpoints_on_grid
+
+PROFILE = ScheduleProfile([Segment('Ramp', 20, 620, 600), Segment('Soak', 620, 620, 300),
+                           Segment('Ramp', 620, 320, 300)])
+
+
+def test_grid_includes_the_end_time():
+    assert grid_size(PROFILE, 1.0) == 1201
+    assert grid_size(PROFILE, 0.1) == 12001
+    with pytest.raises(ValueError):
+        grid_size(PROFILE, 0)
+
+
+def test_grid_matches_the_profile():
+    minutes = np.linspace(0, PROFILE.total_minutes, 997)
+    expected = [PROFILE.temperature_at(minute) for minute in minutes]
+    assert np.allclose(setpoints_on_grid(PROFILE, minutes), expected, atol=1e-3)
+    assert np.isnan(setpoints_on_grid(PROFILE, np.array([-1.0, PROFILE.total_minutes + 1]))).all()
+
+
+def test_chunks_cover_the_grid_once():
+    chunks = list(iter_setpoint_chunks(PROFILE, 0.5, chunk_rows=1000))
+    elapsed = np.concatenate([chunk['elapsed'] for chunk in chunks])
+    assert len(elapsed) == grid_size(PROFILE, 0.5)
+    assert np.array_equal(elapsed, np.arange(len(elapsed)) * 0.5)
+
+
+def test_npy_and_csv_exports_agree(tmp_path):
+    rows, file_format = export_setpoints(PROFILE, str(tmp_path / 'table.npy'), 0.5, chunk_rows=777)
+    assert (rows, file_format) == (2401, 'npy')
+    table = np.load(tmp_path / 'table.npy')
+
+    export_setpoints(PROFILE, str(tmp_path / 'table.csv'), 0.5)
+    csv = np.loadtxt(tmp_path / 'table.csv', delimiter=',', skiprows=1)
+    assert np.allclose(csv[:, 0], table['elapsed'])
+    assert np.allclose(csv[:, 1], table['setpoint'], atol=1e-3)
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    export_setpoints(PROFILE, str(tmp_path / 'table.parquet'), 1.0)
+    assert pq.read_table(tmp_path / 'table.parquet').num_rows == 1201
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_setpoints(PROFILE, 'table.xlsx')
+
+
+def test_grid_uses_the_profile_boundary_rule():
+    # Steps at 10 and 20 min, a zero-length step and curved ramps
+    profile = ScheduleProfile([Segment('Soak', 100, 100, 600), Segment('Soak', 200, 200, 600),
+                               Segment('Ramp', 300, 300, 0), Segment('Ramp', 300, 500, 600, shape='exp'),
+                               Segment('Ramp', 500, 100, 600, shape='scurve')])
+    minutes = np.arange(0, profile.total_minutes + 0.25, 0.25)
+    expected = [profile.setpoint_at(minute)[0] for minute in minutes]
+    assert np.allclose(setpoints_on_grid(profile, minutes), expected, atol=1e-3)
+    assert setpoints_on_grid(profile, np.array([10.0, 20.0])).tolist() == [200, 300]
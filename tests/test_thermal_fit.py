@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from constants import THERMAL_FIT_STEP_SECONDS
+from runs import SAMPLE_DTYPE, RunRecorder
+from thermal_fit import LearnedModel, ThermalFit, update_fit
+
+STEP = THERMAL_FIT_STEP_SECONDS
+TRUE_MODEL = LearnedModel(STEP, dead_steps=4, heat=0.02, cool=0.01)
+
+
+def setpoints():
+    """Up to 600 °C over an hour, an hour's soak, down over two hours, every STEP seconds."""
+    minutes = np.arange(0, 240, STEP / 60)
+    return np.interp(minutes, [0, 60, 120, 240], [20, 600, 600, 20])
+
+
+def record_run(furnace_id, seed, finish=True):
+    rng = np.random.default_rng(seed)
+    target = setpoints()
+    measured = TRUE_MODEL.simulate(target) + rng.normal(0, 0.05, len(target))
+    recorder = RunRecorder('Bisque', furnace_id)
+    for k, (setpoint, temperature) in enumerate(zip(target, measured)):
+        recorder.record(k * STEP, setpoint, temperature)
+    if finish:
+        recorder.finish()
+    else:
+        recorder.flush()
+    return recorder
+
+
+def test_fit_recovers_a_simulated_furnace():
+    rng = np.random.default_rng(0)
+    target = setpoints()
+    samples = np.zeros(len(target), dtype=SAMPLE_DTYPE)
+    samples['elapsed'] = np.arange(len(target)) * STEP
+    samples['setpoint'] = target
+    samples['measured'] = TRUE_MODEL.simulate(target) + rng.normal(0, 0.05, len(target))
+
+    fit = ThermalFit(STEP)
+    fit.add_samples(samples)
+    model = fit.model()
+    assert model.order == 1 and model.dead_steps == TRUE_MODEL.dead_steps
+    assert model.heat == pytest.approx(TRUE_MODEL.heat, rel=0.1)
+    assert model.cool == pytest.approx(TRUE_MODEL.cool, rel=0.1)
+
+    restored = ThermalFit.from_payload(fit.to_payload())
+    assert restored.model().heat == model.heat
+
+
+def test_too_little_data_gives_no_model():
+    samples = np.zeros(20, dtype=SAMPLE_DTYPE)
+    samples['elapsed'] = np.arange(20) * STEP
+    samples['setpoint'] = 100.0
+    samples['measured'] = 90.0
+    fit = ThermalFit(STEP)
+    fit.add_samples(samples)
+    assert fit.model() is None
+
+
+def test_runs_finishing_out_of_order_are_each_added_once(database):
+    earlier = record_run('kiln-1', seed=1, finish=False)
+    record_run('kiln-1', seed=2)
+    record_run('kiln-2', seed=3)
+
+    fit, model = update_fit('kiln-1')
+    one_run = int(fit.counts.max())
+    assert model is not None and one_run > 0
+    assert database.load_thermal_fit('kiln-1')['LastRunId'] == earlier.run_id - 1
+
+    earlier.finish()
+    fit, _ = update_fit('kiln-1')
+    assert int(fit.counts.max()) == 2 * one_run
+    assert database.load_thermal_fit('kiln-1')['LastRunId'] == earlier.run_id + 1
+    assert fit.run_ids == set()
+
+    fit, _ = update_fit('kiln-1')
+    assert int(fit.counts.max()) == 2 * one_run
@@ -0,0 +1,234 @@
+import json
+import logging
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from constants import (THERMAL_FIT_STEP_SECONDS, THERMAL_MAX_DEAD_TIME_SECONDS, THERMAL_MIN_FIT_SAMPLES,
+                       THERMAL_ORDER_IMPROVEMENT, THERMAL_RIDGE)
+from database import DatabaseManager
+from instrumentation import timer
+from runs import RunReader
+from schedule_profile import ScheduleProfile
+
+logger = logging.getLogger(__name__)
+
+# Regressors of the temperature change over one step:
+# heating error, cooling error, change the step before (second order only), constant drift
+_REGRESSORS = 4
+_FIRST_ORDER = [0, 1, 3]
+
+
+def resample(samples: np.ndarray, step: float = THERMAL_FIT_STEP_SECONDS) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean setpoint and measured temperature of a run in bins of step seconds; NaN where nothing was measured."""
+    elapsed = np.asarray(samples['elapsed'], dtype=float)
+    measured = np.asarray(samples['measured'], dtype=float)
+    setpoint = np.asarray(samples['setpoint'], dtype=float)
+    valid = np.isfinite(measured) & np.isfinite(setpoint) & (elapsed >= 0)
+    if not valid.any():
+        return np.zeros(0), np.zeros(0)
+    bins = (elapsed[valid] // step).astype(np.int64)
+    counts = np.bincount(bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.bincount(bins, setpoint[valid]) / counts,
+                np.bincount(bins, measured[valid]) / counts)
+
+
+class LearnedModel:
+    """Discrete response of a furnace's measured temperature to its setpoint.
+
+    Each step of step seconds, the temperature moves by heat (or cool) times
+    the error to the setpoint dead_steps ago, plus momentum times its move
+    the step before last (second order) and a constant drift. heat and cool
+    differ because furnaces heat under power but cool only by losses.
+    """
+
+    __slots__ = ('step', 'dead_steps', 'heat', 'cool', 'momentum', 'drift', 'order', 'rms', 'samples')
+
+    def __init__(self, step: float, dead_steps: int, heat: float, cool: float, momentum: float = 0.0,
+                 drift: float = 0.0, rms: float = 0.0, samples: int = 0):
+        self.step = step
+        self.dead_steps = dead_steps
+        self.heat = heat
+        self.cool = cool
+        self.momentum = momentum
+        self.drift = drift
+        self.order = 2 if momentum else 1
+        self.rms = rms
+        self.samples = samples
+
+    @property
+    def dead_time(self) -> float:
+        return self.dead_steps * self.step
+
+    @property
+    def tau_heat(self) -> float:
+        """Heating time constant in seconds, for the first-order part of the response."""
+        return -self.step / math.log(1 - min(self.heat, 0.999999))
+
+    @property
+    def tau_cool(self) -> float:
+        return -self.step / math.log(1 - min(self.cool, 0.999999))
+
+    def simulate(self, setpoints: np.ndarray, initial: Optional[float] = None) -> np.ndarray:
+        """Predicted temperatures for setpoints sampled every step seconds."""
+        temperatures = np.empty(len(setpoints))
+        if not len(setpoints):
+            return temperatures
+        temperature = float(setpoints[0]) if initial is None else initial
+        change = previous = 0.0
+        delayed = np.concatenate((np.full(self.dead_steps, setpoints[0]), setpoints))
+        # A schedule is a few thousand steps; the recursion is cheaper in plain floats than in NumPy
+        heat, cool, momentum, drift = self.heat, self.cool, self.momentum, self.drift
+        for k, setpoint in enumerate(delayed[:len(setpoints)].tolist()):
+            temperatures[k] = temperature
+            error = setpoint - temperature
+            change, previous = (heat if error > 0 else cool) * error + momentum * previous + drift, change
+            temperature += change
+        return temperatures
+
+    def predict(self, profile: ScheduleProfile, initial: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(minutes, temperatures) the furnace is expected to follow through a schedule.
+
+        Guaranteed soaks are taken at their nominal length; the furnace
+        would wait there until it is within tolerance.
+        """
+        minutes = np.arange(0, profile.total_minutes + self.step / 60, self.step / 60)
+        setpoints = np.interp(minutes, *profile.breakpoints())
+        return minutes, self.simulate(setpoints, initial)
+
+    def __repr__(self):
+        return (f"LearnedModel(order={self.order}, dead_time={self.dead_time:g}s, "
+                f"tau_heat={self.tau_heat:.0f}s, tau_cool={self.tau_cool:.0f}s, rms={self.rms:.3f})")
+
+
+class ThermalFit:
+    """Least-squares statistics of a furnace's response, kept for every candidate dead time.
+
+    Only the normal equations (X'X, X'y, y'y) of each dead time are stored,
+    so adding a run costs one pass over that run and refitting is a solve
+    of a few 4x4 systems, however much history is behind it. run_ids holds
+    the runs added that are newer than the stored marker (see update_fit).
+    """
+
+    def __init__(self, step: float = THERMAL_FIT_STEP_SECONDS,
+                 max_dead_time: float = THERMAL_MAX_DEAD_TIME_SECONDS):
+        self.step = step
+        self.delays = np.arange(int(max_dead_time // step) + 1)
+        self.xtx = np.zeros((len(self.delays), _REGRESSORS, _REGRESSORS))
+        self.xty = np.zeros((len(self.delays), _REGRESSORS))
+        self.yty = np.zeros(len(self.delays))
+        self.counts = np.zeros(len(self.delays), dtype=np.int64)
+        self.run_ids = set()
+
+    def add_samples(self, samples: np.ndarray):
+        """Accumulate one run's recorded samples."""
+        setpoint, measured = resample(samples, self.step)
+        if len(measured) < 4:
+            return
+        change = np.diff(measured)
+        # Rows k = 2 .. n-2: change[k] from T[k], the change into T[k-1] and the setpoint at k - delay.
+        # The change into T[k] would share T[k]'s measurement noise with change[k] and fit the noise.
+        y = change[2:]
+        previous = change[:-2]
+        temperature = measured[2:-1]
+        k = np.arange(2, len(measured) - 1)
+        for index, delay in enumerate(self.delays):
+            rows = k >= delay
+            error = setpoint[k[rows] - delay] - temperature[rows]
+            X = np.column_stack((np.maximum(error, 0), np.minimum(error, 0), previous[rows],
+                                 np.ones(len(error))))
+            target = y[rows]
+            valid = np.isfinite(X).all(axis=1) & np.isfinite(target)
+            X, target = X[valid], target[valid]
+            self.xtx[index] += X.T @ X
+            self.xty[index] += X.T @ target
+            self.yty[index] += target @ target
+            self.counts[index] += len(target)
+
+    def _solve(self, columns) -> Tuple[np.ndarray, np.ndarray]:
+        """Coefficients and residual sums of squares for every dead time, using some regressors."""
+        xtx = self.xtx[:, columns][:, :, columns] + THERMAL_RIDGE * np.eye(len(columns))
+        xty = self.xty[:, columns]
+        theta = np.linalg.solve(xtx, xty[..., None])[..., 0]
+        rss = self.yty - 2 * np.einsum('di,di->d', theta, xty) + np.einsum('di,dij,dj->d', theta, xtx, theta)
+        return theta, rss
+
+    def model(self) -> Optional[LearnedModel]:
+        """The best fitting model, or None until there is enough usable data."""
+        if self.counts.max(initial=0) < THERMAL_MIN_FIT_SAMPLES:
+            return None
+        theta, rss = self._solve(list(range(_REGRESSORS)))
+        rss = np.where(self.counts >= THERMAL_MIN_FIT_SAMPLES, rss, np.inf)
+        index = int(np.argmin(rss))
+        first_theta, first_rss = self._solve(_FIRST_ORDER)
+        count = int(self.counts[index])
+        if rss[index] < (1 - THERMAL_ORDER_IMPROVEMENT) * first_rss[index]:
+            heat, cool, momentum, drift = theta[index]
+            residual = rss[index]
+        else:
+            (heat, cool, drift), momentum, residual = first_theta[index], 0.0, first_rss[index]
+        # A furnace that never cooled (or heated) in the data borrows the other side's rate
+        if heat <= 0 and cool <= 0:
+            return None
+        heat = heat if heat > 0 else cool
+        cool = cool if cool > 0 else heat
+        if not abs(momentum) < 1:
+            return None
+        return LearnedModel(self.step, int(self.delays[index]), float(min(heat, 1.0)), float(min(cool, 1.0)),
+                            float(momentum), float(drift), math.sqrt(max(residual, 0) / count), count)
+
+    def to_payload(self) -> str:
+        return json.dumps({'step': self.step, 'max_delay': int(self.delays[-1]), 'xtx': self.xtx.tolist(),
+                           'xty': self.xty.tolist(), 'yty': self.yty.tolist(), 'counts': self.counts.tolist(),
+                           'run_ids': sorted(self.run_ids)})
+
+    @classmethod
+    def from_payload(cls, payload: str) -> 'ThermalFit':
+        data = json.loads(payload)
+        fit = cls(data['step'], data['max_delay'] * data['step'])
+        fit.xtx = np.array(data['xtx'])
+        fit.xty = np.array(data['xty'])
+        fit.yty = np.array(data['yty'])
+        fit.counts = np.array(data['counts'], dtype=np.int64)
+        fit.run_ids = set(data.get('run_ids', ()))
+        return fit
+
+
+def update_fit(furnace_id: str) -> Tuple[ThermalFit, Optional[LearnedModel]]:
+    """Add a furnace's runs finished since the last update to its stored fit, and refit.
+
+    Runs can finish in a different order than they started, so the stored
+    marker only moves past runs that have ended; finished runs beyond it are
+    remembered by id in the fit. Settings changed since the fit was stored
+    (step or longest dead time) start a new fit from all runs.
+    """
+    stored = DatabaseManager.load_thermal_fit(furnace_id)
+    fit, last_run_id = ThermalFit(), 0
+    if stored is not None:
+        previous = ThermalFit.from_payload(stored['Payload'])
+        if previous.step == fit.step and len(previous.delays) == len(fit.delays):
+            fit, last_run_id = previous, stored['LastRunId']
+
+    newer = [run for run in DatabaseManager.fetch_runs()
+             if run['FurnaceId'] == furnace_id and run['Id'] > last_run_id]
+    runs = sorted((run for run in newer
+                   if run['Id'] not in fit.run_ids and run['EndedAt']
+                   and run['SampleFile'] and os.path.exists(run['SampleFile'])),
+                  key=lambda run: run['Id'])
+    if runs:
+        with timer('thermal.fit'):
+            for run in runs:
+                fit.add_samples(RunReader(run['SampleFile']).samples)
+                fit.run_ids.add(run['Id'])
+        unfinished = [run['Id'] for run in newer if not run['EndedAt']]
+        last_run_id = min(unfinished) - 1 if unfinished else max(run['Id'] for run in newer)
+        fit.run_ids = {run_id for run_id in fit.run_ids if run_id > last_run_id}
+        DatabaseManager.save_thermal_fit(furnace_id, fit.to_payload(), last_run_id)
+        logger.info("Added %d runs to the thermal model of %s", len(runs), furnace_id)
+    model = fit.model()
+    if model is not None:
+        logger.info("Thermal model of %s: %r", furnace_id, model)
+    return fit, model
@@ -0,0 +1,48 @@
+import math
+from typing import Optional
+
+from constants import DEFAULT_TEMP
+
+
+class ThermalModel:
+    """First-order-plus-dead-time furnace model with separate heating/cooling time constants.
+
+    Temperatures are in °C, output in percent of heater power and times in seconds.
+    """
+
+    __slots__ = ('gain', 'tau_heat', 'tau_cool', 'dead_time', 'ambient', 'dt',
+                 'temperature', '_alpha_heat', '_alpha_cool', '_delay', '_delay_index')
+
+    def __init__(self, gain: float = 12.0, tau_heat: float = 600.0, tau_cool: float = 1800.0,
+                 dead_time: float = 20.0, ambient: float = DEFAULT_TEMP, dt: float = 1.0):
+        self.gain = gain
+        self.tau_heat = tau_heat
+        self.tau_cool = tau_cool
+        self.dead_time = dead_time
+        self.ambient = ambient
+        self.dt = dt
+        # Exact discretisation of the first-order lag for a fixed tick
+        self._alpha_heat = 1.0 - math.exp(-dt / tau_heat)
+        self._alpha_cool = 1.0 - math.exp(-dt / tau_cool)
+        self._delay = [0.0] * max(1, int(round(dead_time / dt)))
+        self._delay_index = 0
+        self.temperature = ambient
+
+    def reset(self, temperature: Optional[float] = None):
+        """Return the model to a steady state at the given temperature."""
+        self.temperature = self.ambient if temperature is None else temperature
+        output = max(0.0, (self.temperature - self.ambient) / self.gain)
+        for i in range(len(self._delay)):
+            self._delay[i] = output
+        self._delay_index = 0
+
+    def step(self, output: float) -> float:
+        """Advance the model one tick with the given heater output and return the new temperature."""
+        delayed = self._delay[self._delay_index]
+        self._delay[self._delay_index] = output
+        self._delay_index = (self._delay_index + 1) % len(self._delay)
+
+        target = self.ambient + self.gain * delayed
+        alpha = self._alpha_heat if target > self.temperature else self._alpha_cool
+        self.temperature += (target - self.temperature) * alpha
+        return self.temperature